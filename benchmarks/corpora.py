@@ -0,0 +1,47 @@
+"""Generates corpora of IntentDefinitions for the benchmarks, modelled after the grammars of the
+IntentHandlers in this project: rooms x devices x actions."""
+from typing import List
+
+from core.intentdefinition import IntentDefinition, NumberRangeParameter, SentenceBuilder, \
+    SetParameter, Variable, VariableParameter
+
+ROOMS = ["Living room", "Kitchen", "Dining", "Study", "Attic", "Garage", "Hallway", "Bedroom"]
+DEVICES = ["lights", "lamp", "heater", "fan", "speaker", "blinds"]
+ACTIONS = ["Turn", "Switch", "Set"]
+
+
+def generate_intent_definitions(number: int) -> List[IntentDefinition]:
+    """Returns the given number of IntentDefinitions. Every definition has two sentences, one
+    with a shared room slot and a small inline set, and one with a number range and a
+    variable. The value sets of every seventh definition are unique, so they need slots of
+    their own."""
+    room_parameter = SetParameter("Room", True, possible_values=ROOMS)
+    on_off_parameter = SetParameter("OnOff", True, possible_values=["On", "Off"])
+    intent_definitions = []
+    for index in range(number):
+        device = DEVICES[index % len(DEVICES)]
+        action = ACTIONS[index % len(ACTIONS)]
+        intent_definition = IntentDefinition("{}{}{}".format(action, device.title(), index))
+
+        rooms = room_parameter
+        if index % 7 == 0:
+            rooms = SetParameter("Room", True,
+                                 possible_values=ROOMS + ["Room {}".format(index)])
+        intent_definition.add_sentence(SentenceBuilder()
+                                       .add_string("{} the {} in the".format(action, device))
+                                       .add_parameter(rooms)
+                                       .add_parameter(on_off_parameter)
+                                       .build())
+
+        when = Variable("when", [SentenceBuilder().add_string("in").add_parameter(
+            NumberRangeParameter("minutes", True, 1, 60)).add_string("minutes").build()])
+        intent_definition.add_variable(when)
+        intent_definition.add_sentence(SentenceBuilder()
+                                       .add_string("{} the {} to".format(action, device))
+                                       .add_parameter(NumberRangeParameter("level", True, 0,
+                                                                           100))
+                                       .add_string("percent", True)
+                                       .add_parameter(VariableParameter(when, optional=True))
+                                       .build())
+        intent_definitions.append(intent_definition)
+    return intent_definitions
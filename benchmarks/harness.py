@@ -0,0 +1,102 @@
+"""Small benchmark harness which measures throughput, latency percentiles and allocations of a
+function, and compares the results with a saved baseline."""
+import gc
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+
+class BenchmarkResult(object):
+    """Measurements of one benchmark"""
+    def __init__(self, name: str, durations: List[float], peak_allocated_bytes: int):
+        self._name = name
+        self._durations = sorted(durations)
+        self._peak_allocated_bytes = peak_allocated_bytes
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def throughput(self) -> float:
+        """Number of calls per second"""
+        return len(self._durations) / sum(self._durations)
+
+    @property
+    def p50(self) -> float:
+        """Median duration of a call, in seconds"""
+        return self._percentile(0.50)
+
+    @property
+    def p99(self) -> float:
+        """99th percentile of the duration of a call, in seconds"""
+        return self._percentile(0.99)
+
+    @property
+    def peak_allocated_bytes(self) -> int:
+        """Peak of the memory allocated during one call"""
+        return self._peak_allocated_bytes
+
+    def _percentile(self, fraction: float) -> float:
+        index = min(len(self._durations) - 1, int(round(fraction * (len(self._durations) - 1))))
+        return self._durations[index]
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"throughput": self.throughput, "p50": self.p50, "p99": self.p99,
+                "peak_allocated_bytes": self.peak_allocated_bytes}
+
+
+def run_benchmark(name: str, function: Callable[[], object], iterations: int,
+                  warmup: int = 3) -> BenchmarkResult:
+    """Calls the function warmup + iterations times and measures every call. Allocations are
+    measured in a separate call, because tracing them slows the function down."""
+    for _ in range(warmup):
+        function()
+    gc.collect()
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak_allocated_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return BenchmarkResult(name, durations, peak_allocated_bytes)
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    lines = ["{:<60} {:>12} {:>11} {:>11} {:>12}".format("benchmark", "ops/s", "p50 (ms)",
+                                                         "p99 (ms)", "alloc (KiB)")]
+    for result in results:
+        lines.append("{:<60} {:>12.1f} {:>11.3f} {:>11.3f} {:>12.1f}".format(
+            result.name, result.throughput, result.p50 * 1000, result.p99 * 1000,
+            result.peak_allocated_bytes / 1024))
+    return "\n".join(lines)
+
+
+def save_baseline(results: List[BenchmarkResult], path: str):
+    with open(path, "w") as baseline_file:
+        json.dump({result.name: result.to_dict() for result in results}, baseline_file,
+                  indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def compare_with_baseline(results: List[BenchmarkResult], path: str,
+                          tolerance: float) -> List[str]:
+    """Returns a description of every benchmark whose median duration or allocations grew by
+    more than the tolerance (a fraction) compared to the baseline"""
+    with open(path) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            continue
+        for key in ("p50", "peak_allocated_bytes"):
+            previous = baseline[result.name][key]
+            current = result.to_dict()[key]
+            if previous and current > previous * (1 + tolerance):
+                regressions.append("{}: {} went from {:.6g} to {:.6g}".format(
+                    result.name, key, previous, current))
+    return regressions
@@ -0,0 +1,86 @@
+"""Micro-benchmark which compares the RhasspyIntentDecoder with the way intents used to be parsed:
+a generic json.loads into a mutable, non-slotted Intent.
+
+Run with: python -m benchmarks.intentparsing"""
+import json
+import sys
+import timeit
+import tracemalloc
+
+from rhasspy.intentdecoder import RhasspyIntentDecoder
+
+RAW_INTENT = b"""{
+    "intent": {"name": "TurnLightsInRoomOnOff", "confidence": 1.0},
+    "entities": [{"entity": "room", "value": "study", "raw_value": "study", "start": 23,
+                  "raw_start": 23, "end": 28, "raw_end": 28, "tokens": ["study"],
+                  "raw_tokens": ["study"]},
+                 {"entity": "state", "value": "on", "raw_value": "on", "start": 29,
+                  "raw_start": 29, "end": 31, "raw_end": 31, "tokens": ["on"],
+                  "raw_tokens": ["on"]}],
+    "text": "turn the lights in the study on",
+    "raw_text": "turn the lights in the study on",
+    "recognize_seconds": 0.0031121610081754625,
+    "tokens": ["turn", "the", "lights", "in", "the", "study", "on"],
+    "raw_tokens": ["turn", "the", "lights", "in", "the", "study", "on"],
+    "speech_confidence": 1,
+    "slots": {"room": "study", "state": "on"},
+    "wakeId": "",
+    "siteId": "default",
+    "time_sec": 0.012903928756713867
+}"""
+
+
+class LegacyIntent:
+    """The Intent class as it was before it became slotted and immutable"""
+    def __init__(self, name, full_intent_string, parameters={}):
+        self._name = name
+        self._parameters = parameters
+        self._full_intent_string = full_intent_string
+
+
+def legacy_decode(raw_intent):
+    intent_dict = json.loads(raw_intent)
+    name = intent_dict["intent"]["name"]
+    if "slots" in intent_dict:
+        return LegacyIntent(name, intent_dict["text"], intent_dict["slots"])
+    return LegacyIntent(name, intent_dict["text"])
+
+
+def decode(raw_intent):
+    return RhasspyIntentDecoder.decode(raw_intent)[0]
+
+
+def measure_parse_time(decoder, number: int) -> float:
+    """Returns the average time in microseconds to decode one intent"""
+    timer = timeit.Timer(lambda: decoder(RAW_INTENT))
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def measure_allocations(decoder, number: int):
+    """Returns the number of memory blocks and bytes which stay allocated for every decoded
+    intent"""
+    intents = []
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(number):
+        intents.append(decoder(RAW_INTENT))
+    blocks_after = sys.getallocatedblocks()
+    allocated_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (blocks_after - blocks_before) / number, allocated_bytes / number
+
+
+def main():
+    number = 10000
+    print("{:<25} {:>12} {:>16} {:>15}".format("implementation", "parse (us)",
+                                               "blocks/intent", "bytes/intent"))
+    for name, decoder in (("json.loads + Intent", legacy_decode),
+                          ("RhasspyIntentDecoder", decode)):
+        parse_time = measure_parse_time(decoder, number)
+        blocks, allocated_bytes = measure_allocations(decoder, number)
+        print("{:<25} {:>12.2f} {:>16.1f} {:>15.0f}".format(name, parse_time, blocks,
+                                                            allocated_bytes))
+
+
+if __name__ == "__main__":
+    main()
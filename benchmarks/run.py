@@ -0,0 +1,157 @@
+"""Benchmark suite for the hot paths of the project:
+- an intent from Rhasspy, through RhasspyIntentReceiver.handle_new_intent and
+  IntentHandlerManager.update, to a stub IntentHandler and a stub Speaker
+- IntentMatcher.match, over generated corpora of 10 and 1k IntentDefinitions
+- GrammarOptimizer.optimize_all, over generated corpora of 10 and 1k IntentDefinitions
+- IntentDefinitionCompiler.compile_all, GrammarAnalyzer.analyze, RhasspyUpdater._get_slots and
+  RhasspyUpdater._generate_sentences (with and without memoized definitions), over generated
+  corpora of 10, 1k and 10k IntentDefinitions
+
+Run with: python -m benchmarks.run
+Use --save-baseline to store the results in benchmarks/baseline.json. Without it, the results are
+compared with the baseline and the exit code is 1 when a benchmark regressed.
+benchmarks.scaling checks that sentence generation scales linearly with the corpus size."""
+import argparse
+import os
+import sys
+from typing import List, Sequence
+
+from benchmarks.corpora import generate_intent_definitions
+from benchmarks.harness import BenchmarkResult, compare_with_baseline, format_results, \
+    run_benchmark, save_baseline
+from benchmarks.intentparsing import RAW_INTENT
+from core.compiledintentdefinition import AnyIntentDefinition, IntentDefinitionCompiler
+from core.intent import Intent
+from core.intentdefinition import IntentDefinition
+from core.intentdefinitionsource import IntentDefinitionSource
+from core.intenthandler import IntentHandler
+from core.intenthandlermanager import IntentHandlerManager
+from core.intentmatcher import IntentMatcher
+from core.speaker import Speaker
+from rhasspy.intentreceiver import RhasspyIntentReceiver
+from rhasspy.grammaranalyzer import GrammarAnalyzer
+from rhasspy.grammaroptimizer import GrammarOptimizer
+from rhasspy.updater import RhasspyUpdater
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# corpus size: (iterations, warmup)
+CORPUS_SIZES = {10: (200, 3), 1000: (20, 1), 10000: (5, 1)}
+
+
+class StubIntentHandler(IntentHandler):
+    def __init__(self):
+        IntentHandler.__init__(self)
+        self._intent_definitions = [IntentDefinition("TurnLightsInRoomOnOff",
+                                                     "Turn the lights in the study on")]
+
+    def handle_intent(self, intent: Intent):
+        return "Turning the lights in the {} {}".format(intent.parameters["room"],
+                                                        intent.parameters["state"]), False
+
+
+class StubSpeaker(Speaker):
+    def speak_text(self, text):
+        pass
+
+
+class StubIntentDefinitionSource(IntentDefinitionSource):
+    def __init__(self, intent_definitions: Sequence[AnyIntentDefinition]):
+        self._intent_definitions = list(intent_definitions)
+
+    def get_intent_definitions(self) -> List[AnyIntentDefinition]:
+        return self._intent_definitions
+
+
+def benchmark_intent_path(handler_timeout: float = None) -> BenchmarkResult:
+    intent_handler_manager = IntentHandlerManager(StubSpeaker(), handler_timeout=handler_timeout)
+    intent_handler_manager.subscribe_intent_handler(StubIntentHandler())
+    receiver = RhasspyIntentReceiver(port=0)
+    receiver.attach(intent_handler_manager)
+    receiver.wait_until_serving(5)
+    name = "intent path (inline)" if handler_timeout is None else "intent path (executor)"
+    try:
+        return run_benchmark(name, lambda: receiver.handle_new_intent(RAW_INTENT), 5000)
+    finally:
+        receiver.shutdown()
+
+
+def benchmark_updater(corpus_size: int, iterations: int,
+                      warmup: int) -> List[BenchmarkResult]:
+    intent_definitions = generate_intent_definitions(corpus_size)
+    updater = RhasspyUpdater(StubIntentDefinitionSource(intent_definitions))
+    compile_result = run_benchmark(
+        "IntentDefinitionCompiler.compile_all ({} definitions)".format(corpus_size),
+        lambda: IntentDefinitionCompiler().compile_all(intent_definitions), iterations, warmup)
+    compiled_definitions = IntentDefinitionCompiler().compile_all(intent_definitions)
+    analysis_result = run_benchmark(
+        "GrammarAnalyzer.analyze ({} definitions)".format(corpus_size),
+        lambda: GrammarAnalyzer().analyze(compiled_definitions), iterations, warmup)
+    slots_result = run_benchmark("updater._get_slots ({} definitions)".format(corpus_size),
+                                 lambda: updater._get_slots(compiled_definitions), iterations,
+                                 warmup)
+    updater._slot_registry = updater._get_slots(compiled_definitions)
+
+    def generate_sentences_without_memo():
+        updater._rendered = {}
+        return updater._generate_sentences(compiled_definitions)
+    sentences_result = run_benchmark(
+        "updater._generate_sentences ({} definitions)".format(corpus_size),
+        generate_sentences_without_memo, iterations, warmup)
+    memoized_result = run_benchmark(
+        "updater._generate_sentences memoized ({} definitions)".format(corpus_size),
+        lambda: updater._generate_sentences(compiled_definitions), iterations, warmup)
+    return [compile_result, analysis_result, slots_result, sentences_result, memoized_result]
+
+
+def benchmark_intent_matcher(corpus_size: int) -> BenchmarkResult:
+    intent_matcher = IntentMatcher(StubIntentDefinitionSource(
+        generate_intent_definitions(corpus_size)))
+    return run_benchmark("IntentMatcher.match ({} definitions)".format(corpus_size),
+                         lambda: intent_matcher.match("Set the heater to 40 percent in 5 minutes"),
+                         2000)
+
+
+def benchmark_grammar_optimizer(corpus_size: int, iterations: int) -> BenchmarkResult:
+    compiled_definitions = IntentDefinitionCompiler().compile_all(
+        generate_intent_definitions(corpus_size))
+    return run_benchmark("GrammarOptimizer.optimize_all ({} definitions)".format(corpus_size),
+                         lambda: GrammarOptimizer().optimize_all(compiled_definitions),
+                         iterations)
+
+
+def run_all() -> List[BenchmarkResult]:
+    results = [benchmark_intent_path(), benchmark_intent_path(handler_timeout=5),
+               benchmark_intent_matcher(10), benchmark_intent_matcher(1000),
+               benchmark_grammar_optimizer(10, 200), benchmark_grammar_optimizer(1000, 10)]
+    for corpus_size, (iterations, warmup) in CORPUS_SIZES.items():
+        results.extend(benchmark_updater(corpus_size, iterations, warmup))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="path of the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed growth of p50 and allocations, as a fraction")
+    arguments = parser.parse_args()
+
+    results = run_all()
+    print(format_results(results))
+    if arguments.save_baseline:
+        save_baseline(results, arguments.baseline)
+        print("Saved baseline to {}".format(arguments.baseline))
+        return 0
+    if not os.path.exists(arguments.baseline):
+        print("No baseline found at {}".format(arguments.baseline))
+        return 0
+    regressions = compare_with_baseline(results, arguments.baseline, arguments.tolerance)
+    for regression in regressions:
+        print("REGRESSION {}".format(regression))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Shows how RhasspyUpdater._generate_sentences scales with the number of IntentDefinitions. For
+every corpus size the median duration per IntentDefinition is printed, together with its ratio
+to the smallest corpus. With linear scaling the ratio stays close to 1.
+
+Run with: python -m benchmarks.scaling"""
+import sys
+from typing import Dict
+
+from benchmarks.corpora import generate_intent_definitions
+from benchmarks.harness import run_benchmark
+from benchmarks.run import StubIntentDefinitionSource
+from core.compiledintentdefinition import IntentDefinitionCompiler
+from rhasspy.updater import RhasspyUpdater
+
+# corpus size: iterations
+CORPUS_SIZES = {1000: 20, 2500: 10, 5000: 5, 10000: 5}
+# allowed growth of the duration per IntentDefinition between the smallest and largest corpus
+MAX_RATIO = 2.0
+
+
+def measure_generate_sentences() -> Dict[int, float]:
+    """Returns the median duration of _generate_sentences per IntentDefinition, by corpus size"""
+    durations = {}
+    for corpus_size, iterations in CORPUS_SIZES.items():
+        intent_definitions = IntentDefinitionCompiler().compile_all(
+            generate_intent_definitions(corpus_size))
+        updater = RhasspyUpdater(StubIntentDefinitionSource(intent_definitions))
+        updater._slot_registry = updater._get_slots(intent_definitions)
+
+        def generate_sentences_without_memo():
+            updater._rendered = {}
+            return updater._generate_sentences(intent_definitions)
+        result = run_benchmark("updater._generate_sentences ({} definitions)".format(corpus_size),
+                               generate_sentences_without_memo, iterations, warmup=1)
+        durations[corpus_size] = result.p50 / corpus_size
+    return durations
+
+
+def main():
+    durations = measure_generate_sentences()
+    smallest = durations[min(durations)]
+    print("{:>12} {:>18} {:>8}".format("definitions", "us/definition", "ratio"))
+    for corpus_size, duration in durations.items():
+        print("{:>12} {:>18.2f} {:>8.2f}".format(corpus_size, duration * 1e6,
+                                                 duration / smallest))
+    ratio = durations[max(durations)] / smallest
+    if ratio > MAX_RATIO:
+        print("NOT LINEAR: the duration per definition grew {:.2f} times".format(ratio))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""This module contains the compiled form of an IntentDefinition: an immutable, tuple-based copy
+which can be hashed, compared and shared. IntentDefinitions are built step by step by the
+IntentHandlers and can still change afterwards. A CompiledIntentDefinition is a snapshot of one,
+with a content_hash which only changes when the definition itself changes."""
+import hashlib
+from typing import Dict, List, NamedTuple, Sequence, Tuple, Union
+
+from core.intentdefinition import IntentDefinition, NumberRangeParameter, Sentence, SetParameter, \
+    StringParameter, Variable, VariableParameter
+
+
+class CompiledString(NamedTuple):
+    text: str
+    optional: bool
+    substitute: bool
+
+
+class CompiledSetParameter(NamedTuple):
+    name: str
+    return_value: bool
+    optional: bool
+    possible_values: Tuple[str, ...]
+
+
+class CompiledNumberRangeParameter(NamedTuple):
+    name: str
+    return_value: bool
+    optional: bool
+    lower_value: int
+    upper_value: int
+
+
+class CompiledVariableParameter(NamedTuple):
+    name: str
+    return_value: bool
+    optional: bool
+
+
+CompiledPart = Union[CompiledString, CompiledSetParameter, CompiledNumberRangeParameter,
+                     CompiledVariableParameter]
+CompiledSentence = Tuple[CompiledPart, ...]
+
+
+class CompiledVariable(NamedTuple):
+    name: str
+    sentences: Tuple[CompiledSentence, ...]
+
+
+class CompiledIntentDefinition(NamedTuple):
+    name: str
+    variables: Tuple[CompiledVariable, ...]
+    sentences: Tuple[CompiledSentence, ...]
+    # the SetParameters of the sentences, followed by those of the variables
+    set_parameters: Tuple[CompiledSetParameter, ...]
+    content_hash: str
+
+
+def create_compiled_intent_definition(name: str, variables: Tuple[CompiledVariable, ...],
+                                      sentences: Tuple[CompiledSentence, ...]) \
+        -> CompiledIntentDefinition:
+    """Creates a CompiledIntentDefinition from compiled parts, for passes which transform
+    compiled IntentDefinitions"""
+    all_sentences = sentences + tuple(sentence for variable in variables
+                                      for sentence in variable.sentences)
+    set_parameters = tuple(part for sentence in all_sentences for part in sentence
+                           if isinstance(part, CompiledSetParameter))
+    content = repr((name, variables, sentences)).encode("utf-8")
+    return CompiledIntentDefinition(name, variables, sentences, set_parameters,
+                                    hashlib.sha256(content).hexdigest())
+
+
+# An IntentDefinition, or an IntentDefinition which is already compiled
+AnyIntentDefinition = Union[IntentDefinition, CompiledIntentDefinition]
+
+
+class IntentDefinitionCompiler(object):
+    """Compiles IntentDefinitions into CompiledIntentDefinitions. Within one call to compile_all,
+    equal SetParameters and equal lists of possible values are only stored once, however many
+    IntentDefinitions use them, like the list of rooms shared by the Hue IntentHandlers. The
+    compiler keeps nothing between calls, so a long-lived compiler doesn't hold on to values
+    which are no longer used."""
+
+    def compile(self, intent_definition: AnyIntentDefinition) -> CompiledIntentDefinition:
+        """Compiles the IntentDefinition. A CompiledIntentDefinition, like the ones from a
+        DefinitionSnapshot, is returned as is."""
+        return self.compile_all([intent_definition])[0]
+
+    def compile_all(self, intent_definitions: Sequence[AnyIntentDefinition]) \
+            -> List[CompiledIntentDefinition]:
+        compilation = _Compilation()
+        return [compilation.compile(intent_definition) for intent_definition in intent_definitions]
+
+
+class _Compilation(object):
+    """A single compile_all call, with the tables used to share equal values"""
+
+    def __init__(self):
+        self._values: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._set_parameters: Dict[CompiledSetParameter, CompiledSetParameter] = {}
+
+    def compile(self, intent_definition: AnyIntentDefinition) -> CompiledIntentDefinition:
+        if isinstance(intent_definition, CompiledIntentDefinition):
+            return intent_definition
+        sentences = tuple(self._compile_sentence(sentence)
+                          for sentence in intent_definition.sentences)
+        variables = tuple(self._compile_variable(variable)
+                          for variable in intent_definition.variables)
+        return create_compiled_intent_definition(intent_definition.name, variables, sentences)
+
+    def _compile_variable(self, variable: Variable) -> CompiledVariable:
+        return CompiledVariable(variable.name, tuple(self._compile_sentence(sentence)
+                                                     for sentence in variable.sentences))
+
+    def _compile_sentence(self, sentence: Sentence) -> CompiledSentence:
+        return tuple(self._compile_part(part) for part in sentence)
+
+    def _compile_part(self, part) -> CompiledPart:
+        if isinstance(part, StringParameter):
+            return CompiledString(part.text, part.optional, part.substitute)
+        if isinstance(part, SetParameter):
+            values = tuple(part.possible_values)
+            values = self._values.setdefault(values, values)
+            compiled = CompiledSetParameter(part.name, part.return_value, part.optional, values)
+            return self._set_parameters.setdefault(compiled, compiled)
+        if isinstance(part, NumberRangeParameter):
+            return CompiledNumberRangeParameter(part.name, part.return_value, part.optional,
+                                                part.lower_value, part.upper_value)
+        if isinstance(part, VariableParameter):
+            return CompiledVariableParameter(part.name, part.return_value, part.optional)
+        raise TypeError("Unknown sentence part: {!r}".format(part))
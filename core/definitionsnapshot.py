@@ -0,0 +1,56 @@
+"""This module persists the compiled IntentDefinitions of the IntentHandlers, so they are known
+right after a restart, before the IntentHandlers are created again. Creating some IntentHandlers
+takes a while, because they fetch their parameters, like the rooms of the Hue bridge, from live
+services."""
+import logging
+import os
+import pickle
+from typing import List
+
+from core.compiledintentdefinition import CompiledIntentDefinition
+from core.utils.classname import fullname
+
+# Increase when the compiled IntentDefinitions change, so older snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+
+class DefinitionSnapshot(object):
+    """A pickle file with compiled IntentDefinitions. Equal lists of values are only stored
+    once, because the IntentDefinitionCompiler shares them and pickle keeps them shared.
+
+    The file is written by this program only; don't load snapshots from untrusted sources."""
+
+    def __init__(self, snapshot_file: str):
+        self._logger = logging.getLogger(fullname(self))
+        self._snapshot_file = snapshot_file
+
+    @property
+    def snapshot_file(self) -> str:
+        return self._snapshot_file
+
+    def load(self) -> List[CompiledIntentDefinition]:
+        """Returns the IntentDefinitions of the snapshot. Returns an empty list when there is no
+        snapshot, or when it can't be read or was written by another version."""
+        if not os.path.exists(self._snapshot_file):
+            return []
+        try:
+            with open(self._snapshot_file, "rb") as snapshot_file:
+                snapshot = pickle.load(snapshot_file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) \
+                as exception:
+            self._logger.warning("Ignoring unreadable snapshot %s: %s", self._snapshot_file,
+                                 exception)
+            return []
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+            self._logger.warning("Ignoring snapshot %s of another version", self._snapshot_file)
+            return []
+        return list(snapshot["intent_definitions"])
+
+    def save(self, intent_definitions: List[CompiledIntentDefinition]):
+        """Replaces the snapshot with the IntentDefinitions. The snapshot is replaced at once, so
+        it is never left half written."""
+        snapshot = {"version": SNAPSHOT_VERSION, "intent_definitions": tuple(intent_definitions)}
+        temporary_file = self._snapshot_file + ".tmp"
+        with open(temporary_file, "wb") as snapshot_file:
+            pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_file, self._snapshot_file)
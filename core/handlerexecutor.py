@@ -0,0 +1,132 @@
+"""This module contains the HandlerExecutor, which runs the Intents of one IntentHandler on a
+bounded pool of worker threads of its own."""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+from core.intent import Intent
+from core.intenthandler import IntentHandler
+from core.metrics import Histogram, REGISTRY
+from core.utils.classname import fullname
+
+
+class HandlerBusyException(Exception):
+    pass
+
+
+def handler_histogram(intent_handler: IntentHandler) -> Histogram:
+    """Returns the histogram with the execution times of the IntentHandler"""
+    return REGISTRY.histogram("intent_handler_seconds",
+                              "Time spent by an IntentHandler handling an Intent",
+                              {"handler": fullname(intent_handler)})
+
+
+class HandlerStatistics(object):
+    """Snapshot of the statistics of a HandlerExecutor"""
+    def __init__(self, queue_depth: int, handled: int, rejected: int, timed_out: int,
+                 total_latency: float, max_latency: float):
+        self._queue_depth = queue_depth
+        self._handled = handled
+        self._rejected = rejected
+        self._timed_out = timed_out
+        self._total_latency = total_latency
+        self._max_latency = max_latency
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of Intents waiting for a free worker"""
+        return self._queue_depth
+
+    @property
+    def handled(self) -> int:
+        """Number of Intents the IntentHandler finished handling"""
+        return self._handled
+
+    @property
+    def rejected(self) -> int:
+        """Number of Intents which were refused, because too many Intents were waiting"""
+        return self._rejected
+
+    @property
+    def timed_out(self) -> int:
+        """Number of Intents for which the IntentHandler didn't respond in time"""
+        return self._timed_out
+
+    @property
+    def average_latency(self) -> float:
+        """Average time in seconds the IntentHandler needed to handle an Intent"""
+        if self._handled == 0:
+            return 0.0
+        return self._total_latency / self._handled
+
+    @property
+    def max_latency(self) -> float:
+        """Longest time in seconds the IntentHandler needed to handle an Intent"""
+        return self._max_latency
+
+
+class HandlerExecutor(object):
+    """Runs handle_intent of one IntentHandler on a bounded number of worker threads. A hanging
+    IntentHandler can therefore only block its own workers, never those of other IntentHandlers.
+
+    When more than max_queue_depth Intents are waiting for a worker, new Intents are refused with
+    a HandlerBusyException instead of piling up behind the hanging IntentHandler. Intents whose
+    caller stopped waiting are cancelled while they wait for a worker. An Intent which is being
+    handled can't be interrupted though: its worker stays busy until handle_intent returns."""
+
+    def __init__(self, intent_handler: IntentHandler, max_workers: int = 1,
+                 max_queue_depth: int = 8):
+        self._intent_handler = intent_handler
+        self._max_queue_depth = max_queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=fullname(intent_handler))
+        self._histogram = handler_histogram(intent_handler)
+        self._lock = Lock()
+        self._queue_depth = 0
+        self._handled = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def submit(self, intent: Intent) -> Future:
+        """Queues the Intent for the IntentHandler and returns a Future for its response"""
+        with self._lock:
+            if self._queue_depth >= self._max_queue_depth:
+                self._rejected += 1
+                raise HandlerBusyException("{} has too many pending intents".format(
+                    fullname(self._intent_handler)))
+            self._queue_depth += 1
+        return self._executor.submit(self._handle_intent, intent)
+
+    def record_timeout(self, future: Future) -> bool:
+        """Registers that a caller stopped waiting for the response of the IntentHandler, and
+        cancels the Intent when it is still waiting for a worker. Returns whether it was
+        cancelled."""
+        cancelled = future.cancel()
+        with self._lock:
+            self._timed_out += 1
+            if cancelled:
+                self._queue_depth -= 1
+        return cancelled
+
+    def _handle_intent(self, intent: Intent):
+        with self._lock:
+            self._queue_depth -= 1
+        start = time.perf_counter()
+        try:
+            return self._intent_handler.handle_intent(intent)
+        finally:
+            latency = time.perf_counter() - start
+            self._histogram.observe(latency)
+            with self._lock:
+                self._handled += 1
+                self._total_latency += latency
+                self._max_latency = max(self._max_latency, latency)
+
+    @property
+    def statistics(self) -> HandlerStatistics:
+        """Returns a snapshot of the statistics of the HandlerExecutor"""
+        with self._lock:
+            return HandlerStatistics(self._queue_depth, self._handled, self._rejected,
+                                     self._timed_out, self._total_latency, self._max_latency)
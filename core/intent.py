@@ -1,14 +1,36 @@
 """This module contains the Intent class, which is a representation of an intent from the user
 towards their voice assistant"""
-from typing import Dict
+from types import MappingProxyType
+from typing import Mapping
+
+_NO_PARAMETERS: Mapping[str, str] = MappingProxyType({})
 
 
 class Intent:
-    """Represents an Intent as spoken by the user towards their voice assistant."""
-    def __init__(self, name: str, full_intent_string: str, parameters: Dict[str, str] = {}):
-        self._name = name
-        self._parameters = parameters
-        self._full_intent_string = full_intent_string
+    """Represents an Intent as spoken by the user towards their voice assistant.
+
+    Intents are immutable, so the same Intent can safely be passed to several threads. The
+    parameters are copied into a read-only mapping when the Intent is constructed."""
+    __slots__ = ("_name", "_parameters", "_full_intent_string")
+    _name: str
+    _parameters: Mapping[str, str]
+    _full_intent_string: str
+
+    def __init__(self, name: str, full_intent_string: str, parameters: Mapping[str, str] = None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_parameters",
+                           MappingProxyType(dict(parameters)) if parameters else _NO_PARAMETERS)
+        object.__setattr__(self, "_full_intent_string", full_intent_string)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Intent objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Intent objects are immutable")
+
+    def __repr__(self):
+        return "Intent({!r}, {!r}, {!r})".format(self._name, self._full_intent_string,
+                                                 dict(self._parameters))
 
     @property
     def name(self) -> str:
@@ -16,9 +38,9 @@ class Intent:
         return self._name
 
     @property
-    def parameters(self) -> Dict[str, str]:
-        """Dictionary containing the parameters associated with an Intent.
-        The dictionary typically contains a set of keywords and their responsive values,
+    def parameters(self) -> Mapping[str, str]:
+        """Read-only mapping containing the parameters associated with an Intent.
+        The mapping typically contains a set of keywords and their responsive values,
         as they were given in the voice command by the user.
 
         Example:
@@ -1,9 +1,12 @@
 from abc import ABC
 from typing import List
 
-from core.intentdefinition import IntentDefinition
+from core.compiledintentdefinition import AnyIntentDefinition
 
 
 class IntentDefinitionSource(ABC):
-    def get_intent_definitions(self) -> List[IntentDefinition]:
+    def get_intent_definitions(self) -> List[AnyIntentDefinition]:
+        """Returns IntentDefinitions, or CompiledIntentDefinitions which are already compiled,
+        like the ones from a DefinitionSnapshot. Use an IntentDefinitionCompiler to get
+        CompiledIntentDefinitions for both."""
         pass
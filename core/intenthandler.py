@@ -1,10 +1,11 @@
 """This module contains the IntentHandler abstract base class, which can be used to define an
 IntentHandler."""
 from abc import ABC
-from typing import List
+from typing import Dict, List
 
 from core.intent import Intent
 from core.intentdefinition import IntentDefinition, Sentence
+from core.responsecache import CachePolicy
 
 
 class IntentHandler(ABC):
@@ -12,14 +13,16 @@ class IntentHandler(ABC):
     The IntentHandler base class is meant to provide a common interface for all classes that
     handle Intents.
 
-    It defines 1 method and 1 property:
+    It defines 1 method and 2 properties:
     - handle_intent
     - intent_definitions
+    - cache_policies
 
     NOTE: Currently all IntentHandlers have to be subscribed to the IntentHandlerManager.
     This is done in the IntentHandlerManagerFactory class in factories.intenthandlermanagerfactory.
     """
     _intent_definitions: List[IntentDefinition] = []
+    _cache_policies: Dict[str, CachePolicy] = {}
 
     def __init__(self):
         pass
@@ -31,6 +34,14 @@ class IntentHandler(ABC):
         core.intentdefinition.IntentDefinition class"""
         return self._intent_definitions
 
+    @property
+    def cache_policies(self) -> Dict[str, CachePolicy]:
+        """Returns a CachePolicy by Intent name, for the Intents whose response only depends on
+        a few of their parameters and may be reused for a while. The IntentHandlerManager
+        answers such Intents from its ResponseCache, without calling handle_intent. By
+        default no responses are cached."""
+        return self._cache_policies
+
     def handle_intent(self, intent: Intent) -> (str, bool):
         """Is called by the IntentHandlerManager when it receives an Intent, of which the
         IntentHandler published an IntentDefinition"""
@@ -1,37 +1,109 @@
 import logging
-from typing import Dict, List
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Event
+from typing import Dict, List, Optional
 
+from core.compiledintentdefinition import AnyIntentDefinition, CompiledIntentDefinition, \
+    IntentDefinitionCompiler
+from core.definitionsnapshot import DefinitionSnapshot
+from core.handlerexecutor import HandlerBusyException, HandlerExecutor, HandlerStatistics, \
+    handler_histogram
 from core.intent import Intent
-from core.intentdefinition import IntentDefinition
 from core.intentdefinitionsource import IntentDefinitionSource
 from core.intenthandler import IntentHandler
+from core.metrics import REGISTRY
 from core.newintentobserver import NewIntentObserver
+from core.responsecache import CachePolicy, CacheStatistics, ResponseCache
 from core.speaker import Speaker
+from core.speechoutput import SpeechOutput
 from core.utils.classname import fullname
 
+DISPATCH_TIME = REGISTRY.histogram("intent_dispatch_seconds",
+                                   "Time spent looking up the IntentHandler of an Intent")
+
 
 class IntentHandlerManager(IntentDefinitionSource, NewIntentObserver):
     """The IntentHandlerManager is the central hub of the program. It receives new Intents from a
     NewIntentSubject and passes the Intent to the appropriate IntentHandler.
 
-    The IntentHandlerManager also directs responses from the IntentHandlers to the Speaker."""
+    The IntentHandlerManager also directs responses from the IntentHandlers to the Speaker.
+
+    By default IntentHandlers are called on the thread which delivers the Intent. When a
+    handler_timeout is given, every IntentHandler gets a HandlerExecutor with worker threads of
+    its own instead, and the IntentHandlerManager waits at most handler_timeout seconds for a
+    response. A hanging IntentHandler then only delays its own Intents, and Intents which timed
+    out while waiting for a worker are cancelled, so they don't pile up behind it. A running
+    IntentHandler can't be interrupted.
+
+    With asynchronous_speech, responses are handed to a SpeechOutput which speaks them on a
+    thread of its own, so update() returns before the response was synthesized and played.
+    Only when the dialog continues, update() waits until the response was spoken, because the
+    user can't answer before that, but at most speech_timeout seconds, so a hanging Speaker
+    doesn't hold on to the thread which delivered the Intent. Spoken means until the end of the
+    playback, when the Speaker reports how long it plays (see SpeechOutput), so Rhasspy doesn't
+    start listening while the response is still playing.
+
+    Responses to Intents for which the IntentHandler declares a CachePolicy are kept in a
+    ResponseCache, and served from there while they are valid.
 
-    def __init__(self, speaker: Speaker = None):
+    With a DefinitionSnapshot, the IntentDefinitions of the previous run are available right
+    away, while the IntentHandlers are still being created and subscribed. Intents of these
+    IntentDefinitions are answered with a request to try again later until their IntentHandler
+    is subscribed. complete_subscriptions replaces the snapshot with the IntentDefinitions of
+    the subscribed IntentHandlers."""
+
+    STARTING_UP_RESPONSE = "I'm still starting up, please try again in a moment"
+    DEFAULT_SPEECH_TIMEOUT = 30.0
+
+    def __init__(self, speaker: Speaker = None, handler_timeout: float = None,
+                 max_workers_per_handler: int = 1, max_pending_intents_per_handler: int = 8,
+                 asynchronous_speech: bool = False, snapshot: DefinitionSnapshot = None,
+                 speech_timeout: float = DEFAULT_SPEECH_TIMEOUT):
         self._logger = logging.getLogger(fullname(self))
         self._intent_handlers: Dict[str, IntentHandler] = {}
         self._speaker = speaker
+        self._speech_output = SpeechOutput(speaker) if speaker and asynchronous_speech else None
+        self._handler_timeout = handler_timeout
+        self._speech_timeout = speech_timeout
+        self._max_workers_per_handler = max_workers_per_handler
+        self._max_pending_intents_per_handler = max_pending_intents_per_handler
+        self._handler_executors: Dict[IntentHandler, HandlerExecutor] = {}
+        self._cache_policies: Dict[str, CachePolicy] = {}
+        self._response_cache = ResponseCache()
+        self._snapshot = snapshot
+        self._snapshot_definitions: Dict[str, CompiledIntentDefinition] = {
+            intent_definition.name: intent_definition
+            for intent_definition in (snapshot.load() if snapshot else [])}
+        self._subscriptions_complete = Event()
 
     def update(self, intent: Intent) -> str:
         """Implements NewIntentObserver.update. Gets called when the NewIntentSubject has a new
         Intent for its observers."""
+        received_at = time.time()
         continue_dialog = False
-        if intent.name in self._intent_handlers.keys():
+        with DISPATCH_TIME.time():
+            intent_handler_found = intent.name in self._intent_handlers
+        if intent_handler_found:
             text_to_speak, continue_dialog = self._handle_intent(intent)
+        elif intent.name in self._snapshot_definitions:
+            self._logger.info("Intent Manager: intenthandler for %s isn't subscribed yet",
+                              intent.name)
+            text_to_speak = self.STARTING_UP_RESPONSE
         else:
             self._logger.info("Intent Manager: no intenthandler registered for: %s", intent.name)
             text_to_speak = "I do not know how to %s" % intent.full_intent_string
+        if self._speech_output:
+            speech_job = self._speech_output.enqueue(text_to_speak, received_at)
+            if continue_dialog and not speech_job.wait(self._speech_timeout):
+                self._logger.warning("Response to intent %s wasn't spoken within %s seconds, "
+                                     "continuing the dialog anyway", intent.name,
+                                     self._speech_timeout)
+            return "", continue_dialog
         if self._speaker:
-            self._speaker.speak_text(text_to_speak)
+            playback_duration = self._speaker.speak_text(text_to_speak)
+            if continue_dialog and playback_duration:
+                time.sleep(playback_duration)
             return "", continue_dialog
         else:
             return text_to_speak, continue_dialog
@@ -40,10 +112,34 @@ class IntentHandlerManager(IntentDefinitionSource, NewIntentObserver):
         result = ""
         self._logger.info("Intent Manager: dispatching intent '%s'", intent.name)
         continue_dialog = False
+        cache_policy = self._cache_policies.get(intent.name)
+        if cache_policy:
+            cached_response = self._response_cache.get(intent, cache_policy)
+            if cached_response:
+                self._logger.info("Intent Manager: answered intent '%s' from the cache",
+                                  intent.name)
+                return cached_response
         try:
-            response, continue_dialog = self._intent_handlers[intent.name].handle_intent(intent)
+            if self._handler_timeout is None:
+                intent_handler = self._intent_handlers[intent.name]
+                with handler_histogram(intent_handler).time():
+                    response, continue_dialog = intent_handler.handle_intent(intent)
+            else:
+                response, continue_dialog = self._handle_intent_in_executor(intent)
             if response:
                 result = response
+            if cache_policy:
+                self._response_cache.put(intent, cache_policy, (result, continue_dialog))
+        except HandlerBusyException as exception:
+            self._logger.warning("Intent handler [%s] is busy: %s",
+                                 fullname(self._intent_handlers[intent.name]), exception)
+            result = "I'm still busy with your previous requests, please try again later"
+        except FutureTimeoutError:
+            self._logger.warning("Intent handler [%s] didn't respond within %s seconds",
+                                 fullname(self._intent_handlers[intent.name]),
+                                 self._handler_timeout)
+            result = "Sorry, it took too long to handle your request: %s" % \
+                     intent.full_intent_string
         except Exception as exception:
             self._logger.info("Exception occurred in intent handler [%s]: %s",
                               fullname(self._intent_handlers[intent.name]), exception)
@@ -51,6 +147,16 @@ class IntentHandlerManager(IntentDefinitionSource, NewIntentObserver):
                      intent.full_intent_string
         return result, continue_dialog
 
+    def _handle_intent_in_executor(self, intent: Intent):
+        executor = self._handler_executors[self._intent_handlers[intent.name]]
+        future = executor.submit(intent)
+        try:
+            return future.result(timeout=self._handler_timeout)
+        except FutureTimeoutError:
+            # an Intent which waits for a worker is dropped, a running one keeps its worker busy
+            executor.record_timeout(future)
+            raise
+
     def subscribe_intent_handler(self, intent_handler: IntentHandler):
         """Subscribe a new IntentHandler that can handle Intents. Stores the IntentDefinitions
         exposed by the IntentHandler, so they can be used later on when a new Intent comes in.
@@ -60,12 +166,67 @@ class IntentHandlerManager(IntentDefinitionSource, NewIntentObserver):
             self._logger.info("Added subscription on intent [%s] for %s",
                               intent_definition.name, intent_handler)
             self._intent_handlers[intent_definition.name] = intent_handler
+            self._cache_policies.pop(intent_definition.name, None)
+        for intent_name, cache_policy in intent_handler.cache_policies.items():
+            self._logger.info("Caching responses to intent [%s] for %s seconds",
+                              intent_name, cache_policy.ttl)
+            self._cache_policies[intent_name] = cache_policy
+        if self._handler_timeout is not None and intent_handler not in self._handler_executors:
+            self._handler_executors[intent_handler] = HandlerExecutor(
+                intent_handler, self._max_workers_per_handler,
+                self._max_pending_intents_per_handler)
+
+    def complete_subscriptions(self):
+        """Is called when all IntentHandlers are subscribed. From then on, only the
+        IntentDefinitions of the subscribed IntentHandlers are used, and they are saved as the
+        new snapshot."""
+        self._snapshot_definitions = {}
+        if self._snapshot:
+            intent_definitions = IntentDefinitionCompiler().compile_all(
+                self.get_intent_definitions())
+            try:
+                self._snapshot.save(intent_definitions)
+            except OSError as exception:
+                self._logger.warning("Couldn't save the snapshot %s: %s",
+                                     self._snapshot.snapshot_file, exception)
+        self._subscriptions_complete.set()
+
+    @property
+    def subscriptions_complete(self) -> bool:
+        """Whether all IntentHandlers are subscribed"""
+        return self._subscriptions_complete.is_set()
+
+    def wait_until_subscriptions_complete(self, timeout: float = None) -> bool:
+        """Blocks until all IntentHandlers are subscribed, returns whether they are"""
+        return self._subscriptions_complete.wait(timeout)
+
+    @property
+    def speech_output(self) -> Optional[SpeechOutput]:
+        """The SpeechOutput which speaks the responses, or None when responses are spoken on the
+        thread which delivered the Intent"""
+        return self._speech_output
+
+    @property
+    def cache_statistics(self) -> Dict[str, CacheStatistics]:
+        """Returns the hits and misses of the ResponseCache, by Intent name"""
+        return self._response_cache.statistics
+
+    @property
+    def handler_statistics(self) -> Dict[str, HandlerStatistics]:
+        """Returns the statistics of the HandlerExecutor of every IntentHandler, by the full
+        class name of the IntentHandler. Empty when IntentHandlers are called inline."""
+        return {fullname(intent_handler): executor.statistics
+                for intent_handler, executor in self._handler_executors.items()}
 
-    def get_intent_definitions(self) -> List[IntentDefinition]:
+    def get_intent_definitions(self) -> List[AnyIntentDefinition]:
         """Returns all IntentDefinition of all IntentHandlers which are subscribed to the
-        IntentHandlerManager"""
-        all_intent_definitions = []
+        IntentHandlerManager, followed by the IntentDefinitions of the snapshot whose
+        IntentHandler isn't subscribed yet"""
+        all_intent_definitions: List[AnyIntentDefinition] = []
         for intent_handler in set(self._intent_handlers.values()):
             intent_definitions = intent_handler.intent_definitions
             all_intent_definitions.extend(intent_definitions)
+        all_intent_definitions.extend(
+            intent_definition for name, intent_definition in self._snapshot_definitions.items()
+            if name not in self._intent_handlers)
         return all_intent_definitions
@@ -0,0 +1,273 @@
+"""This module contains the IntentMatcher, which recognizes Intents in a text without Rhasspy.
+It is compiled from the same IntentDefinitions that are used to train Rhasspy, so typed
+commands and automations can be handled locally."""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.compiledintentdefinition import CompiledIntentDefinition, \
+    CompiledNumberRangeParameter, CompiledSentence, CompiledSetParameter, CompiledString, \
+    CompiledVariable, CompiledVariableParameter, IntentDefinitionCompiler
+from core.intent import Intent
+from core.intentdefinitionsource import IntentDefinitionSource
+from core.metrics import REGISTRY
+from core.sentencetemplate import SentenceTemplateParser, TemplateSequence, \
+    TemplateSyntaxError, TemplateWord, normalize_words
+from core.utils.classname import fullname
+
+MATCH_TIME = REGISTRY.histogram("intent_match_seconds",
+                                "Time spent matching a text against the IntentDefinitions")
+
+# Actions on the epsilon transitions of the automaton:
+# ("set", name, value) sets a parameter, ("begin", name) and ("end", name) mark the words
+# which are the value of a Variable
+_Action = Optional[Tuple[str, ...]]
+_Captures = Tuple[Tuple, ...]
+
+
+class _State(object):
+    __slots__ = ("words", "numbers", "epsilons", "accepts")
+
+    def __init__(self):
+        self.words: Dict[str, List["_State"]] = {}
+        self.numbers: List[Tuple[int, int, Optional[str], "_State"]] = []
+        self.epsilons: List[Tuple[_Action, "_State"]] = []
+        self.accepts: Optional[str] = None
+
+
+class _IntentAutomaton(object):
+    """Nondeterministic automaton over words, with one path per distinct sentence. The words at
+    the start of the sentences form a trie, so sentences only get paths of their own from the
+    first parameter or template on. A text is matched by following all paths at once, so the
+    time it takes depends on the number of words and on the number of paths which accept them,
+    not on the total number of IntentDefinitions."""
+
+    def __init__(self, intent_definitions: List[CompiledIntentDefinition]):
+        self._logger = logging.getLogger(fullname(self))
+        root = _State()
+        self._prefix_states = {id(root)}
+        added_sentences = set()
+        for intent_definition in intent_definitions:
+            if intent_definition.name == "":
+                continue
+            variables = {variable.name: variable for variable in intent_definition.variables}
+            for sentence in intent_definition.sentences:
+                # when an earlier IntentDefinition has the same sentence, that one always wins
+                key = (sentence, intent_definition.variables)
+                if key in added_sentences:
+                    continue
+                added_sentences.add(key)
+                try:
+                    end = self._add_sentence(root, sentence, variables, share_prefix=True)
+                except TemplateSyntaxError as exception:
+                    self._logger.warning("Skipping a sentence of %s: %s", intent_definition.name,
+                                         exception)
+                    continue
+                if end.accepts is None:
+                    end.accepts = intent_definition.name
+        # the paths which start at the root only depend on the first word
+        self._initial_threads = self._closure([(root, ())], 0)
+        self._threads_by_first_word: Dict[str, List[Tuple[_State, _Captures]]] = {}
+        for state, captures in self._initial_threads:
+            for word, targets in state.words.items():
+                self._threads_by_first_word.setdefault(word, []).extend(
+                    (target, captures) for target in targets)
+
+    def _add_sentence(self, state: _State, sentence: CompiledSentence,
+                      variables: Dict[str, CompiledVariable], share_prefix=False,
+                      expanding: Tuple[str, ...] = ()) -> _State:
+        """Adds the states for the sentence after the state and returns the last one. With
+        share_prefix, the words at the start of the sentence are added as a trie, which is
+        shared with the other sentences starting with the same words. expanding holds the
+        variables whose sentences are being added."""
+        for part in sentence:
+            words = self._get_plain_words(part) if share_prefix else None
+            if words is None:
+                share_prefix = False
+                state = self._add_part(state, part, variables, expanding)
+            else:
+                for word in words:
+                    state = self._add_prefix_word(state, word)
+        return state
+
+    @staticmethod
+    def _get_plain_words(part) -> Optional[List[str]]:
+        if not isinstance(part, CompiledString) or part.optional:
+            return None
+        words = []
+        for item in SentenceTemplateParser.parse(part.text).items:
+            if not isinstance(item, TemplateWord):
+                return None
+            words.append(item.text)
+        return words
+
+    def _add_prefix_word(self, state: _State, word: str) -> _State:
+        for target in state.words.get(word, ()):
+            if id(target) in self._prefix_states:
+                return target
+        target = self._add_word(state, word)
+        self._prefix_states.add(id(target))
+        return target
+
+    def _add_part(self, state: _State, part, variables: Dict[str, CompiledVariable],
+                  expanding: Tuple[str, ...] = ()) -> _State:
+        end = _State()
+        if isinstance(part, CompiledString):
+            last = self._add_template(state, SentenceTemplateParser.parse(part.text))
+            last.epsilons.append((None, end))
+        elif isinstance(part, CompiledSetParameter):
+            for value in part.possible_values:
+                value_state = _State()
+                state.epsilons.append((("set", part.name, value) if part.return_value else None,
+                                       value_state))
+                for word in normalize_words(value):
+                    value_state = self._add_word(value_state, word)
+                value_state.epsilons.append((None, end))
+        elif isinstance(part, CompiledNumberRangeParameter):
+            state.numbers.append((part.lower_value, part.upper_value,
+                                  part.name if part.return_value else None, end))
+        elif isinstance(part, CompiledVariableParameter):
+            variable = variables.get(part.name)
+            if variable is None:
+                self._logger.warning("Unknown variable <%s>", part.name)
+            elif part.name in expanding:
+                # like in the GrammarAnalyzer, a variable can't refer to itself
+                self._logger.warning("Variable <%s> refers to itself, skipping the reference",
+                                     part.name)
+            else:
+                begin = _State()
+                state.epsilons.append((("begin", part.name) if part.return_value else None,
+                                       begin))
+                variable_end = _State()
+                for sentence in variable.sentences:
+                    sentence_start = _State()
+                    begin.epsilons.append((None, sentence_start))
+                    self._add_sentence(sentence_start, sentence, variables,
+                                       expanding=expanding + (part.name,)).epsilons.append(
+                        (None, variable_end))
+                variable_end.epsilons.append((("end", part.name) if part.return_value else None,
+                                              end))
+        if part.optional:
+            state.epsilons.append((None, end))
+        return end
+
+    def _add_template(self, state: _State, template) -> _State:
+        if isinstance(template, TemplateWord):
+            return self._add_word(state, template.text)
+        if isinstance(template, TemplateSequence):
+            for item in template.items:
+                state = self._add_template(state, item)
+            return state
+        end = _State()
+        for option in template.options:
+            option_start = _State()
+            state.epsilons.append((None, option_start))
+            self._add_template(option_start, option).epsilons.append((None, end))
+        if template.optional:
+            state.epsilons.append((None, end))
+        return end
+
+    @staticmethod
+    def _add_word(state: _State, word: str) -> _State:
+        target = _State()
+        state.words.setdefault(word, []).append(target)
+        return target
+
+    @staticmethod
+    def _closure(threads: List[Tuple[_State, _Captures]],
+                 position: int) -> List[Tuple[_State, _Captures]]:
+        """Follows the epsilon transitions of the threads. When several threads reach the same
+        state, the first one wins, which keeps the number of threads bounded by the number of
+        states."""
+        result = []
+        visited = set()
+        stack = list(reversed(threads))
+        while stack:
+            state, captures = stack.pop()
+            if id(state) in visited:
+                continue
+            visited.add(id(state))
+            result.append((state, captures))
+            for action, target in reversed(state.epsilons):
+                if action is None:
+                    stack.append((target, captures))
+                else:
+                    stack.append((target, captures + (action + (position,),)))
+        return result
+
+    def match(self, words: List[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Returns the name of the IntentDefinition and the parameters, or None"""
+        threads = self._initial_threads
+        for position, word in enumerate(words):
+            if position == 0:
+                next_threads = list(self._threads_by_first_word.get(word, ()))
+            else:
+                next_threads = [(target, captures) for state, captures in threads
+                                for target in state.words.get(word, ())]
+            number = _to_number(word)
+            if number is not None:
+                for state, captures in threads:
+                    for lower, upper, name, target in state.numbers:
+                        if lower <= number <= upper:
+                            next_threads.append(
+                                (target, captures + (("set", name, number, position),))
+                                if name else (target, captures))
+            if not next_threads:
+                return None
+            threads = self._closure(next_threads, position + 1)
+        for state, captures in threads:
+            if state.accepts is not None:
+                return state.accepts, _to_parameters(captures, words)
+        return None
+
+
+def _to_number(word: str) -> Optional[int]:
+    if word.lstrip("-").isdigit():
+        return int(word)
+    return None
+
+
+def _to_parameters(captures: _Captures, words: List[str]) -> Dict[str, Any]:
+    parameters = {}
+    begins = {}
+    for capture in captures:
+        if capture[0] == "set":
+            parameters[capture[1]] = capture[2]
+        elif capture[0] == "begin":
+            begins[capture[1]] = capture[2]
+        else:
+            parameters[capture[1]] = " ".join(words[begins.pop(capture[1]):capture[2]])
+    return parameters
+
+
+class IntentMatcher(object):
+    """Recognizes Intents in texts, based on the IntentDefinitions of an IntentDefinitionSource.
+    The strings in the sentences may use the template syntax of Rhasspy (see
+    core.sentencetemplate), SetParameters match one of their values, NumberRangeParameters a
+    number within their range and VariableParameters one of the sentences of their Variable.
+    Parameters are only part of the Intent when they have a return value, like in Rhasspy.
+
+    Texts are compared word by word, ignoring case and punctuation. Call refresh when the
+    IntentDefinitions changed."""
+
+    def __init__(self, intent_definition_source: IntentDefinitionSource):
+        self._intent_definition_source = intent_definition_source
+        self._compiler = IntentDefinitionCompiler()
+        self._automaton = self._create_automaton()
+
+    def refresh(self):
+        """Compiles the current IntentDefinitions of the IntentDefinitionSource"""
+        self._automaton = self._create_automaton()
+
+    def _create_automaton(self) -> _IntentAutomaton:
+        intent_definitions = self._compiler.compile_all(
+            self._intent_definition_source.get_intent_definitions())
+        return _IntentAutomaton(intent_definitions)
+
+    def match(self, text: str) -> Optional[Intent]:
+        """Returns the Intent for the text, or None when no IntentDefinition matches it"""
+        with MATCH_TIME.time():
+            match = self._automaton.match(normalize_words(text))
+        if match is None:
+            return None
+        name, parameters = match
+        return Intent(name, text.strip(), parameters)
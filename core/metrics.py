@@ -0,0 +1,228 @@
+"""This module contains light-weight metrics, which can be rendered in the Prometheus text
+format. They are used to see where the time between a voice command and its response goes."""
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra_label: Tuple[str, str] = None) -> str:
+    all_labels = list(labels)
+    if extra_label:
+        all_labels.append(extra_label)
+    if not all_labels:
+        return ""
+    escaped = ['{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"')
+                                .replace("\n", "\\n")) for name, value in all_labels]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Timer(object):
+    def __init__(self, histogram):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Histogram(object):
+    """Counts observations (typically durations in seconds) in a fixed set of buckets. Observing
+    a value costs one binary search over the buckets, so histograms can be used on the intent
+    path without noticeable overhead."""
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, labels: Labels = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._name = name
+        self._labels = labels
+        self._buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._sum = 0.0
+        self._lock = Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def labels(self) -> Labels:
+        return self._labels
+
+    @property
+    def count(self) -> int:
+        """Total number of observations"""
+        with self._lock:
+            return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        """Sum of all observations"""
+        with self._lock:
+            return self._sum
+
+    def observe(self, value: float):
+        """Adds a value to the histogram"""
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> _Timer:
+        """Returns a context manager which observes the time spent inside the with block"""
+        return _Timer(self)
+
+    def render(self) -> List[str]:
+        """Returns the samples of the histogram in the Prometheus text format"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for upper_bound, count in zip(self._buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append("{}_bucket{} {}".format(
+                self._name, _format_labels(self._labels, ("le", _format_value(upper_bound))),
+                cumulative))
+        lines.append("{}_sum{} {}".format(self._name, _format_labels(self._labels), total))
+        lines.append("{}_count{} {}".format(self._name, _format_labels(self._labels),
+                                            cumulative))
+        return lines
+
+
+class Counter(object):
+    """A value which only goes up, like the number of cache hits"""
+
+    def __init__(self, name: str, labels: Labels = ()):
+        self._name = name
+        self._labels = labels
+        self._value = 0
+        self._lock = Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def labels(self) -> Labels:
+        return self._labels
+
+    @property
+    def value(self) -> int:
+        with self._lock:
+            return self._value
+
+    def inc(self, amount: int = 1):
+        """Increases the counter"""
+        with self._lock:
+            self._value += amount
+
+    def render(self) -> List[str]:
+        """Returns the sample of the counter in the Prometheus text format"""
+        return ["{}{} {}".format(self._name, _format_labels(self._labels), self.value)]
+
+
+class Gauge(object):
+    """A value which can go up and down, like whether Rhasspy is trained"""
+
+    def __init__(self, name: str, labels: Labels = ()):
+        self._name = name
+        self._labels = labels
+        self._value = 0.0
+        self._lock = Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def labels(self) -> Labels:
+        return self._labels
+
+    @property
+    def value(self) -> float:
+        with self._lock:
+            return self._value
+
+    def set(self, value: float):
+        """Sets the gauge to the value"""
+        with self._lock:
+            self._value = float(value)
+
+    def render(self) -> List[str]:
+        """Returns the sample of the gauge in the Prometheus text format"""
+        return ["{}{} {}".format(self._name, _format_labels(self._labels),
+                                 _format_value(self.value))]
+
+
+class MetricsRegistry(object):
+    """Keeps track of all metrics, so they can be rendered together"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._documentation: Dict[str, str] = {}
+        self._types: Dict[str, str] = {}
+        self._metrics: Dict[Tuple[str, Labels], Union[Counter, Gauge, Histogram]] = {}
+
+    def histogram(self, name: str, documentation: str, labels: Dict[str, str] = None,
+                  buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram with the given name and labels. The histogram is created when
+        it doesn't exist yet."""
+        return self._get_or_create(name, documentation, labels, "histogram",
+                                   lambda label_tuple: Histogram(name, label_tuple, buckets))
+
+    def counter(self, name: str, documentation: str, labels: Dict[str, str] = None) -> Counter:
+        """Returns the counter with the given name and labels. The counter is created when it
+        doesn't exist yet."""
+        return self._get_or_create(name, documentation, labels, "counter",
+                                   lambda label_tuple: Counter(name, label_tuple))
+
+    def gauge(self, name: str, documentation: str, labels: Dict[str, str] = None) -> Gauge:
+        """Returns the gauge with the given name and labels. The gauge is created when it
+        doesn't exist yet."""
+        return self._get_or_create(name, documentation, labels, "gauge",
+                                   lambda label_tuple: Gauge(name, label_tuple))
+
+    def _get_or_create(self, name: str, documentation: str, labels: Optional[Dict[str, str]],
+                       metric_type: str, create: Callable[[Labels], Any]):
+        label_tuple: Labels = tuple(sorted(labels.items())) if labels else ()
+        key = (name, label_tuple)
+        with self._lock:
+            if key not in self._metrics:
+                self._documentation.setdefault(name, documentation)
+                self._types.setdefault(name, metric_type)
+                self._metrics[key] = create(label_tuple)
+            return self._metrics[key]
+
+    def render(self) -> str:
+        """Renders all metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = sorted(self._metrics.items(), key=lambda item: item[0])
+            documentation = dict(self._documentation)
+            types = dict(self._types)
+        lines = []
+        current_name = None
+        for (name, _), metric in metrics:
+            if name != current_name:
+                lines.append("# HELP {} {}".format(name, documentation[name]))
+                lines.append("# TYPE {} {}".format(name, types[name]))
+                current_name = name
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
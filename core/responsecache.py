@@ -0,0 +1,106 @@
+"""This module contains the ResponseCache, which lets the IntentHandlerManager answer repeated
+Intents without calling their IntentHandler again."""
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from core.intent import Intent
+from core.metrics import REGISTRY
+
+
+class CachePolicy(object):
+    """Declares that the response to an Intent can be reused for ttl seconds. Only the
+    parameters named in key_parameters distinguish one Intent from another. Without
+    key_parameters, all Intents with the same name share one response."""
+    def __init__(self, ttl: float, key_parameters: List[str] = None):
+        self._ttl = ttl
+        self._key_parameters = tuple(key_parameters) if key_parameters else ()
+
+    @property
+    def ttl(self) -> float:
+        """Number of seconds a response stays valid"""
+        return self._ttl
+
+    @property
+    def key_parameters(self) -> Tuple[str, ...]:
+        """Names of the parameters that are part of the cache key"""
+        return self._key_parameters
+
+
+class CacheStatistics(object):
+    """Number of cache hits and misses for one Intent name"""
+    def __init__(self, hits: int, misses: int):
+        self._hits = hits
+        self._misses = misses
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the lookups which were answered from the cache"""
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else 0.0
+
+
+class ResponseCache(object):
+    """Stores the responses of IntentHandlers for the duration of their CachePolicy. When more
+    than max_entries responses are stored, the oldest ones are dropped."""
+
+    def __init__(self, max_entries: int = 256, clock=time.monotonic):
+        self._max_entries = max_entries
+        self._clock = clock
+        self._lock = Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    @staticmethod
+    def _create_key(intent: Intent, policy: CachePolicy):
+        return intent.name, tuple(intent.parameters.get(name) for name in policy.key_parameters)
+
+    def get(self, intent: Intent, policy: CachePolicy) -> Optional[Tuple[str, bool]]:
+        """Returns the stored response for the Intent, or None when there is no valid one"""
+        key = self._create_key(intent, policy)
+        response = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._hits[intent.name] = self._hits.get(intent.name, 0) + 1
+                response = entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses[intent.name] = self._misses.get(intent.name, 0) + 1
+        if response is not None:
+            REGISTRY.counter("intent_cache_hits_total",
+                             "Number of Intents answered from the response cache",
+                             {"intent": intent.name}).inc()
+        else:
+            REGISTRY.counter("intent_cache_misses_total",
+                             "Number of cacheable Intents which had to be handled by their "
+                             "IntentHandler", {"intent": intent.name}).inc()
+        return response
+
+    def put(self, intent: Intent, policy: CachePolicy, response: Tuple[str, bool]):
+        """Stores the response of the IntentHandler for the Intent"""
+        key = self._create_key(intent, policy)
+        with self._lock:
+            self._entries[key] = (self._clock() + policy.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def statistics(self) -> Dict[str, CacheStatistics]:
+        """Returns the cache hits and misses, by Intent name"""
+        with self._lock:
+            names = set(self._hits) | set(self._misses)
+            return {name: CacheStatistics(self._hits.get(name, 0), self._misses.get(name, 0))
+                    for name in names}
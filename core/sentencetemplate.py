@@ -0,0 +1,88 @@
+"""This module parses the template syntax which IntentHandlers use inside the strings of their
+sentences, like "How (warm | hot | cold) is it" or "Do I have [any] (mail|email)". It is the
+syntax of Rhasspy (https://rhasspy.readthedocs.io/en/latest/training/):
+- (a | b) are alternatives
+- [a] is optional, [a | b] optional alternatives
+- word:substitution is spoken as word
+- every other word has to be spoken as is"""
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple, Union
+
+
+class TemplateWord(NamedTuple):
+    text: str
+
+
+class TemplateAlternatives(NamedTuple):
+    options: Tuple["TemplateSequence", ...]
+    optional: bool
+
+
+class TemplateSequence(NamedTuple):
+    items: Tuple[Union[TemplateWord, TemplateAlternatives], ...]
+
+
+_TOKEN = re.compile(r"[()\[\]|]|[^\s()\[\]|]+")
+_WORD = re.compile(r"[\w'-]+")
+
+
+class TemplateSyntaxError(ValueError):
+    """Raised when the brackets of a template don't match"""
+
+
+def normalize_words(text: str) -> List[str]:
+    """Splits a text into lower case words without punctuation. Used for the templates as well
+    as the texts which are matched against them, so both are compared the same way."""
+    return _WORD.findall(text.lower())
+
+
+class SentenceTemplateParser(object):
+    """Parses one template string into a TemplateSequence"""
+
+    def __init__(self, template: str):
+        self._template = template
+        self._tokens = _TOKEN.findall(template)
+        self._position = 0
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def parse(template: str) -> TemplateSequence:
+        """Returns the TemplateSequence of the template. Raises a TemplateSyntaxError when its
+        brackets don't match. The same strings are used by many sentences, and the result is
+        immutable, so it is cached."""
+        return SentenceTemplateParser(template)._parse_alternatives(closing=None)
+
+    def _parse_alternatives(self, closing):
+        options = [self._parse_sequence()]
+        while self._position < len(self._tokens) and self._tokens[self._position] == "|":
+            self._position += 1
+            options.append(self._parse_sequence())
+        if closing is None:
+            if self._position < len(self._tokens):
+                raise TemplateSyntaxError("Unexpected '{}' in template: {}".format(
+                    self._tokens[self._position], self._template))
+            if len(options) == 1:
+                return options[0]
+            return TemplateSequence((TemplateAlternatives(tuple(options), False),))
+        if self._position >= len(self._tokens) or self._tokens[self._position] != closing:
+            raise TemplateSyntaxError("Missing '{}' in template: {}".format(closing,
+                                                                            self._template))
+        self._position += 1
+        return TemplateAlternatives(tuple(options), closing == "]")
+
+    def _parse_sequence(self) -> TemplateSequence:
+        items = []
+        while self._position < len(self._tokens):
+            token = self._tokens[self._position]
+            if token in ("|", ")", "]"):
+                break
+            self._position += 1
+            if token == "(":
+                items.append(self._parse_alternatives(closing=")"))
+            elif token == "[":
+                items.append(self._parse_alternatives(closing="]"))
+            else:
+                items.extend(TemplateWord(word)
+                             for word in normalize_words(token.split(":", 1)[0]))
+        return TemplateSequence(tuple(items))
@@ -1,4 +1,5 @@
 from abc import ABC
+from typing import Optional
 
 
 class Speaker(ABC):
@@ -7,5 +8,8 @@ class Speaker(ABC):
     def __init__(self):
         pass
 
-    def speak_text(self, text):
+    def speak_text(self, text) -> Optional[float]:
+        """Speaks the text. Returns the number of seconds the audio keeps playing after
+        speak_text returned, when the Speaker returns before the playback ended and knows how
+        long it takes, otherwise None."""
         pass
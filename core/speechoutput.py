@@ -0,0 +1,111 @@
+"""This module contains the SpeechOutput class, which speaks responses on a thread of its own, so
+the synthesis and playback of a response don't delay the handling of an Intent."""
+import logging
+import time
+from collections import deque
+from queue import Queue
+from threading import Event, Lock, Thread
+from typing import List, Optional
+
+from core.metrics import REGISTRY
+from core.speaker import Speaker
+from core.utils.classname import fullname
+
+SPEECH_LATENCY = REGISTRY.histogram("speech_latency_seconds",
+                                    "Time between receiving an Intent and the start of the audio "
+                                    "of its response")
+
+
+class SpeechJob(object):
+    """A response which is waiting to be spoken, or has been spoken, by the SpeechOutput"""
+    def __init__(self, text: str, received_at: float):
+        self._text = text
+        self._received_at = received_at
+        self._audio_started_at: Optional[float] = None
+        self._spoken = Event()
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def received_at(self) -> float:
+        """Timestamp at which the Intent this response belongs to was received"""
+        return self._received_at
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds between receiving the Intent and the start of the audio, or None when the
+        response wasn't spoken yet"""
+        if self._audio_started_at is None:
+            return None
+        return self._audio_started_at - self._received_at
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until the response was spoken, up to the end of its playback when the Speaker
+        reports how long it plays. Returns False when the timeout expired."""
+        return self._spoken.wait(timeout)
+
+    def mark_audio_started(self, timestamp: float):
+        self._audio_started_at = timestamp
+
+    def mark_spoken(self):
+        self._spoken.set()
+
+
+class SpeechOutput(object):
+    """Speaks responses on a dedicated worker thread, in the order in which they were queued.
+
+    The audio is considered started when speak_text of the Speaker returns. SonosSpeaker
+    returns as soon as the Sonos started playing the speech file, and reports how long it plays:
+    the SpeechOutput then waits until the playback ended before it marks the response spoken
+    and speaks the next one, so a continued dialog doesn't listen to its own response and
+    responses don't cut each other off. A Speaker which returns None, like RhasspySpeech, is
+    expected to return when the playback ended."""
+
+    def __init__(self, speaker: Speaker, max_recorded_latencies: int = 100):
+        self._logger = logging.getLogger(fullname(self))
+        self._speaker = speaker
+        self._jobs: Queue = Queue()
+        self._lock = Lock()
+        self._latencies: deque = deque(maxlen=max_recorded_latencies)
+        thread = Thread(target=self._speak_jobs, daemon=True)
+        thread.start()
+
+    def enqueue(self, text: str, received_at: float = None) -> SpeechJob:
+        """Queues the text to be spoken and returns immediately"""
+        job = SpeechJob(text, received_at if received_at is not None else time.time())
+        self._jobs.put(job)
+        return job
+
+    @property
+    def pending(self) -> int:
+        """Number of responses which are waiting to be spoken"""
+        return self._jobs.qsize()
+
+    @property
+    def latencies(self) -> List[float]:
+        """The most recent "intent received -> audio started" timings, in seconds"""
+        with self._lock:
+            return list(self._latencies)
+
+    def _speak_jobs(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                playback_duration = self._speaker.speak_text(job.text)
+                audio_started_at = time.time()
+                job.mark_audio_started(audio_started_at)
+                latency = audio_started_at - job.received_at
+                SPEECH_LATENCY.observe(latency)
+                with self._lock:
+                    self._latencies.append(latency)
+                self._logger.info("Spoke response %.2f seconds after receiving the intent",
+                                  latency)
+                if playback_duration:
+                    time.sleep(playback_duration)
+            except Exception as exception:
+                self._logger.error("Exception occurred while speaking [%s]: %s", job.text,
+                                   exception)
+            finally:
+                job.mark_spoken()
@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+from core.compiledintentdefinition import CompiledSetParameter, CompiledString, \
+    IntentDefinitionCompiler
+from core.intentdefinition import IntentDefinition, NumberRangeParameter, SentenceBuilder, \
+    SetParameter, Variable, VariableParameter
+
+
+ROOMS = ["Living room", "Kitchen", "Study", "Attic", "Garage", "Hallway"]
+
+
+def create_intent_definition(name: str, rooms=None) -> IntentDefinition:
+    intent_definition = IntentDefinition(name)
+    when = Variable("when", [SentenceBuilder().add_string("in").add_parameter(
+        NumberRangeParameter("minutes", True, 1, 60)).add_string("minutes").build()])
+    intent_definition.add_variable(when)
+    intent_definition.add_sentence(SentenceBuilder()
+                                   .add_string("Turn the lights in the")
+                                   .add_parameter(SetParameter("Room", True, list(rooms or ROOMS)))
+                                   .add_parameter(VariableParameter(when, optional=True))
+                                   .build())
+    return intent_definition
+
+
+class TestIntentDefinitionCompiler(TestCase):
+
+    def test_compiled_intent_definition_is_returned_as_is(self):
+        compiler = IntentDefinitionCompiler()
+        compiled = compiler.compile(create_intent_definition("Lights"))
+
+        self.assertIs(compiled, compiler.compile(compiled))
+
+    def test_compile(self):
+        compiled = IntentDefinitionCompiler().compile(create_intent_definition("Lights"))
+
+        self.assertEqual("Lights", compiled.name)
+        self.assertEqual(CompiledString("Turn the lights in the", False, False),
+                         compiled.sentences[0][0])
+        self.assertEqual((CompiledSetParameter("Room", True, False, tuple(ROOMS)),),
+                         compiled.set_parameters)
+        self.assertEqual("when", compiled.variables[0].name)
+        with self.assertRaises(AttributeError):
+            compiled.name = "Other"
+
+    def test_content_hash_only_depends_on_content(self):
+        compiler = IntentDefinitionCompiler()
+        first = compiler.compile(create_intent_definition("Lights"))
+
+        self.assertEqual(first.content_hash,
+                         IntentDefinitionCompiler().compile(
+                             create_intent_definition("Lights")).content_hash)
+        self.assertNotEqual(first.content_hash,
+                            compiler.compile(create_intent_definition("Lights",
+                                                                      ROOMS[:-1])).content_hash)
+        self.assertNotEqual(first.content_hash,
+                            compiler.compile(create_intent_definition("Dim")).content_hash)
+
+    def test_shared_values_are_stored_once(self):
+        compiler = IntentDefinitionCompiler()
+        lights, dimmer = compiler.compile_all([create_intent_definition("Lights"),
+                                               create_intent_definition("Dim")])
+
+        self.assertIs(lights.set_parameters[0].possible_values,
+                      dimmer.set_parameters[0].possible_values)
+        self.assertIs(lights.set_parameters[0], dimmer.set_parameters[0])
+
+    def test_values_are_not_kept_between_calls(self):
+        compiler = IntentDefinitionCompiler()
+        lights = compiler.compile(create_intent_definition("Lights"))
+        dimmer = compiler.compile(create_intent_definition("Dim"))
+
+        self.assertEqual(lights.set_parameters[0], dimmer.set_parameters[0])
+        self.assertIsNot(lights.set_parameters[0].possible_values,
+                         dimmer.set_parameters[0].possible_values)
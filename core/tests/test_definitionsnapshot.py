@@ -0,0 +1,46 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+from core.compiledintentdefinition import IntentDefinitionCompiler
+from core.definitionsnapshot import DefinitionSnapshot
+from core.tests.test_compiledintentdefinition import create_intent_definition
+
+
+class TestDefinitionSnapshot(TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._snapshot_file = os.path.join(self._directory.name, "definitions.snapshot")
+        self._snapshot = DefinitionSnapshot(self._snapshot_file)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_save_and_load(self):
+        intent_definitions = IntentDefinitionCompiler().compile_all(
+            [create_intent_definition("Lights"), create_intent_definition("Dimmer")])
+
+        self._snapshot.save(intent_definitions)
+        loaded = self._snapshot.load()
+
+        self.assertEqual(intent_definitions, loaded)
+        # the values shared by the definitions are still stored once
+        self.assertIs(loaded[0].set_parameters[0].possible_values,
+                      loaded[1].set_parameters[0].possible_values)
+
+    def test_load_without_snapshot(self):
+        self.assertEqual([], self._snapshot.load())
+
+    def test_load_unreadable_snapshot(self):
+        with open(self._snapshot_file, "wb") as snapshot_file:
+            snapshot_file.write(b"not a pickle")
+
+        self.assertEqual([], self._snapshot.load())
+
+    def test_load_snapshot_of_other_version(self):
+        with open(self._snapshot_file, "wb") as snapshot_file:
+            pickle.dump({"version": 0, "intent_definitions": ()}, snapshot_file)
+
+        self.assertEqual([], self._snapshot.load())
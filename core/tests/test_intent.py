@@ -11,3 +11,18 @@ class TestIntent(TestCase):
         intent = Intent(test_name, "Test", test_parameters)
         self.assertEqual(test_name, intent.name)
         self.assertEqual(test_parameters, intent.parameters)
+
+    def test_intent_is_immutable(self):
+        test_parameters = {"TestParameter1": "Value1"}
+        intent = Intent("TestIntentName", "Test", test_parameters)
+        test_parameters["TestParameter1"] = "Value2"
+
+        self.assertEqual("Value1", intent.parameters["TestParameter1"])
+        with self.assertRaises(AttributeError):
+            intent.name = "OtherName"
+        with self.assertRaises(TypeError):
+            intent.parameters["TestParameter1"] = "Value2"
+
+    def test_default_parameters_are_empty(self):
+        intent = Intent("TestIntentName", "Test")
+        self.assertEqual({}, intent.parameters)
@@ -1,15 +1,26 @@
+import threading
+import time
 from unittest import TestCase
 from unittest.mock import MagicMock, Mock
 
+from core.compiledintentdefinition import IntentDefinitionCompiler
 from core.intent import Intent
 from core.intentdefinition import IntentDefinition
+from core.intenthandler import IntentHandler
 from core.intenthandlermanager import IntentHandlerManager
+from core.responsecache import CachePolicy
+from core.speaker import Speaker
+
+
+def wait_and_play(speaker_released: threading.Event, playback_duration: float = None):
+    speaker_released.wait(5)
+    return playback_duration
 
 
 class TestIntentManager(TestCase):
 
     def test_dispatch_intent(self):
-        mock_intent_handler = Mock()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
         mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
         mock_intent_handler.handle_intent = MagicMock()
 
@@ -28,9 +39,9 @@ class TestIntentManager(TestCase):
             self.fail("dispatch_intent raised KeyError unexpectedly")
 
     def test_get_all_intent_definitions(self):
-        mock_intent_handler_1 = Mock()
+        mock_intent_handler_1 = Mock(spec=IntentHandler, cache_policies={})
         mock_intent_handler_1.intent_definitions = [IntentDefinition("test1", "Test text")]
-        mock_intent_handler_2 = Mock()
+        mock_intent_handler_2 = Mock(spec=IntentHandler, cache_policies={})
         mock_intent_handler_2.intent_definitions = [IntentDefinition("test2", "Test text")]
 
         intent_manager = IntentHandlerManager()
@@ -41,7 +52,7 @@ class TestIntentManager(TestCase):
         self.assertEqual(2, len(intent_manager.get_intent_definitions()))
 
     def test_handle_exception_in_intent_handler(self):
-        mock_intent_handler = Mock()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
         mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
         mock_intent_handler.handle_intent = Mock(side_effect=KeyError("Shit happened"))
 
@@ -55,7 +66,7 @@ class TestIntentManager(TestCase):
             self.fail("IntentHandlerManager.update() unexpectedly raised a KeyError")
 
     def test_speaker_is_called_when_present(self):
-        mock_intent_handler = Mock()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
         mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
         mock_intent_handler.handle_intent = Mock(return_value="Speak this text")
 
@@ -67,3 +78,190 @@ class TestIntentManager(TestCase):
         intent_manager.update(Intent("test", {}))
         speaker.speak_text.assert_called_once()
 
+    def test_timeout_in_intent_handler(self):
+        handler_released = threading.Event()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
+        mock_intent_handler.handle_intent = Mock(
+            side_effect=lambda intent: handler_released.wait(5))
+        intent_manager = IntentHandlerManager(handler_timeout=0.05)
+        intent_manager.subscribe_intent_handler(mock_intent_handler)
+
+        response, continue_dialog = intent_manager.update(Intent("test", "test text"))
+        handler_released.set()
+
+        self.assertEqual("Sorry, it took too long to handle your request: test text", response)
+        self.assertFalse(continue_dialog)
+        statistics = list(intent_manager.handler_statistics.values())[0]
+        self.assertEqual(1, statistics.timed_out)
+
+    def test_hanging_intent_handler_does_not_block_other_handlers(self):
+        handler_released = threading.Event()
+        hanging_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        hanging_intent_handler.intent_definitions = [IntentDefinition("hang", "Hang")]
+        hanging_intent_handler.handle_intent = Mock(
+            side_effect=lambda intent: handler_released.wait(5))
+        intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
+        intent_handler.handle_intent = Mock(return_value=("Test response", False))
+        intent_manager = IntentHandlerManager(handler_timeout=2,
+                                              max_pending_intents_per_handler=1)
+        intent_manager.subscribe_intent_handler(hanging_intent_handler)
+        intent_manager.subscribe_intent_handler(intent_handler)
+
+        # one Intent hangs in the worker and the next one waits for it
+        hanging_executor = intent_manager._handler_executors[hanging_intent_handler]
+        waiting_callers = []
+        for queue_depth in [0, 1]:
+            caller = threading.Thread(target=intent_manager.update, args=(Intent("hang", "hang"),))
+            caller.start()
+            waiting_callers.append(caller)
+            for _ in range(500):
+                if (hanging_intent_handler.handle_intent.called
+                        and hanging_executor.statistics.queue_depth == queue_depth):
+                    break
+                threading.Event().wait(0.01)
+        busy_response, _ = intent_manager.update(Intent("hang", "hang"))
+        response = intent_manager.update(Intent("test", "test text"))
+        handler_released.set()
+        for caller in waiting_callers:
+            caller.join(5)
+
+        self.assertEqual("I'm still busy with your previous requests, please try again later",
+                         busy_response)
+        self.assertEqual(("Test response", False), response)
+
+    def test_timed_out_intents_waiting_for_a_worker_are_cancelled(self):
+        handler_released = threading.Event()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
+        mock_intent_handler.handle_intent = Mock(
+            side_effect=lambda intent: handler_released.wait(5))
+        intent_manager = IntentHandlerManager(handler_timeout=0.05,
+                                              max_pending_intents_per_handler=1)
+        intent_manager.subscribe_intent_handler(mock_intent_handler)
+
+        for _ in range(3):
+            intent_manager.update(Intent("test", "test text"))
+        handler_released.set()
+
+        statistics = list(intent_manager.handler_statistics.values())[0]
+        self.assertEqual(3, statistics.timed_out)
+        self.assertEqual(0, statistics.queue_depth)
+        self.assertEqual(0, statistics.rejected)
+
+    def test_asynchronous_speech(self):
+        speaker_released = threading.Event()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
+        mock_intent_handler.handle_intent = Mock(return_value=("Speak this text", False))
+        speaker = Mock(spec=Speaker)
+        speaker.speak_text = Mock(side_effect=lambda text: wait_and_play(speaker_released))
+
+        intent_manager = IntentHandlerManager(speaker, asynchronous_speech=True)
+        intent_manager.subscribe_intent_handler(mock_intent_handler)
+
+        response = intent_manager.update(Intent("test", "test text"))
+        self.assertEqual(("", False), response)
+        self.assertEqual([], intent_manager.speech_output.latencies)
+
+        speaker_released.set()
+        intent_manager.speech_output.enqueue("").wait(5)
+        speaker.speak_text.assert_any_call("Speak this text")
+        self.assertEqual(2, len(intent_manager.speech_output.latencies))
+
+    def test_continued_dialog_waits_for_speech_at_most_speech_timeout(self):
+        speaker_released = threading.Event()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
+        mock_intent_handler.handle_intent = Mock(return_value=("Which room?", True))
+        speaker = Mock(spec=Speaker)
+        speaker.speak_text = Mock(side_effect=lambda text: wait_and_play(speaker_released))
+
+        intent_manager = IntentHandlerManager(speaker, asynchronous_speech=True,
+                                              speech_timeout=0.05)
+        intent_manager.subscribe_intent_handler(mock_intent_handler)
+
+        response = intent_manager.update(Intent("test", "test text"))
+        speaker_released.set()
+
+        self.assertEqual(("", True), response)
+
+    def test_continued_dialog_waits_until_playback_ended(self):
+        speaker_released = threading.Event()
+        speaker_released.set()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
+        mock_intent_handler.handle_intent = Mock(return_value=("Which room?", True))
+        speaker = Mock(spec=Speaker)
+        speaker.speak_text = Mock(side_effect=lambda text: wait_and_play(speaker_released, 0.2))
+        intent_manager = IntentHandlerManager(speaker, asynchronous_speech=True)
+        intent_manager.subscribe_intent_handler(mock_intent_handler)
+
+        started = time.monotonic()
+        response = intent_manager.update(Intent("test", "test text"))
+
+        self.assertEqual(("", True), response)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_cached_response_is_served_without_calling_intent_handler(self):
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
+        mock_intent_handler.handle_intent = Mock(return_value=("Cached text", False))
+        mock_intent_handler.cache_policies = {"test": CachePolicy(ttl=60,
+                                                                  key_parameters=["room"])}
+
+        intent_manager = IntentHandlerManager()
+        intent_manager.subscribe_intent_handler(mock_intent_handler)
+
+        self.assertEqual(("Cached text", False),
+                         intent_manager.update(Intent("test", "test text", {"room": "study"})))
+        self.assertEqual(("Cached text", False),
+                         intent_manager.update(Intent("test", "test text", {"room": "study"})))
+        intent_manager.update(Intent("test", "test text", {"room": "kitchen"}))
+
+        self.assertEqual(2, mock_intent_handler.handle_intent.call_count)
+        statistics = intent_manager.cache_statistics["test"]
+        self.assertEqual(1, statistics.hits)
+        self.assertEqual(2, statistics.misses)
+
+    def test_failed_response_is_not_cached(self):
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("test", "Test text")]
+        mock_intent_handler.handle_intent = Mock(side_effect=KeyError("Shit happened"))
+        mock_intent_handler.cache_policies = {"test": CachePolicy(ttl=60)}
+
+        intent_manager = IntentHandlerManager()
+        intent_manager.subscribe_intent_handler(mock_intent_handler)
+
+        intent_manager.update(Intent("test", "test text"))
+        intent_manager.update(Intent("test", "test text"))
+
+        self.assertEqual(2, mock_intent_handler.handle_intent.call_count)
+
+    def test_snapshot_is_used_until_subscriptions_complete(self):
+        snapshot = Mock()
+        snapshot.load.return_value = IntentDefinitionCompiler().compile_all(
+            [IntentDefinition("test", "Test text"), IntentDefinition("removed", "Old text")])
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("test", "New text")]
+        mock_intent_handler.handle_intent.return_value = ("Done", False)
+
+        intent_manager = IntentHandlerManager(snapshot=snapshot)
+
+        self.assertEqual(["test", "removed"],
+                         [definition.name for definition in
+                          intent_manager.get_intent_definitions()])
+        self.assertEqual((IntentHandlerManager.STARTING_UP_RESPONSE, False),
+                         intent_manager.update(Intent("test", {})))
+        self.assertFalse(intent_manager.subscriptions_complete)
+
+        intent_manager.subscribe_intent_handler(mock_intent_handler)
+        self.assertEqual(("Done", False), intent_manager.update(Intent("test", {})))
+        intent_manager.complete_subscriptions()
+
+        self.assertTrue(intent_manager.wait_until_subscriptions_complete(0))
+        self.assertEqual(mock_intent_handler.intent_definitions,
+                         intent_manager.get_intent_definitions())
+        saved = snapshot.save.call_args[0][0]
+        self.assertEqual(["test"], [definition.name for definition in saved])
@@ -0,0 +1,104 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from core.intentdefinition import IntentDefinition, NumberRangeParameter, SentenceBuilder, \
+    SetParameter, Variable, VariableParameter
+from core.intentmatcher import IntentMatcher
+from core.sentencetemplate import SentenceTemplateParser, TemplateSyntaxError
+
+
+def create_intent_matcher(intent_definitions) -> IntentMatcher:
+    intent_definition_source = Mock()
+    intent_definition_source.get_intent_definitions.return_value = intent_definitions
+    return IntentMatcher(intent_definition_source)
+
+
+class TestIntentMatcher(TestCase):
+
+    ROOMS = ["Living room", "Kitchen", "Study", "Attic", "Garage", "Hallway"]
+
+    def setUp(self):
+        lights = IntentDefinition("LightsInRoomOnOff")
+        lights.add_sentence(SentenceBuilder().add_string("Turn the lights in the")
+                            .add_parameter(SetParameter("Room", True, self.ROOMS))
+                            .add_parameter(SetParameter("OnOff", True, ["on", "off"]))
+                            .build())
+        when = Variable("when", [SentenceBuilder().add_string("in").add_parameter(
+            NumberRangeParameter("minutes", True, 1, 60)).add_string("minutes").build()])
+        dimmer = IntentDefinition("DimRoom")
+        dimmer.add_variable(when)
+        dimmer.add_sentence(SentenceBuilder().add_string("Set the")
+                            .add_parameter(SetParameter("Room", True, self.ROOMS))
+                            .add_string("to")
+                            .add_parameter(NumberRangeParameter("level", True, 0, 100))
+                            .add_string("percent", True)
+                            .add_parameter(VariableParameter(when, True, optional=True))
+                            .build())
+        self.intent_matcher = create_intent_matcher([
+            lights, dimmer, IntentDefinition("GetTemperature", "How (warm | hot | cold) is it"),
+            IntentDefinition("GetEmail", "Do I have [any] (mail|email)"), IntentDefinition("")])
+
+    def test_template_string(self):
+        intent = self.intent_matcher.match("How HOT is it?")
+
+        self.assertEqual("GetTemperature", intent.name)
+        self.assertEqual("How HOT is it?", intent.full_intent_string)
+        self.assertEqual({}, dict(intent.parameters))
+        self.assertEqual("GetEmail", self.intent_matcher.match("Do I have any email").name)
+        self.assertEqual("GetEmail", self.intent_matcher.match("do i have mail").name)
+
+    def test_set_parameters(self):
+        intent = self.intent_matcher.match("Turn the lights in the living room off")
+
+        self.assertEqual("LightsInRoomOnOff", intent.name)
+        self.assertEqual({"Room": "Living room", "OnOff": "off"}, dict(intent.parameters))
+
+    def test_number_range_and_variable(self):
+        intent = self.intent_matcher.match("Set the study to 40 in 5 minutes")
+
+        self.assertEqual("DimRoom", intent.name)
+        self.assertEqual({"Room": "Study", "level": 40, "when": "in 5 minutes", "minutes": 5},
+                         dict(intent.parameters))
+        self.assertEqual({"Room": "Attic", "level": 100},
+                         dict(self.intent_matcher.match("set the attic to 100 percent")
+                              .parameters))
+
+    def test_no_match(self):
+        self.assertIsNone(self.intent_matcher.match("Set the study to 101 percent"))
+        self.assertIsNone(self.intent_matcher.match("Turn the lights in the cellar on"))
+        self.assertIsNone(self.intent_matcher.match("How hot is it today"))
+        self.assertIsNone(self.intent_matcher.match(""))
+
+    def test_refresh(self):
+        intent_definition_source = Mock()
+        intent_definition_source.get_intent_definitions.return_value = []
+        intent_matcher = IntentMatcher(intent_definition_source)
+        self.assertIsNone(intent_matcher.match("What time is it"))
+
+        intent_definition_source.get_intent_definitions.return_value = [
+            IntentDefinition("GetTime", "What time is it")]
+        intent_matcher.refresh()
+
+        self.assertEqual("GetTime", intent_matcher.match("What time is it").name)
+
+    def test_template_syntax_error(self):
+        with self.assertRaises(TemplateSyntaxError):
+            SentenceTemplateParser.parse("How (warm | hot is it")
+        self.assertIsNone(create_intent_matcher(
+            [IntentDefinition("Broken", "How (warm | hot is it")]).match("how warm is it"))
+
+    def test_variable_which_refers_to_itself(self):
+        very = Variable("very", [])
+        very.sentences.append(SentenceBuilder().add_string("very")
+                              .add_parameter(VariableParameter(very, optional=True)).build())
+        bright = IntentDefinition("Bright")
+        bright.add_variable(very)
+        bright.add_sentence(SentenceBuilder().add_string("make it")
+                            .add_parameter(VariableParameter(very)).add_string("bright").build())
+
+        with self.assertLogs("core.intentmatcher", "WARNING"):
+            intent_matcher = create_intent_matcher([
+                bright, IntentDefinition("GetTime", "What time is it")])
+
+        self.assertEqual("Bright", intent_matcher.match("make it very bright").name)
+        self.assertEqual("GetTime", intent_matcher.match("what time is it").name)
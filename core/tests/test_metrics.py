@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+from core.metrics import MetricsRegistry
+
+
+class TestMetrics(TestCase):
+
+    def test_histogram_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "Test histogram", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        self.assertEqual(3, histogram.count)
+        self.assertAlmostEqual(5.55, histogram.sum)
+        self.assertEqual(['test_seconds_bucket{le="0.1"} 1',
+                          'test_seconds_bucket{le="1.0"} 2',
+                          'test_seconds_bucket{le="+Inf"} 3',
+                          'test_seconds_sum 5.55',
+                          'test_seconds_count 3'], histogram.render())
+
+    def test_render_labelled_histograms(self):
+        registry = MetricsRegistry()
+        registry.histogram("test_seconds", "Test histogram", {"handler": "a"}, (1.0,)).observe(2)
+        registry.histogram("test_seconds", "Test histogram", {"handler": "b"}, (1.0,))
+        with registry.histogram("test_seconds", "Test histogram", {"handler": "b"}).time():
+            pass
+
+        expected = "\n".join(['# HELP test_seconds Test histogram',
+                              '# TYPE test_seconds histogram',
+                              'test_seconds_bucket{handler="a",le="1.0"} 0',
+                              'test_seconds_bucket{handler="a",le="+Inf"} 1',
+                              'test_seconds_sum{handler="a"} 2.0',
+                              'test_seconds_count{handler="a"} 1',
+                              'test_seconds_bucket{handler="b",le="1.0"} 1',
+                              'test_seconds_bucket{handler="b",le="+Inf"} 1'])
+        self.assertTrue(registry.render().startswith(expected))
+
+    def test_render_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        registry.counter("test_total", "Test counter", {"intent": "a"}).inc()
+        registry.counter("test_total", "Test counter", {"intent": "a"}).inc(2)
+        registry.gauge("test_ready", "Test gauge").set(1)
+
+        self.assertEqual("\n".join(['# HELP test_ready Test gauge',
+                                    '# TYPE test_ready gauge',
+                                    'test_ready 1.0',
+                                    '# HELP test_total Test counter',
+                                    '# TYPE test_total counter',
+                                    'test_total{intent="a"} 3']) + "\n", registry.render())
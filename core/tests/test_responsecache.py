@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from core.intent import Intent
+from core.responsecache import CachePolicy, ResponseCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_entries=2, clock=self.clock)
+
+    def test_response_expires_after_ttl(self):
+        policy = CachePolicy(ttl=10)
+        intent = Intent("GetTemperature", "How warm is it")
+        self.cache.put(intent, policy, ("It's 20 degrees", False))
+
+        self.clock.now = 9
+        self.assertEqual(("It's 20 degrees", False), self.cache.get(intent, policy))
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get(intent, policy))
+
+    def test_only_key_parameters_distinguish_intents(self):
+        policy = CachePolicy(ttl=10, key_parameters=["room"])
+        self.cache.put(Intent("GetTemperature", "", {"room": "study", "unit": "celsius"}), policy,
+                       ("Study", False))
+
+        self.assertEqual(("Study", False), self.cache.get(
+            Intent("GetTemperature", "", {"room": "study", "unit": "kelvin"}), policy))
+        self.assertIsNone(self.cache.get(Intent("GetTemperature", "", {"room": "attic"}), policy))
+
+    def test_oldest_entries_are_evicted(self):
+        policy = CachePolicy(ttl=10, key_parameters=["room"])
+        for room in ["study", "attic", "garage"]:
+            self.cache.put(Intent("GetTemperature", "", {"room": room}), policy, (room, False))
+
+        self.assertIsNone(self.cache.get(Intent("GetTemperature", "", {"room": "study"}), policy))
+        self.assertEqual(("garage", False),
+                         self.cache.get(Intent("GetTemperature", "", {"room": "garage"}), policy))
+
+    def test_statistics(self):
+        policy = CachePolicy(ttl=10)
+        intent = Intent("GetEmail", "Do I have mail")
+        self.cache.get(intent, policy)
+        self.cache.put(intent, policy, ("You have 2 new messages.", True))
+        self.cache.get(intent, policy)
+        self.cache.get(intent, policy)
+
+        statistics = self.cache.statistics["GetEmail"]
+        self.assertEqual(2, statistics.hits)
+        self.assertEqual(1, statistics.misses)
+        self.assertAlmostEqual(2 / 3, statistics.hit_rate)
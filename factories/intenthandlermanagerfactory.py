@@ -1,13 +1,18 @@
 """This module provides a static factory that creates an instance of IntentHandlerManager"""
-from typing import List
+import logging
+from threading import Thread
+from typing import Callable, List, Optional, TypeVar
 
 from core.asynchronous import AsyncVoiceSource
+from core.definitionsnapshot import DefinitionSnapshot
 from core.intenthandler import IntentHandler
 from core.intenthandlermanager import IntentHandlerManager
 from core.triggermanager import TriggerManager
 from core.speaker import Speaker
 
+from intenthandlers.hue.hueintenthandler import HueIntentHandler
 from intenthandlers.hue.lightsinroomonoffhandler import LightsInRoomOnOffHandler
+from intenthandlers.hue.lightsstatushandler import LightsStatusHandler
 from intenthandlers.hue.roomdimmer import RoomDimmer
 from intenthandlers.teamspeak import TeamspeakIntentHandler
 from intenthandlers.timeintenthandler import TimeIntentHandler
@@ -15,28 +20,102 @@ from intenthandlers.timerintenthandler import TimerIntenthandler
 from intenthandlers.weatherintenthandler import WeatherIntentHandler
 
 from mail.mail_handler import MailHandler
+from philipshue.huemanager import HueManager
+from philipshue.huestatecache import HueStateCache
+from philipshue.huewatcher import HueWatcher
+
+T = TypeVar("T")
 
 
 class IntentHandlerManagerFactory(object):
     """Factory that creates an IntentHandlerManager object"""
 
+    HANDLER_TIMEOUT = 15
+    HUE_WATCH_INTERVAL = 60
+    HUE_STATE_INTERVAL = 10
+
+    _logger = logging.getLogger(__name__)
+
     def __init__(self):
         pass
 
     @staticmethod
-    def create_intent_handler_manager(speaker: Speaker):
+    def create_intent_handler_manager(speaker: Speaker, snapshot: DefinitionSnapshot = None,
+                                      on_definitions_changed: Callable[[], None] = None):
         """- Creates an IntentHandlerManager object
         - Creates an instance of each class implementing the IntentHandler Abstract Base class
-        - Subscribes every IntentHandler instance to the IntentHandlerManager
+        - Subscribes every IntentHandler instance to the IntentHandlerManager, as well as the
+          Speaker when it is an IntentHandler
+
+        With a DefinitionSnapshot, the IntentHandlerManager is returned right away with the
+        IntentDefinitions of the snapshot, and the IntentHandlers are created and subscribed in a
+        background thread. Use wait_until_subscriptions_complete of the IntentHandlerManager to
+        find out when they are.
+
+        An IntentHandler which can't be created, for instance because its service is offline, is
+        logged and left out, and so are the Hue IntentHandlers when the bridge can't be reached.
+        The subscriptions are completed in any case, so the snapshot is replaced.
+
+        The Hue IntentHandlers share one HueManager, whose groups are watched by a HueWatcher.
+        When they change, the Hue IntentHandlers build their IntentDefinitions again, after
+        which on_definitions_changed is called.
         """
-        intent_handler_manager = IntentHandlerManager(speaker)
-        intent_handlers: List[IntentHandler] = [LightsInRoomOnOffHandler(),
-                                                RoomDimmer(),
-                                                TeamspeakIntentHandler(),
-                                                TimeIntentHandler(),
-                                                WeatherIntentHandler(),
-                                                MailHandler()
-                                                ]
+        intent_handler_manager = IntentHandlerManager(
+            speaker, handler_timeout=IntentHandlerManagerFactory.HANDLER_TIMEOUT,
+            asynchronous_speech=True, snapshot=snapshot)
+        if snapshot:
+            Thread(target=IntentHandlerManagerFactory._subscribe_intent_handlers,
+                   args=(intent_handler_manager, speaker, on_definitions_changed),
+                   name="IntentHandlerSubscription",
+                   daemon=True).start()
+        else:
+            IntentHandlerManagerFactory._subscribe_intent_handlers(intent_handler_manager,
+                                                                   speaker,
+                                                                   on_definitions_changed)
+        return intent_handler_manager
+
+    @staticmethod
+    def _subscribe_intent_handlers(intent_handler_manager: IntentHandlerManager,
+                                   speaker: Speaker,
+                                   on_definitions_changed: Callable[[], None] = None):
+        try:
+            IntentHandlerManagerFactory._create_and_subscribe(intent_handler_manager, speaker,
+                                                              on_definitions_changed)
+        finally:
+            # Intents of the snapshot would be answered with STARTING_UP_RESPONSE forever
+            if not intent_handler_manager.subscriptions_complete:
+                intent_handler_manager.complete_subscriptions()
+
+    @staticmethod
+    def _create(create: Callable[[], T]) -> Optional[T]:
+        """Returns the object which create returns, or None when create raises, so one
+        IntentHandler which can't be created doesn't keep the others from being subscribed"""
+        try:
+            return create()
+        except Exception:
+            IntentHandlerManagerFactory._logger.exception("Couldn't create %s", create)
+            return None
+
+    @staticmethod
+    def _create_and_subscribe(intent_handler_manager: IntentHandlerManager, speaker: Speaker,
+                              on_definitions_changed: Callable[[], None] = None):
+        create = IntentHandlerManagerFactory._create
+        hue_manager = create(HueManager)
+        hue_intent_handlers: List[HueIntentHandler] = []
+        if hue_manager:
+            hue_state_cache = HueStateCache(hue_manager,
+                                            IntentHandlerManagerFactory.HUE_STATE_INTERVAL)
+            hue_state_cache.start()
+            hue_intent_handlers = [LightsInRoomOnOffHandler(hue_manager),
+                                   RoomDimmer(hue_manager, hue_state_cache),
+                                   LightsStatusHandler(hue_manager, hue_state_cache)]
+        intent_handlers: List[IntentHandler] = list(hue_intent_handlers)
+        intent_handlers += [intent_handler for intent_handler in
+                            [create(TeamspeakIntentHandler),
+                             create(TimeIntentHandler),
+                             create(WeatherIntentHandler),
+                             create(MailHandler)]
+                            if intent_handler]
 
         async_voice_sources : List[AsyncVoiceSource] = []
 
@@ -44,6 +123,9 @@ class IntentHandlerManagerFactory(object):
         intent_handlers.append(timer_intent_handler)
         async_voice_sources.append(timer_intent_handler)
 
+        if isinstance(speaker, IntentHandler):
+            intent_handlers.append(speaker)
+
         for intent_handler in intent_handlers:
             intent_handler_manager.subscribe_intent_handler(intent_handler)
 
@@ -52,4 +134,12 @@ class IntentHandlerManagerFactory(object):
         for async_voice_source in async_voice_sources:
             async_voice_source.subscribe(trigger_manager)
 
-        return intent_handler_manager
+        intent_handler_manager.complete_subscriptions()
+
+        if hue_manager:
+            hue_watcher = HueWatcher(hue_manager, IntentHandlerManagerFactory.HUE_WATCH_INTERVAL)
+            for hue_intent_handler in hue_intent_handlers:
+                hue_watcher.subscribe(hue_intent_handler.refresh_intent_definitions)
+            if on_definitions_changed:
+                hue_watcher.subscribe(on_definitions_changed)
+            hue_watcher.start()
@@ -2,12 +2,25 @@
 
 from core.newintentsubject import NewIntentSubject
 from rhasspy.intentreceiver import RhasspyIntentReceiver
+from rhasspy.websocketintentreceiver import RhasspyWebsocketIntentReceiver
 
 
 class NewIntentSubjectFactory:
     """Factory that creates a NewIntentSubject object"""
 
+    HTTP = "http"
+    WEBSOCKET = "websocket"
+
     @staticmethod
-    def create_new_intent_subject() -> NewIntentSubject:
-        """Creates and returns a NewIntentSubject object"""
-        return RhasspyIntentReceiver()
+    def create_new_intent_subject(mode: str = HTTP) -> NewIntentSubject:
+        """Creates and returns a NewIntentSubject object.
+
+        - HTTP: Rhasspy POSTs every intent to an HTTP server (RhasspyIntentReceiver)
+        - WEBSOCKET: intents are read from one persistent connection with the intent event
+          stream of Rhasspy (RhasspyWebsocketIntentReceiver)
+        """
+        if mode == NewIntentSubjectFactory.WEBSOCKET:
+            return RhasspyWebsocketIntentReceiver()
+        if mode == NewIntentSubjectFactory.HTTP:
+            return RhasspyIntentReceiver()
+        raise ValueError("Unknown intent subject mode: {}".format(mode))
@@ -1,12 +1,45 @@
-from unittest import TestCase
+import os
+import tempfile
+from unittest import mock, TestCase
 
+from core.compiledintentdefinition import IntentDefinitionCompiler
+from core.definitionsnapshot import DefinitionSnapshot
+from core.intent import Intent
+from core.intentdefinition import IntentDefinition
+from core.intenthandlermanager import IntentHandlerManager
 from factories.intenthandlermanagerfactory import IntentHandlerManagerFactory
 
 
 class TestIntentHandlerManagerFactory(TestCase):
-    pass
 
     # def test_create_intent_handler_manager(self):
     #     intent_handler_manager = IntentHandlerManagerFactory.create_intent_handler_manager(None)
     #     intent_definitions = intent_handler_manager.get_intent_definitions()
     #     self.assertEqual(7, len(intent_definitions))
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._snapshot = DefinitionSnapshot(os.path.join(self._directory.name,
+                                                         "definitions.snapshot"))
+        self._snapshot.save(IntentDefinitionCompiler().compile_all(
+            [IntentDefinition("TurnLightsInRoomOnOff", "Turn the lights on"),
+             IntentDefinition("GetTime", "What time is it")]))
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    @mock.patch("factories.intenthandlermanagerfactory.MailHandler", side_effect=OSError)
+    @mock.patch("factories.intenthandlermanagerfactory.WeatherIntentHandler", side_effect=OSError)
+    @mock.patch("factories.intenthandlermanagerfactory.TeamspeakIntentHandler",
+                side_effect=OSError)
+    @mock.patch("factories.intenthandlermanagerfactory.HueManager", side_effect=ConnectionError)
+    def test_handlers_which_cant_be_created(self, *_):
+        intent_handler_manager = IntentHandlerManagerFactory.create_intent_handler_manager(
+            None, self._snapshot)
+
+        self.assertTrue(intent_handler_manager.wait_until_subscriptions_complete(5))
+        response, _ = intent_handler_manager.update(
+            Intent("TurnLightsInRoomOnOff", "Turn the lights on"))
+        self.assertNotEqual(IntentHandlerManager.STARTING_UP_RESPONSE, response)
+        self.assertIn("GetTime", [intent_definition.name for intent_definition
+                                  in intent_handler_manager.get_intent_definitions()])
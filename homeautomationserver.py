@@ -1,8 +1,12 @@
 import logging
 import time
+from typing import Optional
 
+from core.definitionsnapshot import DefinitionSnapshot
+from core.newintentsubject import NewIntentSubject
 from factories.intenthandlermanagerfactory import IntentHandlerManagerFactory
 from factories.newintentsubjectfactory import NewIntentSubjectFactory
+from rhasspy.intentreceiver import RhasspyIntentReceiver
 from rhasspy.updater import RhasspyUpdater
 from speechmanager import SpeechManager
 
@@ -13,17 +17,53 @@ logging.basicConfig(level=logging.DEBUG,
                     filename='homeautomationserver.log',
                     filemode='w')
 
-if __name__ == "__main__":
-    SPEAKER = SpeechManager()
-    INTENT_HANDLER_MANAGER = IntentHandlerManagerFactory().create_intent_handler_manager(SPEAKER)
-    INTENT_HANDLER_MANAGER.subscribe_intent_handler(SPEAKER)
+INTENT_SOURCE = NewIntentSubjectFactory.HTTP
+RHASSPY_SYNC_STATE_FILE = "rhasspy_sync_state.json"
+DEFINITION_SNAPSHOT_FILE = "intent_definitions.snapshot"
+# Seconds after which a slow start of the IntentHandlers is reported
+SUBSCRIPTION_TIMEOUT = 120
+
+
+def refresh_intent_definitions(new_intent_subject: NewIntentSubject, updater: RhasspyUpdater):
+    """Brings the IntentMatcher and Rhasspy up to date with the IntentDefinitions. Only what
+    changed is uploaded to Rhasspy."""
+    if isinstance(new_intent_subject, RhasspyIntentReceiver) and \
+            new_intent_subject.intent_matcher:
+        new_intent_subject.intent_matcher.refresh()
+    updater.start_background_sync()
+
+
+def main():
+    speaker = SpeechManager()
+    new_intent_subject = NewIntentSubjectFactory.create_new_intent_subject(INTENT_SOURCE)
+    updater: Optional[RhasspyUpdater] = None
 
-    UPDATER = RhasspyUpdater(INTENT_HANDLER_MANAGER)
-    UPDATER.update_rhasspy()
-    UPDATER.train()
+    def on_definitions_changed():
+        # is called by the HueWatcher, which first checks the bridge HUE_WATCH_INTERVAL seconds
+        # after the IntentHandlers are subscribed, by then the updater exists
+        if updater:
+            refresh_intent_definitions(new_intent_subject, updater)
 
-    NEW_INTENT_SUBJECT = NewIntentSubjectFactory.create_new_intent_subject()
-    NEW_INTENT_SUBJECT.attach(INTENT_HANDLER_MANAGER)
+    # the IntentDefinitions of the previous run are used until all IntentHandlers are created
+    intent_handler_manager = IntentHandlerManagerFactory().create_intent_handler_manager(
+        speaker, DefinitionSnapshot(DEFINITION_SNAPSHOT_FILE),
+        on_definitions_changed=on_definitions_changed)
+    new_intent_subject.attach(intent_handler_manager)
+
+    updater = RhasspyUpdater(intent_handler_manager, RHASSPY_SYNC_STATE_FILE)
+    if intent_handler_manager.get_intent_definitions():
+        updater.start_background_sync()
+
+    if not intent_handler_manager.wait_until_subscriptions_complete(SUBSCRIPTION_TIMEOUT):
+        logging.error("The IntentHandlers weren't subscribed within %s seconds, intents of the "
+                      "snapshot are answered as starting up until they are",
+                      SUBSCRIPTION_TIMEOUT)
+        intent_handler_manager.wait_until_subscriptions_complete()
+    refresh_intent_definitions(new_intent_subject, updater)
 
     while True:
         time.sleep(1000)
+
+
+if __name__ == "__main__":
+    main()
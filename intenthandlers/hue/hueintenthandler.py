@@ -0,0 +1,70 @@
+import json
+import logging
+from abc import abstractmethod
+from concurrent.futures import TimeoutError as FutureTimeoutError, wait
+from typing import Dict, List, Tuple
+
+from core.intentdefinition import IntentDefinition
+from core.intenthandler import IntentHandler
+from core.utils.classname import fullname
+from philipshue.huemanager import HueManager
+
+
+class HueIntentHandler(IntentHandler):
+    """Base class of the IntentHandlers which control the Hue lights. Their IntentDefinitions
+    contain the rooms of the HueManager, so they are built again when the rooms change."""
+
+    # Seconds to wait until a command was sent to the bridge, before responding anyway
+    COMMAND_TIMEOUT = 3
+
+    def __init__(self, hue_manager: HueManager):
+        IntentHandler.__init__(self)
+        self._logger = logging.getLogger(fullname(self))
+        self._hue_manager = hue_manager
+        self._intent_definitions = self._create_intent_definitions()
+
+    @property
+    def hue_manager(self) -> HueManager:
+        return self._hue_manager
+
+    def refresh_intent_definitions(self):
+        """Builds the IntentDefinitions again from the current groups of the HueManager. Is
+        called by a philipshue.huewatcher.HueWatcher when the groups changed."""
+        self._intent_definitions = self._create_intent_definitions()
+
+    def _send_room_command(self, room: str, payload: Dict) -> bool:
+        """Sends the command to the group of the room and waits at most COMMAND_TIMEOUT seconds
+        until the bridge received it. Returns False when sending it failed. A command which is
+        still waiting in the HueCommandQueue of the HueManager counts as sent."""
+        future = self._hue_manager.send_room_command_to_bridge(room, json.dumps(payload))
+        try:
+            future.result(self.COMMAND_TIMEOUT)
+        except FutureTimeoutError:
+            self._logger.warning("Command %s for the %s wasn't sent within %s seconds", payload,
+                                 room, self.COMMAND_TIMEOUT)
+        except Exception as exception:
+            self._logger.error("Couldn't send %s to the %s: %s", payload, room, exception)
+            return False
+        return True
+
+    def _send_commands(self, commands: List[Tuple[str, Dict]], all_lights: bool = False) -> bool:
+        """Sends (room, payload) commands at once, see HueManager.send_commands_to_bridge, and
+        waits at most COMMAND_TIMEOUT seconds until the bridge received them. Returns False when
+        sending one of them failed."""
+        futures = self._hue_manager.send_commands_to_bridge(
+            [(room, json.dumps(payload)) for room, payload in commands], all_lights)
+        wait(set(futures.values()), self.COMMAND_TIMEOUT)
+        sent = True
+        for room, future in futures.items():
+            if not future.done():
+                self._logger.warning("Command for the %s wasn't sent within %s seconds", room,
+                                     self.COMMAND_TIMEOUT)
+            elif future.exception() is not None:
+                self._logger.error("Couldn't send the command for the %s: %s", room,
+                                   future.exception())
+                sent = False
+        return sent
+
+    @abstractmethod
+    def _create_intent_definitions(self) -> List[IntentDefinition]:
+        pass
@@ -1,23 +1,25 @@
-import json
+from typing import Dict, List, Tuple
 
 from core.intent import Intent
 from core.intentdefinition import IntentDefinition, SentenceBuilder, SetParameter
-from core.intenthandler import IntentHandler
+from intenthandlers.hue.hueintenthandler import HueIntentHandler
 from philipshue.huemanager import HueManager
 
 
-class LightsInRoomOnOffHandler(IntentHandler):
+class LightsInRoomOnOffHandler(HueIntentHandler):
 
     ONOFF = "OnOff"
     ON = "On"
     OFF = "Off"
     ROOM = "Room"
+    ALL_LIGHTS_INTENT = "TurnAllLightsOnOff"
 
-    def __init__(self):
-        IntentHandler.__init__(self)
-        self._hue_manager = HueManager()
-        room_on_off_intent_definition = self._get_room_on_off_intent_definition()
-        self._intent_definitions = [room_on_off_intent_definition]
+    def __init__(self, hue_manager: HueManager = None):
+        HueIntentHandler.__init__(self, hue_manager or HueManager())
+
+    def _create_intent_definitions(self) -> List[IntentDefinition]:
+        return [self._get_room_on_off_intent_definition(),
+                self._get_all_lights_on_off_intent_definition()]
 
     def _get_room_on_off_intent_definition(self) -> IntentDefinition:
         room_on_off = IntentDefinition("TurnLightsInRoomOnOff")
@@ -36,9 +38,26 @@ class LightsInRoomOnOffHandler(IntentHandler):
         room_on_off.add_sentence(sentence)
         return room_on_off
 
+    def _get_all_lights_on_off_intent_definition(self) -> IntentDefinition:
+        all_lights_on_off = IntentDefinition(self.ALL_LIGHTS_INTENT)
+        on_off_parameter = SetParameter(self.ONOFF, True, possible_values=[self.ON, self.OFF])
+        sentence = SentenceBuilder().add_string("Turn all the lights")\
+            .add_parameter(on_off_parameter).build()
+        all_lights_on_off.add_sentence(sentence)
+        return all_lights_on_off
+
     def handle_intent(self, intent: Intent) -> str:
         payload = {"on": intent.parameters[self.ONOFF].lower() == "on"}
-        self._hue_manager.send_room_command_to_bridge(intent.parameters[self.ROOM], json.dumps(payload))
+        if intent.name == self.ALL_LIGHTS_INTENT:
+            return self._turn_all_lights_on_off(payload, intent.parameters[self.ONOFF].lower())
         room = intent.parameters[self.ROOM]
+        if not self._send_room_command(room, payload):
+            return "I couldn't reach the lights in the {}".format(room), False
         on_off = intent.parameters[self.ONOFF].lower()
         return "Turning the lights in the {} {}".format(room, on_off), False
+
+    def _turn_all_lights_on_off(self, payload: Dict, on_off: str) -> Tuple[str, bool]:
+        commands = [(room.name, payload) for room in self._hue_manager.groups]
+        if not self._send_commands(commands, all_lights=True):
+            return "I couldn't reach all the lights", False
+        return "Turning all the lights {}".format(on_off), False
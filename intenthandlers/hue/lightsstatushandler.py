@@ -0,0 +1,54 @@
+from typing import List
+
+from core.intent import Intent
+from core.intentdefinition import IntentDefinition, SentenceBuilder, SetParameter
+from intenthandlers.hue.hueintenthandler import HueIntentHandler
+from philipshue.huemanager import HueManager
+from philipshue.huestatecache import HueStateCache
+
+
+class LightsStatusHandler(HueIntentHandler):
+    """Answers whether the lights in a room are on, from the HueStateCache"""
+
+    ROOM = "Room"
+
+    def __init__(self, hue_manager: HueManager = None, hue_state_cache: HueStateCache = None):
+        hue_manager = hue_manager or HueManager()
+        HueIntentHandler.__init__(self, hue_manager)
+        self._hue_state_cache = hue_state_cache or HueStateCache(hue_manager)
+
+    def _create_intent_definitions(self) -> List[IntentDefinition]:
+        return [self._get_lights_status_intent_definition()]
+
+    def _get_lights_status_intent_definition(self) -> IntentDefinition:
+        lights_status = IntentDefinition("GetLightsInRoomStatus")
+
+        room_names = [room.name for room in self._hue_manager.groups]
+        room_parameter = SetParameter(self.ROOM, True, possible_values=room_names)
+
+        sentence_builder = SentenceBuilder()
+        sentence_builder.add_string("Are the lights in the")\
+            .add_parameter(room_parameter)\
+            .add_string("on")
+
+        lights_status.add_sentence(sentence_builder.build())
+        return lights_status
+
+    def handle_intent(self, intent: Intent) -> str:
+        room = intent.parameters[self.ROOM]
+        light_states = self._hue_state_cache.get_light_states(room)
+        unreachable = [light.name for light in light_states if not light.reachable]
+        lights_on = [light for light in light_states if light.on and light.reachable]
+        lights, are = ("light", "is") if len(light_states) == 1 else ("lights", "are")
+        if not lights_on:
+            response = "The {} in the {} {} off".format(lights, room, are)
+        elif len(lights_on) == len(light_states):
+            brightness = sum(light.brightness for light in lights_on) / len(lights_on)
+            response = "The {} in the {} {} on, at {} percent".format(
+                lights, room, are, round(brightness * 100 / 254))
+        else:
+            response = "{} of the {} lights in the {} {} on".format(
+                len(lights_on), len(light_states), room, "is" if len(lights_on) == 1 else "are")
+        if unreachable:
+            response += ". I can't reach {}".format(" and ".join(unreachable))
+        return response, False
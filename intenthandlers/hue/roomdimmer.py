@@ -1,12 +1,13 @@
-import json
+from typing import List
 
 from core.intent import Intent
 from core.intentdefinition import IntentDefinition, SentenceBuilder, SetParameter
-from core.intenthandler import IntentHandler
-from philipshue.huemanager import HueManager
+from intenthandlers.hue.hueintenthandler import HueIntentHandler
+from philipshue.huemanager import GroupDoesntExistException, HueManager
+from philipshue.huestatecache import HueStateCache
 
 
-class RoomDimmer(IntentHandler):
+class RoomDimmer(HueIntentHandler):
 
     UP_DOWN = "UpDown"
     UP = "Up"
@@ -15,12 +16,16 @@ class RoomDimmer(IntentHandler):
     INCREASE = "Increase"
     DECREASE = "Decrease"
     ROOM = "Room"
+    MAX_BRIGHTNESS = 254
 
-    def __init__(self):
-        super().__init__()
-        self._hue_manager = HueManager()
-        dim_room_intent_definition = self.get_dim_room_intent_definition()
-        self._intent_definitions = [dim_room_intent_definition]
+    def __init__(self, hue_manager: HueManager = None, hue_state_cache: HueStateCache = None):
+        """With a HueStateCache, lights which are already as bright or as dark as they can be
+        aren't sent a command"""
+        super().__init__(hue_manager or HueManager())
+        self._hue_state_cache = hue_state_cache
+
+    def _create_intent_definitions(self) -> List[IntentDefinition]:
+        return [self.get_dim_room_intent_definition()]
 
     def get_dim_room_intent_definition(self):
         dim_room = IntentDefinition("DimRoom")
@@ -54,7 +59,7 @@ class RoomDimmer(IntentHandler):
         response = ""
         if self.UP_DOWN in intent.parameters:
             direction = intent.parameters[self.UP_DOWN]
-            if intent.parameters[self.UP_DOWN] == self.DECREASE:
+            if intent.parameters[self.UP_DOWN] == self.DOWN:
                 bri_inc = -20
             response = "Dimming the lights in the {} {}".format(room, direction)
 
@@ -64,7 +69,27 @@ class RoomDimmer(IntentHandler):
                 bri_inc = -20
                 action = "Decreasing"
             response = "{} the brightness of the lights in the {}".format(action, room)
-        payload = {"bri_inc": bri_inc}
-        self._hue_manager.send_room_command_to_bridge(intent.parameters[self.ROOM], json.dumps(
-            payload))
+        limit_response = self._get_brightness_limit_response(room, bri_inc)
+        if limit_response:
+            return limit_response, False
+        if not self._send_room_command(room, {"bri_inc": bri_inc}):
+            return "I couldn't reach the lights in the {}".format(room), False
         return response, False
+
+    def _get_brightness_limit_response(self, room: str, bri_inc: int) -> str:
+        """Returns a response when the cached state shows that the lights can't be dimmed
+        further in this direction, otherwise an empty string. A state which is missing or too
+        old counts as unknown, so the command isn't delayed by loading it from the bridge."""
+        if not self._hue_state_cache:
+            return ""
+        try:
+            group_state = self._hue_state_cache.get_cached_group_state(room)
+        except GroupDoesntExistException:
+            return ""
+        if group_state is None:
+            return ""
+        if bri_inc < 0 and not group_state.any_on:
+            return "The lights in the {} are already off".format(room)
+        if bri_inc > 0 and group_state.all_on and group_state.brightness >= self.MAX_BRIGHTNESS:
+            return "The lights in the {} are already at full brightness".format(room)
+        return ""
@@ -1,3 +1,4 @@
+from concurrent.futures import Future
 from unittest import TestCase
 from unittest.mock import call, MagicMock, Mock, patch
 
@@ -30,3 +31,55 @@ class TestLightsInRoomOnOffHandler(TestCase):
         room_on_off_handler.handle_intent(intent)
         calls = [call("Living room", """{"on": true}""")]
         hue_manager_instance.send_room_command_to_bridge.assert_has_calls(calls)
+
+    @patch('intenthandlers.hue.lightsinroomonoffhandler.HueManager')
+    def test_failed_command(self, hue_manager):
+        failed = Future()
+        failed.set_exception(ConnectionError("bridge unreachable"))
+        hue_manager.return_value.send_room_command_to_bridge = Mock(return_value=failed)
+        room_on_off_handler = LightsInRoomOnOffHandler()
+
+        response, _ = room_on_off_handler.handle_intent(Intent(
+            "TurnLightsInRoomOnOff", "", parameters={"Room": "Living room", "OnOff": "On"}))
+
+        self.assertEqual("I couldn't reach the lights in the Living room", response)
+
+    @patch('intenthandlers.hue.lightsinroomonoffhandler.HueManager')
+    def test_all_lights(self, hue_manager):
+        hue_manager_instance = hue_manager.return_value
+        hue_manager_instance.groups = [Group("Living room", "1"), Group("Study", "2")]
+        sent = Future()
+        sent.set_result(None)
+        hue_manager_instance.send_commands_to_bridge = Mock(
+            return_value={"Living room": sent, "Study": sent})
+        room_on_off_handler = LightsInRoomOnOffHandler()
+
+        response, _ = room_on_off_handler.handle_intent(Intent(
+            "TurnAllLightsOnOff", "Turn all the lights off", parameters={"OnOff": "Off"}))
+
+        self.assertEqual("Turning all the lights off", response)
+        hue_manager_instance.send_commands_to_bridge.assert_called_once_with(
+            [("Living room", '{"on": false}'), ("Study", '{"on": false}')], True)
+        self.assertEqual("TurnAllLightsOnOff", room_on_off_handler.intent_definitions[1].name)
+
+    @patch('intenthandlers.hue.lightsinroomonoffhandler.HueManager')
+    def test_refresh_intent_definitions(self, hue_manager):
+        hue_manager_instance = hue_manager.return_value
+        hue_manager_instance.groups = [Group("Living room", "1")]
+        room_on_off_handler = LightsInRoomOnOffHandler()
+
+        hue_manager_instance.groups = [Group("Living room", "1"), Group("Study", "2")]
+        room_on_off_handler.refresh_intent_definitions()
+
+        room_parameter = room_on_off_handler.intent_definitions[0].sentences[0][1]
+        self.assertEqual(["Living room", "Study"], room_parameter.possible_values)
+
+    @patch('intenthandlers.hue.lightsinroomonoffhandler.HueManager')
+    def test_shared_hue_manager(self, hue_manager):
+        shared_hue_manager = Mock()
+        shared_hue_manager.groups = [Group("Living room", "1")]
+
+        room_on_off_handler = LightsInRoomOnOffHandler(shared_hue_manager)
+
+        hue_manager.assert_not_called()
+        self.assertIs(shared_hue_manager, room_on_off_handler.hue_manager)
@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from core.intent import Intent
+from intenthandlers.hue.lightsstatushandler import LightsStatusHandler
+from intenthandlers.hue.roomdimmer import RoomDimmer
+from philipshue.huemanager import HueManager
+from philipshue.huestatecache import HueStateCache
+from philipshue.tests.fakebridge import FakeBridge
+
+
+class TestLightsStatusHandler(TestCase):
+
+    def setUp(self):
+        self.bridge = FakeBridge()
+        self.hue_manager = HueManager(base_url=self.bridge.url)
+        self.cache = HueStateCache(self.hue_manager)
+
+    def tearDown(self):
+        self.bridge.shutdown()
+
+    def ask(self, room):
+        handler = LightsStatusHandler(self.hue_manager, self.cache)
+        return handler.handle_intent(Intent("GetLightsInRoomStatus", "", {"Room": room}))[0]
+
+    def test_intent_definitions(self):
+        handler = LightsStatusHandler(self.hue_manager, self.cache)
+
+        room_parameter = handler.intent_definitions[0].sentences[0][1]
+        self.assertEqual(["Living room", "Kitchen"], room_parameter.possible_values)
+
+    def test_lights_on(self):
+        self.assertEqual("The lights in the Living room are on, at 100 percent",
+                         self.ask("Living room"))
+
+    def test_lights_off_and_unreachable(self):
+        self.assertEqual("The lights in the Kitchen are off. I can't reach Pendant",
+                         self.ask("Kitchen"))
+
+    def test_some_lights_on(self):
+        self.bridge.lights["2"]["state"]["on"] = False
+
+        self.assertEqual("1 of the 2 lights in the Living room is on", self.ask("Living room"))
+
+    def test_one_light(self):
+        self.bridge.groups["1"]["lights"] = ["1"]
+
+        self.assertEqual("The light in the Living room is on, at 100 percent",
+                         self.ask("Living room"))
+
+    def test_dimmer_skips_lights_at_full_brightness(self):
+        self.cache.refresh()
+        dimmer = RoomDimmer(self.hue_manager, self.cache)
+
+        response, _ = dimmer.handle_intent(Intent("DimRoom", "", {"Room": "Living room",
+                                                                  "UpDown": "Up"}))
+
+        self.assertEqual("The lights in the Living room are already at full brightness",
+                         response)
+        self.assertEqual([], self.bridge.actions)
+
+    def test_dimmer_dims_down(self):
+        dimmer = RoomDimmer(self.hue_manager, self.cache)
+
+        dimmer.handle_intent(Intent("DimRoom", "", {"Room": "Living room", "UpDown": "Down"}))
+        self.assertTrue(self.hue_manager.command_queue.join(5))
+
+        self.assertEqual([("1", {"bri_inc": -20})], self.bridge.actions)
+
+    def test_dimmer_doesnt_load_a_missing_state(self):
+        dimmer = RoomDimmer(self.hue_manager, self.cache)
+        requests = self.bridge.requests
+
+        dimmer.handle_intent(Intent("DimRoom", "", {"Room": "Living room", "UpDown": "Up"}))
+        self.assertTrue(self.hue_manager.command_queue.join(5))
+
+        # the state is unknown, so the command is sent without asking the bridge first
+        self.assertEqual([("1", {"bri_inc": 20})], self.bridge.actions)
+        self.assertEqual(requests + 1, self.bridge.requests)
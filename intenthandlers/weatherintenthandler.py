@@ -6,6 +6,7 @@ import requests
 from core.intentdefinition import IntentDefinition
 from core.intenthandler import IntentHandler
 from core.intent import Intent
+from core.responsecache import CachePolicy
 
 
 class WeatherIntentHandler(IntentHandler):
@@ -18,6 +19,7 @@ class WeatherIntentHandler(IntentHandler):
         self._location = config["Weather"]["location"]
         get_temperature_intent_definition = self._create_intent_definition()
         self._intent_definitions = [get_temperature_intent_definition]
+        self._cache_policies = {"GetTemperature": CachePolicy(ttl=600)}
 
     def _create_intent_definition(self) -> IntentDefinition:
         return self._create_one_string_sentence_intent_definition("GetTemperature", "How (warm | "
@@ -5,6 +5,7 @@ import os
 from core.intent import Intent
 from core.intentdefinition import IntentDefinition
 from core.intenthandler import IntentHandler
+from core.responsecache import CachePolicy
 
 
 class MailHandler(IntentHandler):
@@ -19,6 +20,7 @@ class MailHandler(IntentHandler):
         self._config.read(config_file)
 
         self._intent_definitions = self._create_intent_definitions()
+        self._cache_policies = {"GetEmail": CachePolicy(ttl=60)}
 
     @staticmethod
     def _create_intent_definitions() -> IntentDefinition:
@@ -0,0 +1,218 @@
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition, Thread
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from core.metrics import REGISTRY
+from core.utils.classname import fullname
+
+QUEUE_TIME = REGISTRY.histogram("hue_command_queue_seconds",
+                                "Time a Hue group command waited in the HueCommandQueue")
+COALESCED_COMMANDS = REGISTRY.counter("hue_commands_coalesced_total",
+                                      "Hue group commands merged into a pending command")
+
+MAX_BRIGHTNESS = 254
+
+
+def can_merge(pending: Dict, payload: Dict) -> bool:
+    """Whether the payload can be merged into the pending payload. Scene activations are never
+    merged, because the bridge doesn't define what a scene together with other changes does."""
+    return "scene" not in pending and "scene" not in payload
+
+
+def merge_payloads(pending: Dict, payload: Dict) -> Dict:
+    """Merges a payload into the pending payload for the same group, so that sending the result
+    has the same effect as sending both: relative brightness changes (bri_inc) add up, and every
+    other key of the later payload replaces the earlier value. An absolute brightness drops the
+    relative changes before it, and the relative changes after it are added to it."""
+    merged = dict(pending)
+    for key, value in payload.items():
+        if key == "bri_inc":
+            if "bri" in merged:
+                merged["bri"] = max(1, min(MAX_BRIGHTNESS, merged["bri"] + value))
+            else:
+                merged["bri_inc"] = max(-MAX_BRIGHTNESS,
+                                        min(MAX_BRIGHTNESS, merged.get("bri_inc", 0) + value))
+        else:
+            if key == "bri":
+                merged.pop("bri_inc", None)
+            merged[key] = value
+    return merged
+
+
+class _PendingCommand(object):
+    __slots__ = ("payload", "futures", "enqueued_at")
+
+    def __init__(self, payload: Dict, enqueued_at: float):
+        self.payload = payload
+        self.futures: List[Future] = []
+        self.enqueued_at = enqueued_at
+
+
+class _PendingBatch(object):
+    __slots__ = ("commands", "futures", "enqueued_at")
+
+    def __init__(self, commands: List[Tuple[str, Dict]], futures: List[Future],
+                 enqueued_at: float):
+        self.commands = commands
+        self.futures = futures
+        self.enqueued_at = enqueued_at
+
+
+_Key = Tuple[Optional[str], int]
+_Pending = Union[_PendingCommand, _PendingBatch]
+
+
+class HueCommandQueue(object):
+    """Sends group commands to the Hue bridge from a thread of its own, no faster than
+    max_commands_per_second, because the bridge drops commands when it gets too many of them.
+
+    While a command waits, later commands for the same group are merged into it (see
+    merge_payloads), so repeated commands like "dim the lights down" don't pile up. Commands
+    which can't be merged, like scene activations, wait behind the pending command of their
+    group. Commands are served in the order in which they started waiting. Every submit returns a
+    Future, which gets the response of the bridge, or the exception, once the merged command is
+    sent. The time commands wait is recorded in the hue_command_queue_seconds histogram.
+
+    A batch of commands for several groups (see submit_batch) takes one turn: its commands are
+    sent at the same time, on up to max_batch_workers threads."""
+
+    def __init__(self, send: Callable[[str, Dict], object], max_commands_per_second: float = 1,
+                 clock: Callable[[], float] = time.monotonic, max_batch_workers: int = 4):
+        self._logger = logging.getLogger(fullname(self))
+        self._send = send
+        self._interval = 1 / max_commands_per_second
+        self._clock = clock
+        # pending commands by (group id, sequence number), and the key of the last pending
+        # command of every group, which later commands are merged into. Batches have no group id.
+        self._pending: "OrderedDict[_Key, _Pending]" = OrderedDict()
+        self._last_pending: Dict[str, _Key] = {}
+        self._sequence = 0
+        self._condition = Condition()
+        self._sending = 0
+        self._last_sent_at: Optional[float] = None
+        self._thread: Optional[Thread] = None
+        self._batch_executor = ThreadPoolExecutor(max_batch_workers,
+                                                  thread_name_prefix="HueCommandBatch")
+        self._stopped = False
+
+    def submit(self, group_id: str, payload: Dict) -> Future:
+        future: Future = Future()
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("The HueCommandQueue is shut down")
+            key = self._last_pending.get(group_id)
+            pending = self._pending.get(key) if key else None
+            if isinstance(pending, _PendingCommand) and can_merge(pending.payload, payload):
+                pending.payload = merge_payloads(pending.payload, payload)
+                COALESCED_COMMANDS.inc()
+            else:
+                self._sequence += 1
+                key = (group_id, self._sequence)
+                pending = _PendingCommand(dict(payload), self._clock())
+                self._pending[key] = pending
+                self._last_pending[group_id] = key
+            pending.futures.append(future)
+            self._start()
+        return future
+
+    def submit_batch(self, commands: List[Tuple[str, Dict]]) -> List[Future]:
+        """Submits (group id, payload) commands which are sent at the same time when their turn
+        comes, so together they take about one round-trip to the bridge. Returns a Future per
+        command. The batch isn't merged with other commands: later commands for its groups wait
+        behind it."""
+        futures: List[Future] = [Future() for _ in commands]
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("The HueCommandQueue is shut down")
+            self._sequence += 1
+            self._pending[(None, self._sequence)] = _PendingBatch(
+                [(group_id, dict(payload)) for group_id, payload in commands], futures,
+                self._clock())
+            for group_id, _ in commands:
+                self._last_pending.pop(group_id, None)
+            self._start()
+        return futures
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="HueCommandQueue", daemon=True)
+            self._thread.start()
+        self._condition.notify_all()
+
+    @property
+    def pending(self) -> int:
+        """Number of commands which weren't sent yet, after merging"""
+        with self._condition:
+            return len(self._pending)
+
+    def join(self, timeout: float = None) -> bool:
+        """Blocks until every submitted command is sent, returns whether they are"""
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            while self._pending or self._sending:
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def shutdown(self):
+        """Sends the pending commands and stops the thread"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+        self._batch_executor.shutdown()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                wait = 0 if self._last_sent_at is None else \
+                    self._last_sent_at + self._interval - self._clock()
+                if wait > 0:
+                    # commands which arrive in the meantime are merged into the pending ones
+                    self._condition.wait(wait)
+                    continue
+                (group_id, sequence), command = self._pending.popitem(last=False)
+                if self._last_pending.get(group_id) == (group_id, sequence):
+                    del self._last_pending[group_id]
+                self._sending += 1
+                sent_at = self._last_sent_at = self._clock()
+            QUEUE_TIME.observe(sent_at - command.enqueued_at)
+            if isinstance(command, _PendingBatch):
+                self._send_batch(command)
+            elif group_id is not None:
+                try:
+                    response = self._send(group_id, command.payload)
+                except Exception as exception:
+                    self._log_failure(group_id, command.payload, exception)
+                    for future in command.futures:
+                        future.set_exception(exception)
+                else:
+                    for future in command.futures:
+                        future.set_result(response)
+            with self._condition:
+                self._sending -= 1
+                self._condition.notify_all()
+
+    def _send_batch(self, batch: _PendingBatch):
+        sends = [self._batch_executor.submit(self._send, group_id, payload)
+                 for group_id, payload in batch.commands]
+        for (group_id, payload), send, future in zip(batch.commands, sends, batch.futures):
+            exception = send.exception()
+            if exception is not None:
+                self._log_failure(group_id, payload, exception)
+                future.set_exception(exception)
+            else:
+                future.set_result(send.result())
+
+    def _log_failure(self, group_id: str, payload: Dict, exception: BaseException):
+        self._logger.error("Sending %s to group %s failed: %s", payload, group_id, exception)
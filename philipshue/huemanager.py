@@ -1,10 +1,15 @@
 import configparser
 import json
 import os
+from concurrent.futures import Future
+from threading import Lock
 
-from typing import List
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from philipshue.huecommandqueue import can_merge, HueCommandQueue, merge_payloads
 
 
 class GroupDoesntExistException(Exception):
@@ -12,9 +17,10 @@ class GroupDoesntExistException(Exception):
 
 
 class Group(object):
-    def __init__(self, name, group_id):
+    def __init__(self, name, group_id, lights: Iterable[str] = ()):
         self._name = name
         self._group_id = group_id
+        self._lights = frozenset(lights)
 
     @property
     def name(self) -> str:
@@ -24,6 +30,11 @@ class Group(object):
     def group_id(self) -> str:
         return self._group_id
 
+    @property
+    def lights(self) -> FrozenSet[str]:
+        """The ids of the lights in the group"""
+        return self._lights
+
 
 class Scene(object):
     def __init__(self, name, scene_id, group):
@@ -44,59 +55,208 @@ class Scene(object):
         return self._group
 
 
+def _normalize_name(name: str) -> str:
+    """Rooms and scenes are looked up ignoring case and surrounding whitespace"""
+    return name.strip().lower()
+
+
+class _BridgeModel(NamedTuple):
+    """The groups and scenes of the bridge, with indexes to look them up by name. It is never
+    changed, but replaced as a whole, so readers always see groups, scenes and indexes which
+    belong together."""
+    groups: List[Group]
+    scenes: List[Scene]
+    groups_by_name: Dict[str, Group]
+    scenes_by_group_and_name: Dict[Tuple[str, str], Scene]
+    zones_by_lights: Dict[FrozenSet[str], Group]
+
+    @staticmethod
+    def create(groups: List[Group], scenes: List[Scene],
+               zones: Iterable[Group] = ()) -> "_BridgeModel":
+        groups_by_name: Dict[str, Group] = {}
+        for group in groups:
+            groups_by_name.setdefault(_normalize_name(group.name), group)
+        scenes_by_group_and_name: Dict[Tuple[str, str], Scene] = {}
+        for scene in scenes:
+            scenes_by_group_and_name.setdefault((scene.group, _normalize_name(scene.name)), scene)
+        zones_by_lights: Dict[FrozenSet[str], Group] = {}
+        for zone in zones:
+            zones_by_lights.setdefault(zone.lights, zone)
+        return _BridgeModel(groups, scenes, groups_by_name, scenes_by_group_and_name,
+                            zones_by_lights)
+
+
 class HueManager(object):
-    _groups: List[Group] = []
-    _scenes: List[Scene] = []
-
-    def __init__(self):
-        config = configparser.ConfigParser()
-        config_file = os.path.dirname(os.path.abspath(__file__)) + "/config.ini"
-        config.read(config_file)
-        base_url = config["Hue"]["Url"]
+    """Client of the Hue bridge. One HueManager is meant to be shared by all Hue IntentHandlers
+    and may be used by several threads at once: its requests.Session keeps a pool of keep-alive
+    connections to the bridge, so commands don't open a new connection, and the groups and
+    scenes are replaced at once when they are loaded again.
+
+    Groups are looked up by name, ignoring case, and scenes by group and name in constant time,
+    however many there are.
+
+    Group commands go through a HueCommandQueue, which sends at most max_commands_per_second
+    of them and merges the commands for a group which are still waiting. They are sent in the
+    background; the returned Future tells when they were sent."""
+    # The group which contains every light of the bridge
+    ALL_LIGHTS_GROUP = "0"
+
+    _model = _BridgeModel.create([], [])
+
+    # Maximum number of connections to the bridge which are kept open
+    POOL_SIZE = 4
+
+    def __init__(self, session: requests.Session = None, base_url: str = None,
+                 max_commands_per_second: float = 1):
+        self._session = session or self._create_session()
+        self._command_queue = HueCommandQueue(self._put_group_action, max_commands_per_second,
+                                              max_batch_workers=self.POOL_SIZE)
+        self._refresh_lock = Lock()
+        if base_url is None:
+            config = configparser.ConfigParser()
+            config_file = os.path.dirname(os.path.abspath(__file__)) + "/config.ini"
+            config.read(config_file)
+            base_url = config["Hue"]["Url"]
+        self._base_url = base_url
         self._groups_url = base_url + "/groups/"
         self._scenes_url = base_url + "/scenes/"
         self._group_action_url = base_url + "/groups/{}/action"
-        self._load_groups()
-        self._load_scenes()
+        self._load()
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HueManager.POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @property
+    def command_queue(self) -> HueCommandQueue:
+        return self._command_queue
 
     @property
     def groups(self) -> List[Group]:
-        return self._groups
+        return self._model.groups
 
     def get_group_by_name(self, group_name) -> Group:
-        for group in self.groups:
-            if group.name.lower() == group_name.lower():
-                return group
-        raise GroupDoesntExistException("{} doesn't exist".format(group_name))
+        group = self._model.groups_by_name.get(_normalize_name(group_name))
+        if group is None:
+            raise GroupDoesntExistException("{} doesn't exist".format(group_name))
+        return group
 
     @property
     def scenes(self) -> List[Scene]:
-        return self._scenes
+        return self._model.scenes
+
+    def get_scene(self, scene_name: str, group: str) -> Optional[Scene]:
+        """Returns the scene with the name in the group with the given id, or None"""
+        return self._model.scenes_by_group_and_name.get((group, _normalize_name(scene_name)))
+
+    def get_resource(self, resource: str) -> Dict:
+        """Returns a resource of the bridge, like "lights" or "groups", as a dict"""
+        return json.loads(self._session.get("{}/{}".format(self._base_url, resource)).content)
+
+    def refresh(self) -> bool:
+        """Loads the groups and scenes from the bridge again, returns whether they changed"""
+        with self._refresh_lock:
+            previous_state = self._get_state()
+            self._load()
+            return self._get_state() != previous_state
 
-    def _load_groups(self):
-        groups_string = requests.get(self._groups_url).content
-        self._groups = []
+    def _get_state(self):
+        return ([(group.name, group.group_id) for group in self._model.groups],
+                [(scene.name, scene.scene_id, scene.group) for scene in self._model.scenes])
+
+    def _load(self):
+        rooms, zones = self._load_groups()
+        self._model = _BridgeModel.create(rooms, self._load_scenes(), zones)
+
+    def _load_groups(self) -> Tuple[List[Group], List[Group]]:
+        """Returns the rooms and the zones of the bridge"""
+        groups_string = self._session.get(self._groups_url).content
+        rooms = []
+        zones = []
         for key, group_dict in json.loads(groups_string).items():
+            group = Group(group_dict["name"], key, group_dict.get("lights", ()))
             if group_dict["type"] == "Room":
-                group = Group(group_dict["name"], key)
-                self._groups.append(group)
+                rooms.append(group)
+            elif group_dict["type"] == "Zone":
+                zones.append(group)
+        return rooms, zones
 
-    def _load_scenes(self):
-        scenes_string = requests.get(self._scenes_url).content
-        self._scenes = []
+    def _load_scenes(self) -> List[Scene]:
+        scenes_string = self._session.get(self._scenes_url).content
+        scenes = []
         for key, scene_dict in json.loads(scenes_string).items():
             if "group" in scene_dict.keys():
                 scene = Scene(scene_dict["name"], key, scene_dict["group"])
-                self._scenes.append(scene)
+                scenes.append(scene)
+        return scenes
 
-    def activate_scene_in_group(self, scene_name, group):
-        for scene in self.scenes:
-            if scene.name == scene_name and scene.group == group:
-                uri = self._group_action_url.format(group)
-                payload = {"scene": scene.scene_id}
-                requests.put(uri, json.dumps(payload))
+    def activate_scene_in_group(self, scene_name, group) -> Optional[Future]:
+        scene = self.get_scene(scene_name, group)
+        if scene is None:
+            return None
+        return self._command_queue.submit(group, {"scene": scene.scene_id})
 
-    def send_room_command_to_bridge(self, room_name: str, payload_json: str):
+    def send_room_command_to_bridge(self, room_name: str, payload_json: str) -> Future:
         group = self.get_group_by_name(room_name)
-        uri = self._group_action_url.format(group.group_id)
-        requests.put(uri, payload_json)
+        return self._command_queue.submit(group.group_id, json.loads(payload_json))
+
+    def send_commands_to_bridge(self, commands: Iterable[Tuple[str, str]],
+                                all_lights: bool = False) -> Dict[str, Future]:
+        """Sends (room name, JSON payload) commands at once and returns a Future per room. The
+        Future of a room which doesn't exist gets a GroupDoesntExistException. When a room is
+        named more than once, its payloads are merged like in the HueCommandQueue, and a
+        ValueError is raised when they can't be merged, like two scene activations.
+
+        When all rooms get the same payload, a single command is sent instead: to the group with
+        all lights when all_lights is set, like for turning off all lights, which also switches
+        the lights outside the rooms, or to a zone which contains exactly the lights of the
+        rooms. Otherwise the commands of the rooms are sent as one batch of the
+        HueCommandQueue, at the same time over the pooled connections, so they take about one
+        round-trip to the bridge as well."""
+        futures: Dict[str, Future] = {}
+        payloads: Dict[str, Dict] = {}
+        room_names: Dict[str, List[str]] = {}
+        lights: Set[str] = set()
+        for room_name, payload_json in commands:
+            try:
+                group = self.get_group_by_name(room_name)
+            except GroupDoesntExistException as exception:
+                futures[room_name] = Future()
+                futures[room_name].set_exception(exception)
+                continue
+            payload = json.loads(payload_json)
+            pending = payloads.get(group.group_id)
+            if pending is None:
+                payloads[group.group_id] = payload
+            elif can_merge(pending, payload):
+                payloads[group.group_id] = merge_payloads(pending, payload)
+            else:
+                raise ValueError("The commands for the {} can't be merged".format(room_name))
+            room_names.setdefault(group.group_id, []).append(room_name)
+            lights.update(group.lights)
+        if not payloads:
+            return futures
+
+        distinct_payloads = {json.dumps(payload, sort_keys=True) for payload in payloads.values()}
+        target = None
+        if len(distinct_payloads) == 1:
+            if all_lights:
+                target = self.ALL_LIGHTS_GROUP
+            elif lights:
+                zone = self._model.zones_by_lights.get(frozenset(lights))
+                target = zone.group_id if zone else None
+        if target is not None:
+            future = self._command_queue.submit(target, next(iter(payloads.values())))
+            group_futures = [future] * len(payloads)
+        else:
+            group_futures = self._command_queue.submit_batch(list(payloads.items()))
+        for group_id, future in zip(payloads, group_futures):
+            futures.update((room_name, future) for room_name in room_names[group_id])
+        return futures
+
+    def _put_group_action(self, group_id: str, payload: Dict) -> requests.Response:
+        return self._session.put(self._group_action_url.format(group_id), json.dumps(payload))
@@ -0,0 +1,155 @@
+import logging
+import time
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from core.metrics import REGISTRY
+from core.utils.classname import fullname
+from philipshue.huemanager import HueManager
+
+STATE_AGE = REGISTRY.gauge("hue_state_age_seconds",
+                           "Age of the cached state of the Hue lights and groups at the last "
+                           "read")
+
+
+class LightState(NamedTuple):
+    light_id: str
+    name: str
+    on: bool
+    brightness: int
+    reachable: bool
+
+
+class GroupState(NamedTuple):
+    group_id: str
+    name: str
+    any_on: bool
+    all_on: bool
+    brightness: int
+    light_ids: Tuple[str, ...]
+
+
+class _HueState(NamedTuple):
+    lights: Dict[str, LightState]
+    groups: Dict[str, GroupState]
+    refreshed_at: float
+
+
+class HueStateCache(object):
+    """Keeps the state of the lights and groups of the Hue bridge in memory: whether they are
+    on, their brightness and whether the lights are reachable. A background thread loads it when
+    it starts, and then polls the bridge every interval seconds while the state is in use: once
+    nothing read it for idle_timeout seconds, polling pauses until the next read, so the bridge
+    isn't asked for a state nobody needs. The bridge API which the HueManager uses has no event
+    stream.
+
+    Reads never return a state which is older than max_age seconds: when polling fell behind,
+    for instance because it paused or the bridge was unreachable for a while, the state is
+    loaded from the bridge first. Callers which can do without the state use
+    get_cached_group_state instead, which never waits for the bridge. The state is replaced as a
+    whole, so a read never sees lights and groups from different polls."""
+
+    def __init__(self, hue_manager: HueManager, interval: float = 10, max_age: float = 30,
+                 idle_timeout: float = 300, clock: Callable[[], float] = time.monotonic):
+        self._logger = logging.getLogger(fullname(self))
+        self._hue_manager = hue_manager
+        self._interval = interval
+        self._max_age = max_age
+        self._idle_timeout = idle_timeout
+        self._clock = clock
+        self._state: Optional[_HueState] = None
+        self._last_read_at: Optional[float] = None
+        self._refresh_lock = Lock()
+        self._stopped = Event()
+
+    def refresh(self) -> _HueState:
+        """Loads the state of the lights and groups from the bridge, and returns it"""
+        with self._refresh_lock:
+            lights = {light_id: LightState(light_id, light["name"], light["state"]["on"],
+                                           light["state"].get("bri", 0),
+                                           light["state"].get("reachable", True))
+                      for light_id, light in self._hue_manager.get_resource("lights").items()}
+            groups = {group_id: GroupState(group_id, group["name"], group["state"]["any_on"],
+                                           group["state"]["all_on"],
+                                           group.get("action", {}).get("bri", 0),
+                                           tuple(group.get("lights", [])))
+                      for group_id, group in self._hue_manager.get_resource("groups").items()}
+            state = _HueState(lights, groups, self._clock())
+            self._state = state
+            return state
+
+    def _get_state(self, max_age: Optional[float] = None) -> _HueState:
+        max_age = self._max_age if max_age is None else max_age
+        self._last_read_at = self._clock()
+        state = self._state
+        if state is None or self._clock() - state.refreshed_at > max_age:
+            state = self.refresh()
+        STATE_AGE.set(self._clock() - state.refreshed_at)
+        return state
+
+    @property
+    def age(self) -> Optional[float]:
+        """Number of seconds since the state was loaded, or None when it wasn't loaded yet"""
+        state = self._state
+        return None if state is None else self._clock() - state.refreshed_at
+
+    def get_group_state(self, room_name: str, max_age: float = None) -> GroupState:
+        """Returns the state of the group of the room, at most max_age seconds old. Raises a
+        GroupDoesntExistException when there is no such room."""
+        return self._get_group_state(room_name, max_age)[1]
+
+    def get_cached_group_state(self, room_name: str) -> Optional[GroupState]:
+        """Returns the state of the group of the room when the state in memory is at most
+        max_age seconds old and knows the room, otherwise None. Never loads the state from the
+        bridge, but a read resumes polling when it paused. Raises a GroupDoesntExistException
+        when there is no such room."""
+        group = self._hue_manager.get_group_by_name(room_name)
+        self._last_read_at = self._clock()
+        state = self._state
+        if state is None or self._clock() - state.refreshed_at > self._max_age:
+            return None
+        STATE_AGE.set(self._clock() - state.refreshed_at)
+        return state.groups.get(group.group_id)
+
+    def get_light_states(self, room_name: str, max_age: float = None) -> List[LightState]:
+        """Returns the state of every light in the room, at most max_age seconds old"""
+        state, group_state = self._get_group_state(room_name, max_age)
+        return [state.lights[light_id] for light_id in group_state.light_ids
+                if light_id in state.lights]
+
+    def _get_group_state(self, room_name: str, max_age: Optional[float]) \
+            -> Tuple[_HueState, GroupState]:
+        group = self._hue_manager.get_group_by_name(room_name)
+        state = self._get_state(max_age)
+        if group.group_id not in state.groups:
+            # the room was added after the last poll
+            state = self.refresh()
+        return state, state.groups[group.group_id]
+
+    def start(self) -> Thread:
+        """Starts polling the bridge in a background thread, which is returned"""
+        self._stopped.clear()
+        thread = Thread(target=self._poll, name="HueStateCache", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+
+    def _in_use(self) -> bool:
+        last_read_at = self._last_read_at
+        return last_read_at is not None and self._clock() - last_read_at <= self._idle_timeout
+
+    def _poll(self):
+        first_poll = True
+        while True:
+            if first_poll or self._in_use():
+                try:
+                    self.refresh()
+                except (requests.RequestException, ValueError, KeyError) as exception:
+                    self._logger.warning("Couldn't load the state of the lights: %s", exception)
+            first_poll = False
+            if self._stopped.wait(self._interval):
+                return
@@ -0,0 +1,64 @@
+import logging
+from threading import Event, Lock, Thread
+from typing import Callable, List
+
+import requests
+
+from core.utils.classname import fullname
+from philipshue.huemanager import HueManager
+
+
+class HueWatcher(object):
+    """Watches the groups and scenes of the Hue bridge for changes, like a room which was added
+    in the Hue app. Every interval seconds a background thread refreshes the HueManager, and
+    when the groups or scenes changed, the subscribed callbacks are called in the order they
+    were subscribed. Subscribe the IntentHandlers which build their IntentDefinitions from the
+    HueManager first, and the callbacks which bring Rhasspy up to date after them."""
+
+    def __init__(self, hue_manager: HueManager, interval: float = 60):
+        self._logger = logging.getLogger(fullname(self))
+        self._hue_manager = hue_manager
+        self._interval = interval
+        self._callbacks: List[Callable[[], None]] = []
+        self._check_lock = Lock()
+        self._stopped = Event()
+
+    @property
+    def hue_manager(self) -> HueManager:
+        return self._hue_manager
+
+    def subscribe(self, callback: Callable[[], None]):
+        self._callbacks.append(callback)
+
+    def check(self) -> bool:
+        """Refreshes the HueManager and calls the callbacks when the groups or scenes changed.
+        Returns whether they changed."""
+        with self._check_lock:
+            try:
+                changed = self._hue_manager.refresh()
+            except (requests.RequestException, ValueError, KeyError) as exception:
+                self._logger.warning("Couldn't refresh the groups and scenes: %s", exception)
+                return False
+            if not changed:
+                return False
+            self._logger.info("The groups or scenes of the Hue bridge changed")
+            for callback in self._callbacks:
+                try:
+                    callback()
+                except Exception as exception:
+                    self._logger.error("Callback %s failed: %s", callback, exception)
+            return True
+
+    def start(self) -> Thread:
+        """Starts watching in a background thread, which is returned"""
+        self._stopped.clear()
+        thread = Thread(target=self._watch, name="HueWatcher", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+
+    def _watch(self):
+        while not self._stopped.wait(self._interval):
+            self.check()
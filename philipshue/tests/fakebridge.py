@@ -0,0 +1,93 @@
+"""A fake Hue bridge on localhost, which serves the lights, groups and scenes of the v1 API and
+applies the group actions it receives to its lights"""
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+USER = "testuser"
+_GROUP_ACTION = re.compile(r"^/api/{}/groups/(\w+)/action$".format(USER))
+
+
+class FakeBridge(object):
+
+    def __init__(self):
+        self.lights = {
+            "1": {"name": "Ceiling", "state": {"on": True, "bri": 254, "reachable": True}},
+            "2": {"name": "Floor lamp", "state": {"on": True, "bri": 254, "reachable": True}},
+            "3": {"name": "Spots", "state": {"on": False, "bri": 100, "reachable": True}},
+            "4": {"name": "Pendant", "state": {"on": False, "bri": 100, "reachable": False}},
+        }
+        self.groups = {
+            "1": {"name": "Living room", "type": "Room", "lights": ["1", "2"]},
+            "2": {"name": "Kitchen", "type": "Room", "lights": ["3", "4"]},
+        }
+        self.scenes = {"abc": {"name": "Relax", "group": "1", "lights": ["1", "2"]}}
+        self.actions = []
+        self.requests = 0
+        self._lock = Lock()
+        bridge = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                bridge.requests += 1
+                resource = self.path.rstrip("/").rsplit("/", 1)[-1]
+                content = {"lights": bridge.lights, "groups": bridge.get_groups(),
+                           "scenes": bridge.scenes}.get(resource)
+                self._respond(200 if content is not None else 404, content)
+
+            def do_PUT(self):
+                bridge.requests += 1
+                match = _GROUP_ACTION.match(self.path)
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if match is None:
+                    self._respond(404, None)
+                    return
+                bridge.apply_action(match.group(1), payload)
+                self._respond(200, [{"success": payload}])
+
+            def _respond(self, status, content):
+                body = json.dumps(content).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = Thread(target=self._server.serve_forever, args=(0.01,), daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:{}/api/{}".format(self._server.server_port, USER)
+
+    def get_groups(self):
+        with self._lock:
+            groups = {}
+            for group_id, group in self.groups.items():
+                states = [self.lights[light_id]["state"] for light_id in group["lights"]]
+                groups[group_id] = dict(group, state={
+                    "any_on": any(state["on"] for state in states),
+                    "all_on": all(state["on"] for state in states)},
+                    action={"on": states[0]["on"], "bri": states[0]["bri"]})
+            return groups
+
+    def apply_action(self, group_id: str, payload: dict):
+        with self._lock:
+            self.actions.append((group_id, payload))
+            light_ids = self.lights if group_id == "0" else self.groups[group_id]["lights"]
+            for light_id in light_ids:
+                state = self.lights[light_id]["state"]
+                if "on" in payload:
+                    state["on"] = payload["on"]
+                if "bri_inc" in payload:
+                    state["bri"] = max(1, min(254, state["bri"] + payload["bri_inc"]))
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(5)
@@ -0,0 +1,163 @@
+import time
+from threading import Event
+from unittest import TestCase
+
+from philipshue.huecommandqueue import can_merge, HueCommandQueue, merge_payloads
+
+
+class TestMergePayloads(TestCase):
+
+    def test_relative_brightness_adds_up(self):
+        self.assertEqual({"bri_inc": -40}, merge_payloads({"bri_inc": -20}, {"bri_inc": -20}))
+        self.assertEqual({"bri_inc": 254}, merge_payloads({"bri_inc": 200}, {"bri_inc": 200}))
+
+    def test_absolute_brightness_replaces_relative(self):
+        self.assertEqual({"bri": 100}, merge_payloads({"bri_inc": -20}, {"bri": 100}))
+        self.assertEqual({"bri": 80}, merge_payloads({"bri": 100}, {"bri_inc": -20}))
+        self.assertEqual({"bri": 1}, merge_payloads({"bri": 10}, {"bri_inc": -20}))
+
+    def test_scenes_are_not_merged(self):
+        self.assertFalse(can_merge({"scene": "abc"}, {"on": False}))
+        self.assertFalse(can_merge({"bri_inc": 20}, {"scene": "abc"}))
+        self.assertTrue(can_merge({"bri_inc": 20}, {"on": False}))
+
+    def test_later_values_win(self):
+        self.assertEqual({"on": False, "bri_inc": 20},
+                         merge_payloads({"on": True, "bri_inc": 20}, {"on": False}))
+
+
+class TestHueCommandQueue(TestCase):
+
+    def setUp(self):
+        self.sent = []
+        self.queue = None
+
+    def tearDown(self):
+        if self.queue:
+            self.queue.shutdown()
+
+    def send(self, group_id, payload):
+        self.sent.append((time.monotonic(), group_id, payload))
+        return group_id
+
+    def test_sends_commands(self):
+        self.queue = HueCommandQueue(self.send, max_commands_per_second=100)
+
+        future = self.queue.submit("1", {"on": True})
+
+        self.assertEqual("1", future.result(5))
+        self.assertEqual([("1", {"on": True})], [sent[1:] for sent in self.sent])
+
+    def test_merges_waiting_commands(self):
+        release = Event()
+
+        def blocking_send(group_id, payload):
+            release.wait(5)
+            return self.send(group_id, payload)
+
+        self.queue = HueCommandQueue(blocking_send, max_commands_per_second=100)
+        self.queue.submit("2", {"on": True})
+        # wait until the first command blocks the queue while it is sent
+        for _ in range(500):
+            if self.queue.pending == 0:
+                break
+            time.sleep(0.01)
+        futures = [self.queue.submit("1", {"bri_inc": -20}) for _ in range(3)]
+        self.assertEqual(1, self.queue.pending)
+        release.set()
+
+        self.assertEqual(["1", "1", "1"], [future.result(5) for future in futures])
+        self.assertEqual([("2", {"on": True}), ("1", {"bri_inc": -60})],
+                         [sent[1:] for sent in self.sent])
+
+    def test_scene_waits_behind_pending_command(self):
+        release = Event()
+
+        def blocking_send(group_id, payload):
+            release.wait(5)
+            return self.send(group_id, payload)
+
+        self.queue = HueCommandQueue(blocking_send, max_commands_per_second=100)
+        self.queue.submit("2", {"on": True})
+        self.queue.submit("1", {"on": True})
+        self.queue.submit("1", {"scene": "abc"})
+        self.queue.submit("1", {"on": False})
+        release.set()
+
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual([("2", {"on": True}), ("1", {"on": True}), ("1", {"scene": "abc"}),
+                          ("1", {"on": False})], [sent[1:] for sent in self.sent])
+
+    def test_batch_is_not_merged(self):
+        release = Event()
+        started = Event()
+
+        def blocking_send(group_id, payload):
+            started.set()
+            release.wait(5)
+            return self.send(group_id, payload)
+
+        self.queue = HueCommandQueue(blocking_send, max_commands_per_second=100)
+        self.queue.submit("3", {"on": True})
+        started.wait(5)
+        self.queue.submit("1", {"on": True})
+        futures = self.queue.submit_batch([("1", {"on": False}), ("2", {"on": False})])
+        self.queue.submit("1", {"bri_inc": 20})
+        # the last command would change the order of the commands for group 1 if it was merged
+        self.assertEqual(3, self.queue.pending)
+        release.set()
+
+        self.assertEqual(["1", "2"], [future.result(5) for future in futures])
+        self.assertTrue(self.queue.join(5))
+        sent = [sent[1:] for sent in self.sent]
+        self.assertEqual([("3", {"on": True}), ("1", {"on": True})], sent[:2])
+        self.assertEqual([("1", {"on": False}), ("2", {"on": False})], sorted(sent[2:4]))
+        self.assertEqual(("1", {"bri_inc": 20}), sent[4])
+
+    def test_batch_commands_are_sent_concurrently(self):
+        both_started = Event()
+        started = []
+
+        def waiting_send(group_id, payload):
+            started.append(group_id)
+            if len(started) == 2:
+                both_started.set()
+            return both_started.wait(5)
+
+        self.queue = HueCommandQueue(waiting_send, max_commands_per_second=100)
+
+        futures = self.queue.submit_batch([("1", {"on": False}), ("2", {"on": False})])
+
+        self.assertEqual([True, True], [future.result(5) for future in futures])
+
+    def test_rate_limit(self):
+        self.queue = HueCommandQueue(self.send, max_commands_per_second=20)
+
+        for group_id in ["1", "2", "3"]:
+            self.queue.submit(group_id, {"on": True})
+
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual(0, self.queue.pending)
+        times = [sent[0] for sent in self.sent]
+        for earlier, later in zip(times, times[1:]):
+            self.assertGreaterEqual(later - earlier, 0.045)
+
+    def test_failed_send(self):
+        def failing_send(group_id, payload):
+            raise ConnectionError("bridge unreachable")
+
+        self.queue = HueCommandQueue(failing_send, max_commands_per_second=100)
+
+        future = self.queue.submit("1", {"on": True})
+
+        with self.assertRaises(ConnectionError):
+            future.result(5)
+        # the queue keeps sending after a failure
+        self.assertIsInstance(self.queue.submit("2", {"on": True}).exception(5), ConnectionError)
+
+    def test_submit_after_shutdown(self):
+        self.queue = HueCommandQueue(self.send, max_commands_per_second=100)
+        self.queue.shutdown()
+
+        with self.assertRaises(RuntimeError):
+            self.queue.submit("1", {"on": True})
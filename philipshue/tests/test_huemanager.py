@@ -1,5 +1,9 @@
 from unittest import mock, TestCase
-from philipshue.huemanager import HueManager
+
+import requests
+
+from philipshue.huemanager import GroupDoesntExistException, HueManager
+from philipshue.tests.fakebridge import FakeBridge
 
 groups_url = "http://192.168.1.23/api/your_whitelist_entry_here/groups/"
 scenes_url = "http://192.168.1.23/api/your_whitelist_entry_here/scenes/"
@@ -65,29 +69,176 @@ def mocked_requests_get(*args):
 
 class TestHueManager(TestCase):
 
-    @mock.patch("philipshue.huemanager.requests.get", side_effect=mocked_requests_get)
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
     def test_get_groups(self, mock_get):
         hue = HueManager()
         mock_get.called_with(groups_url)
         self.assertEqual(3, len(hue.groups))
 
-    @mock.patch("philipshue.huemanager.requests.get", side_effect=mocked_requests_get)
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
     def test_get_scenes(self, mock_get):
         hue = HueManager()
         mock_get.called_with(scenes_url)
         self.assertEqual(3, len(hue.scenes))
 
-    @mock.patch("philipshue.huemanager.requests.get", side_effect=mocked_requests_get)
-    @mock.patch("requests.put")
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
+    @mock.patch.object(requests.Session, "put")
     def test_activate_scene(self, mock_put, mock_get):
         hue = HueManager()
-        hue.activate_scene_in_group("Tropical twilight", "1")
+        hue.activate_scene_in_group("Tropical twilight", "1").result(5)
 
         expected_url = 'http://192.168.1.23/api/your_whitelist_entry_here/groups/1/action'
         self.assertIn(mock.call(expected_url, '{"scene": "-dd2XUCmuJUipeO"}'), mock_put.call_args_list)
 
-    @mock.patch("philipshue.huemanager.requests.get", side_effect=mocked_requests_get)
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
     def test_get_group_by_name(self, mock_get):
         hue = HueManager()
         group = hue.get_group_by_name("Kitchen")
         self.assertEqual("3", group.group_id)
+
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
+    def test_refresh(self, mock_get):
+        hue = HueManager()
+        self.assertFalse(hue.refresh())
+
+        added_room = groups_string.replace('"3": {\n        "name": "Kitchen"',
+                                           '"3": {\n        "name": "Study"')
+        mock_get.side_effect = lambda url: mock.Mock(
+            content=added_room if url == groups_url else scenes_string)
+
+        self.assertTrue(hue.refresh())
+        self.assertEqual("3", hue.get_group_by_name("Study").group_id)
+
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
+    @mock.patch.object(requests.Session, "put")
+    def test_commands_reuse_the_session(self, mock_put, mock_get):
+        session = requests.Session()
+        hue = HueManager(session, max_commands_per_second=100)
+
+        hue.send_room_command_to_bridge("Kitchen", '{"on": true}')
+        hue.send_room_command_to_bridge("Dining", '{"on": false}')
+        self.assertTrue(hue.command_queue.join(5))
+
+        self.assertEqual(2, mock_get.call_count)
+        self.assertEqual(2, mock_put.call_count)
+
+    def test_pooled_session(self):
+        adapter = HueManager._create_session().get_adapter(groups_url)
+
+        self.assertEqual(HueManager.POOL_SIZE, adapter._pool_maxsize)
+
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
+    def test_get_group_by_name_ignores_case(self, mock_get):
+        hue = HueManager()
+
+        self.assertEqual("1", hue.get_group_by_name("living ROOM ").group_id)
+        with self.assertRaises(GroupDoesntExistException):
+            hue.get_group_by_name("Attic")
+
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
+    def test_get_scene(self, mock_get):
+        hue = HueManager()
+
+        self.assertEqual("L41Hjg64T-Ey4PT", hue.get_scene("Arctic aurora", "2").scene_id)
+        self.assertIsNone(hue.get_scene("Arctic aurora", "1"))
+
+    @mock.patch.object(requests.Session, "get", side_effect=mocked_requests_get)
+    @mock.patch.object(requests.Session, "put")
+    def test_activate_unknown_scene(self, mock_put, mock_get):
+        hue = HueManager()
+        self.assertIsNone(hue.activate_scene_in_group("Tropical twilight", "2"))
+
+        mock_put.assert_not_called()
+
+
+class TestBatchedCommands(TestCase):
+
+    def setUp(self):
+        self.bridge = FakeBridge()
+        self.hue = HueManager(base_url=self.bridge.url, max_commands_per_second=100)
+
+    def tearDown(self):
+        self.hue.command_queue.shutdown()
+        self.bridge.shutdown()
+
+    def test_same_command_for_all_lights(self):
+        futures = self.hue.send_commands_to_bridge([("Living room", '{"on": false}'),
+                                                    ("kitchen", '{"on": false}')],
+                                                   all_lights=True)
+
+        self.assertEqual(200, futures["Living room"].result(5).status_code)
+        self.assertIs(futures["Living room"], futures["kitchen"])
+        self.assertEqual([("0", {"on": False})], self.bridge.actions)
+        self.assertFalse(any(light["state"]["on"] for light in self.bridge.lights.values()))
+
+    def test_same_command_for_every_room(self):
+        # group 0 would also switch the lights outside the rooms
+        futures = self.hue.send_commands_to_bridge([("Living room", '{"on": false}'),
+                                                    ("Kitchen", '{"on": false}')])
+
+        futures["Living room"].result(5)
+        futures["Kitchen"].result(5)
+        self.assertEqual([("1", {"on": False}), ("2", {"on": False})],
+                         sorted(self.bridge.actions))
+
+    def test_rooms_are_sent_in_one_turn(self):
+        self.hue.command_queue.shutdown()
+        self.hue = HueManager(base_url=self.bridge.url, max_commands_per_second=1)
+
+        futures = self.hue.send_commands_to_bridge([("Living room", '{"on": false}'),
+                                                    ("Kitchen", '{"on": true}')])
+
+        # one command per second would keep the Kitchen waiting for a second
+        self.assertEqual(200, futures["Living room"].result(0.5).status_code)
+        self.assertEqual(200, futures["Kitchen"].result(0.5).status_code)
+
+    def test_same_command_for_a_zone(self):
+        self.bridge.groups["3"] = {"name": "Downstairs", "type": "Zone",
+                                   "lights": ["1", "2", "3", "4"]}
+        self.hue.command_queue.shutdown()
+        self.hue = HueManager(base_url=self.bridge.url, max_commands_per_second=100)
+
+        futures = self.hue.send_commands_to_bridge([("Living room", '{"on": false}'),
+                                                    ("Kitchen", '{"on": false}')])
+
+        futures["Kitchen"].result(5)
+        self.assertIs(futures["Living room"], futures["Kitchen"])
+        self.assertEqual([("3", {"on": False})], self.bridge.actions)
+        self.assertEqual(["Living room", "Kitchen"], [group.name for group in self.hue.groups])
+
+    def test_same_room_twice(self):
+        futures = self.hue.send_commands_to_bridge([("Kitchen", '{"bri_inc": 20}'),
+                                                    ("kitchen", '{"on": true}')])
+
+        futures["Kitchen"].result(5)
+        self.assertIs(futures["Kitchen"], futures["kitchen"])
+        self.assertEqual([("2", {"bri_inc": 20, "on": True})], self.bridge.actions)
+
+    def test_same_room_twice_with_scenes(self):
+        with self.assertRaises(ValueError):
+            self.hue.send_commands_to_bridge([("Kitchen", '{"scene": "abc"}'),
+                                              ("Kitchen", '{"on": true}')])
+
+    def test_different_commands(self):
+        futures = self.hue.send_commands_to_bridge([("Living room", '{"on": false}'),
+                                                    ("Kitchen", '{"on": true}')],
+                                                   all_lights=True)
+
+        self.assertEqual(200, futures["Living room"].result(5).status_code)
+        self.assertEqual(200, futures["Kitchen"].result(5).status_code)
+        self.assertEqual([("1", {"on": False}), ("2", {"on": True})],
+                         sorted(self.bridge.actions))
+
+    def test_some_rooms(self):
+        futures = self.hue.send_commands_to_bridge([("Kitchen", '{"on": true}')])
+
+        futures["Kitchen"].result(5)
+        self.assertEqual([("2", {"on": True})], self.bridge.actions)
+
+    def test_unknown_room(self):
+        futures = self.hue.send_commands_to_bridge([("Attic", '{"on": true}'),
+                                                    ("Kitchen", '{"on": true}')])
+
+        self.assertIsInstance(futures["Attic"].exception(), GroupDoesntExistException)
+        futures["Kitchen"].result(5)
+        self.assertEqual([("2", {"on": True})], self.bridge.actions)
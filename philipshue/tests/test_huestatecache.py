@@ -0,0 +1,95 @@
+import time
+from unittest import TestCase
+
+from philipshue.huemanager import GroupDoesntExistException, HueManager
+from philipshue.huestatecache import HueStateCache
+from philipshue.tests.fakebridge import FakeBridge
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHueStateCache(TestCase):
+
+    def setUp(self):
+        self.bridge = FakeBridge()
+        self.clock = FakeClock()
+        self.hue_manager = HueManager(base_url=self.bridge.url)
+        self.cache = HueStateCache(self.hue_manager, max_age=10, clock=self.clock)
+
+    def tearDown(self):
+        self.bridge.shutdown()
+
+    def test_group_state(self):
+        group_state = self.cache.get_group_state("living room")
+
+        self.assertTrue(group_state.all_on)
+        self.assertEqual(254, group_state.brightness)
+        self.assertEqual(("1", "2"), group_state.light_ids)
+
+    def test_light_states(self):
+        light_states = self.cache.get_light_states("Kitchen")
+
+        self.assertEqual(["Spots", "Pendant"], [light.name for light in light_states])
+        self.assertEqual([True, False], [light.reachable for light in light_states])
+
+    def test_reads_within_max_age_come_from_memory(self):
+        self.cache.refresh()
+        requests = self.bridge.requests
+        self.bridge.apply_action("2", {"on": True})
+
+        self.clock.now += 10
+        self.assertFalse(self.cache.get_group_state("Kitchen").any_on)
+        self.assertEqual(requests, self.bridge.requests)
+
+        self.clock.now += 1
+        self.assertTrue(self.cache.get_group_state("Kitchen").any_on)
+        self.assertEqual(0, self.cache.age)
+
+    def test_cached_group_state(self):
+        self.assertIsNone(self.cache.get_cached_group_state("Kitchen"))
+        self.cache.refresh()
+        requests = self.bridge.requests
+
+        self.clock.now += 10
+        self.assertFalse(self.cache.get_cached_group_state("Kitchen").any_on)
+        self.clock.now += 1
+        self.assertIsNone(self.cache.get_cached_group_state("Kitchen"))
+        self.assertEqual(requests, self.bridge.requests)
+
+    def test_unknown_room(self):
+        with self.assertRaises(GroupDoesntExistException):
+            self.cache.get_group_state("Attic")
+
+    def test_poll_in_background(self):
+        cache = HueStateCache(self.hue_manager, interval=60)
+
+        thread = cache.start()
+        cache.stop()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertIsNotNone(cache.age)
+
+    def test_polling_pauses_while_unused(self):
+        cache = HueStateCache(self.hue_manager, interval=0.01, idle_timeout=60, clock=self.clock)
+        thread = cache.start()
+        for _ in range(500):
+            if cache.age is not None:
+                break
+            time.sleep(0.01)
+        requests = self.bridge.requests
+
+        time.sleep(0.1)
+        self.assertEqual(requests, self.bridge.requests)
+
+        cache.get_cached_group_state("Kitchen")
+        time.sleep(0.1)
+        cache.stop()
+        thread.join(5)
+        self.assertGreater(self.bridge.requests, requests)
@@ -0,0 +1,66 @@
+import threading
+from unittest import TestCase
+from unittest.mock import Mock
+
+import requests
+
+from philipshue.huewatcher import HueWatcher
+
+
+class TestHueWatcher(TestCase):
+
+    def test_callbacks_are_called_in_order_when_groups_changed(self):
+        hue_manager = Mock()
+        hue_manager.refresh.return_value = True
+        calls = []
+        hue_watcher = HueWatcher(hue_manager)
+        hue_watcher.subscribe(lambda: calls.append("handler"))
+        hue_watcher.subscribe(lambda: calls.append("rhasspy"))
+
+        self.assertTrue(hue_watcher.check())
+        self.assertEqual(["handler", "rhasspy"], calls)
+
+    def test_callbacks_are_not_called_when_nothing_changed(self):
+        hue_manager = Mock()
+        hue_manager.refresh.return_value = False
+        callback = Mock()
+        hue_watcher = HueWatcher(hue_manager)
+        hue_watcher.subscribe(callback)
+
+        self.assertFalse(hue_watcher.check())
+        callback.assert_not_called()
+
+    def test_unreachable_bridge(self):
+        hue_manager = Mock()
+        hue_manager.refresh.side_effect = requests.ConnectionError("Bridge is offline")
+        callback = Mock()
+        hue_watcher = HueWatcher(hue_manager)
+        hue_watcher.subscribe(callback)
+
+        self.assertFalse(hue_watcher.check())
+        callback.assert_not_called()
+
+    def test_failing_callback_does_not_stop_the_others(self):
+        hue_manager = Mock()
+        hue_manager.refresh.return_value = True
+        callback = Mock()
+        hue_watcher = HueWatcher(hue_manager)
+        hue_watcher.subscribe(Mock(side_effect=KeyError("Room")))
+        hue_watcher.subscribe(callback)
+
+        self.assertTrue(hue_watcher.check())
+        callback.assert_called_once()
+
+    def test_watch_in_background(self):
+        changed = threading.Event()
+        hue_manager = Mock()
+        hue_manager.refresh.return_value = True
+        hue_watcher = HueWatcher(hue_manager, interval=0.01)
+        hue_watcher.subscribe(changed.set)
+
+        thread = hue_watcher.start()
+        self.assertTrue(changed.wait(5))
+        hue_watcher.stop()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
@@ -0,0 +1,53 @@
+"""Module that lets Rhasspy listen for a follow-up command, when an IntentHandler wants to continue
+the dialog with the user"""
+import logging
+from threading import Condition, Thread
+from typing import List
+
+import requests
+
+from core.utils.classname import fullname
+
+
+class ConversationDispatcher(object):
+    """Asks Rhasspy to listen for the next command of a dialog, as soon as the response to the
+    previous command has been spoken.
+
+    The dispatcher thread sleeps until a continuation is requested, so no time is lost polling.
+    Continuations are kept per Rhasspy site, so dialogs on different satellites don't interfere
+    with each other. All requests to Rhasspy reuse the connections of one requests.Session."""
+
+    LISTEN_FOR_COMMAND = "/listen-for-command"
+
+    def __init__(self, api_url: str, session: requests.Session = None):
+        self._logger = logging.getLogger(fullname(self))
+        self._api_url = api_url
+        self._session = session if session else requests.Session()
+        self._condition = Condition()
+        self._pending_sites: List[str] = []
+        thread = Thread(target=self._dispatch_continuations, daemon=True)
+        thread.start()
+
+    def continue_conversation(self, site_id: str):
+        """Requests Rhasspy at the given site to listen for a new command. A site which already
+        has a pending continuation is only asked to listen once."""
+        with self._condition:
+            if site_id not in self._pending_sites:
+                self._pending_sites.append(site_id)
+                self._condition.notify()
+
+    def _dispatch_continuations(self):
+        while True:
+            with self._condition:
+                while not self._pending_sites:
+                    self._condition.wait()
+                site_id = self._pending_sites.pop(0)
+            self._listen_for_command(site_id)
+
+    def _listen_for_command(self, site_id: str):
+        try:
+            self._session.post(self._api_url + self.LISTEN_FOR_COMMAND,
+                               params={"siteId": site_id})
+        except requests.RequestException as exception:
+            self._logger.error("Could not continue the conversation on site %s: %s", site_id,
+                               exception)
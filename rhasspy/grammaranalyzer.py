@@ -0,0 +1,160 @@
+"""This module estimates the size of the grammar which Rhasspy is trained with, and decides which
+sets of values become slots. The number of sentence expansions, the distinct sentences the
+grammar accepts, drives the training time and the size of the model of Rhasspy.
+
+Whether a set of values is a slot or an inline alternative doesn't change the expansions: Rhasspy
+substitutes the values of a slot into the sentences before training, so both accept the same
+texts. The choice only changes how much text is uploaded to and parsed by Rhasspy."""
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+
+from core.compiledintentdefinition import CompiledIntentDefinition, \
+    CompiledNumberRangeParameter, CompiledSentence, CompiledSetParameter, CompiledString, \
+    CompiledVariable, CompiledVariableParameter
+from core.sentencetemplate import SentenceTemplateParser, TemplateSequence, TemplateWord
+
+# Cost of a slot in number of alternatives: its file, the reference to it and reloading it.
+# With one use, sets of more than 5 values become slots, like before this cost model existed.
+SLOT_OVERHEAD = 4
+
+
+class GrammarAnalysis(object):
+    """Expansion counts of the IntentDefinitions and their sentences, and how often every set of
+    values is used"""
+
+    def __init__(self, expansions_by_intent: Dict[str, int],
+                 expansions_by_sentence: List[Tuple[str, int, int]],
+                 value_set_uses: Dict[FrozenSet[str], int]):
+        self._expansions_by_intent = expansions_by_intent
+        self._expansions_by_sentence = expansions_by_sentence
+        self._value_set_uses = value_set_uses
+
+    @property
+    def total_expansions(self) -> int:
+        return sum(self._expansions_by_intent.values())
+
+    @property
+    def expansions_by_intent(self) -> Dict[str, int]:
+        """Number of expansions of every IntentDefinition, by name"""
+        return self._expansions_by_intent
+
+    def largest_sentences(self, number: int = 5) -> List[Tuple[str, int, int]]:
+        """Returns the (intent name, sentence index, expansions) of the sentences with the most
+        expansions"""
+        return sorted(self._expansions_by_sentence, key=lambda item: item[2],
+                      reverse=True)[:number]
+
+    def largest_intents(self, number: int = 5) -> List[Tuple[str, int]]:
+        """Returns the (intent name, expansions) of the IntentDefinitions with the most
+        expansions"""
+        return sorted(self._expansions_by_intent.items(), key=lambda item: item[1],
+                      reverse=True)[:number]
+
+    def uses(self, possible_values: Sequence[str]) -> int:
+        """Number of SetParameters in the grammar with these values"""
+        return self._value_set_uses.get(frozenset(possible_values), 0)
+
+    def use_slot(self, possible_values: Sequence[str]) -> bool:
+        """Decides whether the values become a slot or an inline (a | b | c) alternative. Both
+        have the same expansions, so the choice is made on the size of the uploaded grammar:
+        inline, every use writes all values into the sentences; as a slot, every use is one
+        reference and the values are uploaded once, and only again when they change. The
+        slot is chosen when that is smaller."""
+        uses = max(1, self.uses(possible_values))
+        return uses * len(possible_values) > SLOT_OVERHEAD + uses
+
+
+class GrammarAnalyzer(object):
+    """Counts the sentence expansions of compiled IntentDefinitions. An expansion is one of the
+    distinct texts a sentence accepts: alternatives add up, consecutive parts multiply, an
+    optional part adds the expansion without it, a number range has one expansion per number
+    and a Variable the expansions of all of its sentences.
+
+    The counts of every IntentDefinition are remembered by content hash until the next
+    analysis, and equal sentences are only counted once."""
+
+    def __init__(self):
+        self._expansions_by_hash: Dict[str, Tuple[int, ...]] = {}
+
+    def analyze(self, intent_definitions: List[CompiledIntentDefinition]) -> GrammarAnalysis:
+        expansions_by_intent: Dict[str, int] = {}
+        expansions_by_sentence: List[Tuple[str, int, int]] = []
+        expansions_by_hash: Dict[str, Tuple[int, ...]] = {}
+        sentence_expansions: Dict[Tuple, int] = {}
+        for intent_definition in intent_definitions:
+            if intent_definition.name == "":
+                continue
+            expansions = expansions_by_hash.get(intent_definition.content_hash) or \
+                self._expansions_by_hash.get(intent_definition.content_hash)
+            if expansions is None:
+                expansions = self._count_sentences(intent_definition, sentence_expansions)
+            expansions_by_hash[intent_definition.content_hash] = expansions
+            for index, sentence_expansion in enumerate(expansions):
+                expansions_by_sentence.append((intent_definition.name, index,
+                                               sentence_expansion))
+            expansions_by_intent[intent_definition.name] = \
+                expansions_by_intent.get(intent_definition.name, 0) + sum(expansions)
+        self._expansions_by_hash = expansions_by_hash
+        return GrammarAnalysis(expansions_by_intent, expansions_by_sentence,
+                               GrammarAnalyzer.count_value_set_uses(intent_definitions))
+
+    @staticmethod
+    def count_value_set_uses(intent_definitions: List[CompiledIntentDefinition]) \
+            -> Dict[FrozenSet[str], int]:
+        """Returns how many SetParameters use every set of values"""
+        value_set_uses: Dict[FrozenSet[str], int] = {}
+        for intent_definition in intent_definitions:
+            for parameter in intent_definition.set_parameters:
+                key = frozenset(parameter.possible_values)
+                value_set_uses[key] = value_set_uses.get(key, 0) + 1
+        return value_set_uses
+
+    @staticmethod
+    def _count_sentences(intent_definition: CompiledIntentDefinition,
+                         sentence_expansions: Dict[Tuple, int]) -> Tuple[int, ...]:
+        variables = {variable.name: variable for variable in intent_definition.variables}
+        expansions = []
+        for sentence in intent_definition.sentences:
+            key = (sentence, intent_definition.variables)
+            if key not in sentence_expansions:
+                sentence_expansions[key] = GrammarAnalyzer.count_sentence(sentence, variables)
+            expansions.append(sentence_expansions[key])
+        return tuple(expansions)
+
+    @staticmethod
+    def count_sentence(sentence: CompiledSentence,
+                       variables: Dict[str, CompiledVariable]) -> int:
+        expansions = 1
+        for part in sentence:
+            expansions *= GrammarAnalyzer._count_part(part, variables)
+        return expansions
+
+    @staticmethod
+    def _count_part(part, variables: Dict[str, CompiledVariable]) -> int:
+        if isinstance(part, CompiledString):
+            expansions = GrammarAnalyzer._count_template(SentenceTemplateParser.parse(part.text))
+        elif isinstance(part, CompiledSetParameter):
+            expansions = len(part.possible_values)
+        elif isinstance(part, CompiledNumberRangeParameter):
+            expansions = max(0, part.upper_value - part.lower_value + 1)
+        elif isinstance(part, CompiledVariableParameter):
+            variable = variables.get(part.name)
+            # a variable can't refer to itself, so it is left out of its own count
+            inner_variables = {name: other for name, other in variables.items()
+                               if name != part.name}
+            expansions = sum(GrammarAnalyzer.count_sentence(sentence, inner_variables)
+                             for sentence in variable.sentences) if variable else 0
+        else:
+            expansions = 1
+        return expansions + 1 if part.optional else expansions
+
+    @staticmethod
+    def _count_template(template) -> int:
+        if isinstance(template, TemplateWord):
+            return 1
+        if isinstance(template, TemplateSequence):
+            expansions = 1
+            for item in template.items:
+                expansions *= GrammarAnalyzer._count_template(item)
+            return expansions
+        expansions = sum(GrammarAnalyzer._count_template(option) for option in template.options)
+        return expansions + 1 if template.optional else expansions
@@ -0,0 +1,328 @@
+"""This module contains the GrammarOptimizer, which makes the sentences that are uploaded to
+Rhasspy smaller, without changing which texts they accept. A smaller sentences.ini is uploaded,
+parsed and trained faster."""
+import logging
+from functools import lru_cache
+from typing import AbstractSet, Dict, FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
+
+from core.compiledintentdefinition import CompiledIntentDefinition, CompiledPart, \
+    CompiledSentence, CompiledString, CompiledVariable, CompiledVariableParameter, \
+    create_compiled_intent_definition
+from core.sentencetemplate import SentenceTemplateParser, TemplateSequence, TemplateWord
+from core.utils.classname import fullname
+
+# Definitions with more expansions than this are not optimized, because the result can't be
+# verified
+VERIFY_LIMIT = 100000
+# Number of characters a rule costs in sentences.ini besides its sentences, like
+# "rule0 = ()" and the reference "<rule0>"
+RULE_OVERHEAD = 20
+_TEMPLATE_CHARACTERS = set("()[]|:")
+
+_Expansions = AbstractSet[Tuple[str, ...]]
+
+
+class GrammarOptimizer(object):
+    """Rewrites compiled IntentDefinitions into smaller equivalent ones:
+    - equal sentences are merged into one
+    - sentences which only differ in one word or template are merged into one sentence with an
+      alternative, like "Turn the lights (on | off)"
+    - the parts which several sentences start or end with are only written once, followed or
+      preceded by a rule (a Variable) with the rest of these sentences, when that is shorter
+
+    The result accepts exactly the same texts with the same parameters. This is verified by
+    comparing the expansions before and after optimizing, with the parameters left as they are,
+    because they are never changed. When they differ, or when there are more than VERIFY_LIMIT
+    expansions to compare, the original IntentDefinition is used.
+
+    The optimized IntentDefinitions are remembered by content hash until the next call of
+    optimize_all, so only the IntentDefinitions which changed are optimized again."""
+
+    def __init__(self):
+        self._logger = logging.getLogger(fullname(self))
+        self._optimized: Dict[str, CompiledIntentDefinition] = {}
+
+    def optimize_all(self, intent_definitions: List[CompiledIntentDefinition]) \
+            -> List[CompiledIntentDefinition]:
+        optimized_by_hash: Dict[str, CompiledIntentDefinition] = {}
+        result = []
+        for intent_definition in intent_definitions:
+            content_hash = intent_definition.content_hash
+            optimized = optimized_by_hash.get(content_hash) or self._optimized.get(content_hash)
+            if optimized is None:
+                optimized = self.optimize(intent_definition)
+            optimized_by_hash[content_hash] = optimized
+            result.append(optimized)
+        self._optimized = optimized_by_hash
+        return result
+
+    def optimize(self, intent_definition: CompiledIntentDefinition) -> CompiledIntentDefinition:
+        if intent_definition.name == "" or not intent_definition.sentences:
+            return intent_definition
+        variables = tuple(
+            CompiledVariable(variable.name, tuple(
+                _join_words(sentence)
+                for sentence in self._merge(_split_words(variable.sentences))))
+            for variable in intent_definition.variables)
+        rules: List[CompiledVariable] = []
+        rule_names = _rule_names({variable.name for variable in variables})
+        sentences = tuple(_join_words(sentence) for sentence in self._factor(
+            _split_words(intent_definition.sentences), rules, rule_names))
+        optimized = create_compiled_intent_definition(intent_definition.name,
+                                                      variables + tuple(rules), sentences)
+        original_expansions = expand(intent_definition, VERIFY_LIMIT)
+        optimized_expansions = expand(optimized, VERIFY_LIMIT)
+        if original_expansions is None or optimized_expansions is None:
+            self._logger.info("%s has too many expansions to verify its optimization, using the "
+                              "original sentences", intent_definition.name)
+            return intent_definition
+        if original_expansions != optimized_expansions:
+            self._logger.error("Optimizing %s changed its sentences, using the original ones",
+                               intent_definition.name)
+            return intent_definition
+        return optimized
+
+    def _factor(self, sentences: List[CompiledSentence], rules: List[CompiledVariable],
+                rule_names: Iterator[str]) -> List[CompiledSentence]:
+        sentences = self._merge(sentences)
+        sentences = self._factor_prefixes(sentences, rules, rule_names, reverse=False)
+        return self._factor_prefixes(sentences, rules, rule_names, reverse=True)
+
+    @staticmethod
+    def _merge(sentences: Sequence[CompiledSentence]) -> List[CompiledSentence]:
+        """Removes equal sentences and merges the sentences which only differ in one string
+        into one, with the strings as alternatives, until no more sentences can be merged"""
+        sentences = _unique(sentences)
+        merged = True
+        while merged:
+            merged = False
+            for position in range(max((len(sentence) for sentence in sentences), default=0)):
+                groups: Dict[Tuple, List[int]] = {}
+                for index, sentence in enumerate(sentences):
+                    if position < len(sentence) and _is_mergeable(sentence[position]):
+                        key = _sentence_key(sentence[:position] + sentence[position + 1:])
+                        groups.setdefault((len(sentence), key), []).append(index)
+                replacements: Dict[int, CompiledSentence] = {}
+                removed = set()
+                for indexes in groups.values():
+                    if len(indexes) < 2:
+                        continue
+                    texts = _unique([sentences[index][position].text for index in indexes])
+                    alternative = CompiledString("({})".format(" | ".join(texts)), False, False)
+                    first = sentences[indexes[0]]
+                    replacements[indexes[0]] = \
+                        first[:position] + (alternative,) + first[position + 1:]
+                    removed.update(indexes[1:])
+                if replacements:
+                    merged = True
+                    sentences = _unique([replacements.get(index, sentence)
+                                         for index, sentence in enumerate(sentences)
+                                         if index not in removed])
+        return sentences
+
+    def _factor_prefixes(self, sentences: List[CompiledSentence], rules: List[CompiledVariable],
+                         rule_names: Iterator[str], reverse: bool) -> List[CompiledSentence]:
+        """Writes the longest common prefix of the sentences which start with the same part only
+        once, followed by a rule with the rest of these sentences. With reverse, the same is
+        done for the common suffixes."""
+        if reverse:
+            sentences = [sentence[::-1] for sentence in sentences]
+        groups: Dict[Tuple, List[int]] = {}
+        for index, sentence in enumerate(sentences):
+            if sentence:
+                groups.setdefault(_part_key(sentence[0]), []).append(index)
+        result = []
+        handled = set()
+        for index, sentence in enumerate(sentences):
+            if index in handled:
+                continue
+            group = groups.get(_part_key(sentence[0])) if sentence else None
+            if not group or len(group) < 2:
+                result.append(sentence)
+                continue
+            handled.update(group)
+            members = [sentences[member] for member in group]
+            length = _common_prefix_length(members)
+            prefix = members[0][:length]
+            if (len(members) - 1) * _size(prefix) <= RULE_OVERHEAD:
+                result.extend(members)
+                continue
+            tails = [member[length:] for member in members]
+            if reverse:
+                tails = [tail[::-1] for tail in tails]
+            rule_name = next(rule_names)
+            rule_sentences = self._factor([tail for tail in tails if tail], rules, rule_names)
+            rules.append(CompiledVariable(rule_name, tuple(_join_words(rule_sentence)
+                                                           for rule_sentence in rule_sentences)))
+            optional = any(not tail for tail in tails)
+            result.append(prefix + (CompiledVariableParameter(rule_name, False, optional),))
+        if reverse:
+            result = [sentence[::-1] for sentence in result]
+        return result
+
+
+def expand(intent_definition: CompiledIntentDefinition,
+           limit: int = VERIFY_LIMIT) -> Optional[_Expansions]:
+    """Returns every distinct sequence of words the sentences of the IntentDefinition accept,
+    or None when there are more than limit. Parameters are not expanded: every parameter is one
+    item of the sequence, and the words of a Variable with a return value are surrounded by its
+    tag."""
+    variables = {variable.name: variable for variable in intent_definition.variables}
+    return _expand_sentences(intent_definition.sentences, variables, limit)
+
+
+def _expand_sentences(sentences: Sequence[CompiledSentence],
+                      variables: Dict[str, CompiledVariable], limit: int) -> Optional[_Expansions]:
+    expansions: Set[Tuple[str, ...]] = set()
+    for sentence in sentences:
+        sentence_expansions: _Expansions = {()}
+        for part in sentence:
+            concatenated = _concatenate(sentence_expansions,
+                                        _expand_part(part, variables, limit), limit)
+            if concatenated is None:
+                return None
+            sentence_expansions = concatenated
+        expansions.update(sentence_expansions)
+        if len(expansions) > limit:
+            return None
+    return expansions
+
+
+def _expand_part(part: CompiledPart, variables: Dict[str, CompiledVariable],
+                 limit: int) -> Optional[_Expansions]:
+    expansions: Optional[_Expansions]
+    if isinstance(part, CompiledString):
+        expansions = _expand_string(part.text, limit)
+        if expansions is not None and part.substitute:
+            expansions = {expansion + (":",) for expansion in expansions}
+    elif isinstance(part, CompiledVariableParameter) and part.name in variables:
+        # a variable can't refer to itself, so it is left out of its own expansion
+        inner_variables = {name: variable for name, variable in variables.items()
+                           if name != part.name}
+        expansions = _expand_sentences(variables[part.name].sentences, inner_variables, limit)
+        if expansions is not None and part.return_value:
+            expansions = {("<{}>{{".format(part.name),) + expansion + ("}",)
+                          for expansion in expansions}
+    else:
+        expansions = {(repr(part._replace(optional=False)),)}
+    if expansions is not None and part.optional:
+        expansions = expansions | {()}
+    return expansions
+
+
+@lru_cache(maxsize=4096)
+def _expand_string(text: str, limit: int) -> Optional[FrozenSet[Tuple[str, ...]]]:
+    expansions = _expand_template(SentenceTemplateParser.parse(text), limit)
+    return frozenset(expansions) if expansions is not None else None
+
+
+def _expand_template(template, limit: int) -> Optional[_Expansions]:
+    if isinstance(template, TemplateWord):
+        return {(template.text,)}
+    if isinstance(template, TemplateSequence):
+        expansions: _Expansions = {()}
+        for item in template.items:
+            concatenated = _concatenate(expansions, _expand_template(item, limit), limit)
+            if concatenated is None:
+                return None
+            expansions = concatenated
+        return expansions
+    alternatives: Set[Tuple[str, ...]] = set()
+    for option in template.options:
+        option_expansions = _expand_template(option, limit)
+        if option_expansions is None:
+            return None
+        alternatives.update(option_expansions)
+    if template.optional:
+        alternatives.add(())
+    return alternatives
+
+
+def _concatenate(first: _Expansions, second: Optional[_Expansions],
+                 limit: int) -> Optional[_Expansions]:
+    if second is None or len(first) * len(second) > limit:
+        return None
+    return {head + tail for head in first for tail in second}
+
+
+def _part_key(part) -> Tuple:
+    # the type is part of the key, because a CompiledString and a CompiledVariableParameter
+    # can be equal tuples
+    return type(part).__name__, part
+
+
+def _sentence_key(sentence: CompiledSentence) -> Tuple:
+    return tuple(_part_key(part) for part in sentence)
+
+
+def _unique(items: Sequence) -> List:
+    """Returns the items without duplicates, in their original order"""
+    seen = set()
+    result = []
+    for item in items:
+        key = _sentence_key(item) if isinstance(item, tuple) else item
+        if key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result
+
+
+def _is_mergeable(part) -> bool:
+    return isinstance(part, CompiledString) and not part.optional and not part.substitute
+
+
+def _is_plain(part) -> bool:
+    """Whether the part is a string of words without template syntax"""
+    return _is_mergeable(part) and not _TEMPLATE_CHARACTERS.intersection(part.text)
+
+
+def _split_words(sentences: Sequence[CompiledSentence]) -> List[CompiledSentence]:
+    """Splits the plain strings of the sentences into one string per word. The words are
+    rendered the same way, separated by spaces, but they can be factored one by one."""
+    result = []
+    for sentence in sentences:
+        parts: List[CompiledPart] = []
+        for part in sentence:
+            if isinstance(part, CompiledString) and _is_plain(part):
+                parts.extend(CompiledString(word, False, False) for word in part.text.split())
+            else:
+                parts.append(part)
+        result.append(tuple(parts))
+    return result
+
+
+def _join_words(sentence: CompiledSentence) -> CompiledSentence:
+    """Joins consecutive plain strings into one string again"""
+    parts: List[CompiledPart] = []
+    for part in sentence:
+        previous = parts[-1] if parts else None
+        if isinstance(part, CompiledString) and isinstance(previous, CompiledString) and \
+                _is_plain(part) and _is_plain(previous):
+            parts[-1] = CompiledString(previous.text + " " + part.text, False, False)
+        else:
+            parts.append(part)
+    return tuple(parts)
+
+
+def _common_prefix_length(sentences: List[CompiledSentence]) -> int:
+    length = 0
+    shortest = min(len(sentence) for sentence in sentences)
+    while length < shortest and all(_part_key(sentence[length]) ==
+                                    _part_key(sentences[0][length]) for sentence in sentences):
+        length += 1
+    return length
+
+
+def _size(sentence: CompiledSentence) -> int:
+    """Estimated number of characters of the sentence in sentences.ini"""
+    return sum(len(part.text) + 1 if isinstance(part, CompiledString) else 2 * len(part.name) + 4
+               for part in sentence)
+
+
+def _rule_names(taken: Set[str]) -> Iterator[str]:
+    number = 0
+    while True:
+        name = "rule{}".format(number)
+        number += 1
+        if name not in taken:
+            yield name
@@ -0,0 +1,36 @@
+"""Module that converts the intent json of Rhasspy into core.intent.Intent objects"""
+import json
+from typing import Any, Callable, Tuple, Union
+
+from core.intent import Intent
+from core.metrics import REGISTRY
+
+_loads: Callable[[Union[str, bytes]], Any]
+try:
+    import orjson  # type: ignore
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+PARSE_TIME = REGISTRY.histogram("intent_parse_seconds",
+                                "Time spent decoding the intent json of Rhasspy")
+
+
+class RhasspyIntentDecoder(object):
+    """Decodes Rhasspy intent json. Only the name of the intent, the text, the slots and the
+    siteId are taken from the json, everything else Rhasspy sends along is ignored.
+
+    When orjson is installed it is used to parse the json, otherwise the json module of the
+    standard library is used."""
+
+    DEFAULT_SITE_ID = "default"
+
+    @staticmethod
+    def decode(raw_intent) -> Tuple[Intent, str]:
+        """Takes the raw json (str or bytes) of a Rhasspy intent and returns the Intent and the
+        id of the Rhasspy site which recognized it"""
+        with PARSE_TIME.time():
+            intent_dict = _loads(raw_intent)
+            intent = Intent(intent_dict["intent"]["name"], intent_dict["text"],
+                            intent_dict.get("slots"))
+        return intent, intent_dict.get("siteId") or RhasspyIntentDecoder.DEFAULT_SITE_ID
@@ -7,106 +7,292 @@ import os
 import time
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from io import BytesIO
-from threading import Thread
-
-import requests
+from queue import Queue
+from threading import BoundedSemaphore, Event, Thread
+from typing import Optional, Union, cast
 
 from core.intent import Intent
+from core.intentdefinitionsource import IntentDefinitionSource
+from core.intentmatcher import IntentMatcher
+from core.metrics import REGISTRY
 from core.newintentobserver import NewIntentObserver
 from core.newintentsubject import NewIntentSubject
 from core.utils.classname import fullname
+from rhasspy.conversation import ConversationDispatcher
+from rhasspy.intentdecoder import RhasspyIntentDecoder
+
+
+class IntentRequestContext(object):
+    """Holds everything that belongs to one incoming intent request. A new context is created for
+    every request, so concurrent requests never share state through the RhasspyIntentReceiver."""
+
+    DEFAULT_SITE_ID = "default"
+
+    def __init__(self, raw_intent: Union[str, bytes], client_address=None):
+        self._raw_intent = raw_intent
+        self._client_address = client_address
+        self._received_at = time.time()
+        self.site_id = self.DEFAULT_SITE_ID
+        self.continue_dialog = False
+
+    @property
+    def raw_intent(self) -> Union[str, bytes]:
+        """The intent json, as it was received from Rhasspy"""
+        return self._raw_intent
+
+    @property
+    def client_address(self):
+        """Address of the Rhasspy instance which sent the intent, if known"""
+        return self._client_address
+
+    @property
+    def received_at(self) -> float:
+        """Timestamp at which the intent was received"""
+        return self._received_at
 
 
 class SimpleHTTPRequestHandler(BaseHTTPRequestHandler):
     """Objects of SimpleHTTPRequestHandler are constructed by the HTTPServer when a POST message
-    is received. Handles the POST and returns a response to Rhasspy."""
+    is received. Handles the POST and returns a response to Rhasspy.
+
+    The POST is passed on to the RhasspyIntentReceiver which owns the HTTPServer, so no new
+    RhasspyIntentReceiver has to be constructed for every request."""
+
+    @property
+    def _intent_receiver(self) -> "RhasspyIntentReceiver":
+        intent_receiver = cast(BoundedThreadingHTTPServer, self.server).intent_receiver
+        if intent_receiver is None:
+            raise RuntimeError("The HTTPServer has no RhasspyIntentReceiver")
+        return intent_receiver
 
     def do_POST(self):
         """
-        Handles POST messages to the HTTPServer. Expects intent json in the style of Rhasspy
+        Handles POST messages to the HTTPServer. Expects intent json in the style of Rhasspy,
+        or a plain text command when posted to /text
         :return:
         """
         content_length = int(self.headers['Content-Length'])
         intent_string = self.rfile.read(content_length)
-        response_string = RhasspyIntentReceiver().handle_new_intent(intent_string)
+        if self.path == "/text":
+            self._handle_text(intent_string.decode("utf-8"))
+            return
+        context = IntentRequestContext(intent_string, self.client_address)
+        try:
+            response_string = self._intent_receiver.handle_new_intent(intent_string, context)
+        except Exception as exception:
+            logging.getLogger(fullname(self)).error("Failed to handle intent %s: %s",
+                                                    intent_string, exception)
+            self.send_response(500)
+            self.end_headers()
+            return
         self.send_response(200)
         self.end_headers()
         response = BytesIO()
         response.write(response_string.encode("utf-8"))
         self.wfile.write(response.getvalue())
+        self.wfile.flush()
+        self._intent_receiver.response_sent(context)
+
+    def _handle_text(self, text: str):
+        try:
+            response_string = self._intent_receiver.handle_text(text)
+        except Exception as exception:
+            logging.getLogger(fullname(self)).error("Failed to handle text %s: %s", text,
+                                                    exception)
+            self.send_response(500)
+            self.end_headers()
+            return
+        if response_string is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = response_string.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """Serves the metrics of the process in the Prometheus text format on /metrics"""
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.getLogger(fullname(self)).debug(format, *args)
+
+
+class BoundedThreadingHTTPServer(HTTPServer):
+    """HTTPServer which handles every request on one of a fixed number of worker threads, so a
+    slow IntentHandler doesn't stall the POST messages of the other Rhasspy satellites.
+
+    When all workers are busy, the server stops accepting new connections until a worker is
+    available again. The pending connections wait in the listen backlog of the socket."""
+
+    intent_receiver: Optional["RhasspyIntentReceiver"]
+
+    def __init__(self, server_address, request_handler_class, max_workers: int,
+                 intent_receiver: "RhasspyIntentReceiver" = None):
+        self.intent_receiver = intent_receiver
+        self._max_workers = max_workers
+        self._requests: Queue = Queue()
+        self._free_workers = BoundedSemaphore(max_workers)
+        HTTPServer.__init__(self, server_address, request_handler_class)
+        for _ in range(max_workers):
+            Thread(target=self._process_requests, daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self._free_workers.acquire()
+        self._requests.put((request, client_address))
+
+    def _process_requests(self):
+        while True:
+            request, client_address = self._requests.get()
+            if request is None:
+                return
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self._free_workers.release()
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        for _ in range(self._max_workers):
+            self._requests.put((None, None))
 
 
 class RhasspyIntentReceiver(NewIntentSubject):
     """Contains functionality to convert Rhasspy intent json into core.intent.Intent objects.
-    Also constructs the response for the POST message, back to Rhasspy"""
+    Also constructs the response for the POST message, back to Rhasspy.
+
+    Only one RhasspyIntentReceiver should be constructed. It reads its configuration once and
+    owns the HTTPServer which receives the intents for its whole lifetime.
+
+    When the attached observer is also an IntentDefinitionSource, like the
+    IntentHandlerManager, texts POSTed to /text are matched against its IntentDefinitions by an
+    IntentMatcher and dispatched without a round-trip to Rhasspy."""
 
     HOST = ''
     PORT = 8081
-    _intent_listener = None
-    _timer = None
+    DEFAULT_MAX_CONCURRENT_INTENTS = 4
     api_url = None
 
-    def __init__(self):
+    def __init__(self, port: int = PORT):
         self._logger = logging.getLogger(fullname(self))
-        thread = Thread(target=self._run_server, daemon=True)
-        thread.start()
-
-        conversation_mode_thread = Thread(target=self._start_conversation_mode, daemon=True)
-        conversation_mode_thread.start()
-
+        self._intent_listener: Optional[NewIntentObserver] = None
+        self._intent_matcher: Optional[IntentMatcher] = None
+        self._port = port
+        self._httpd = None
+        self._server_started = Event()
         config = configparser.ConfigParser()
         config_file = os.path.dirname(os.path.abspath(__file__)) + "/config.ini"
         config.read(config_file)
         RhasspyIntentReceiver.api_url = config["Rhasspy"]["Speaker"]
+        self._max_concurrent_intents = config["Rhasspy"].getint(
+            "MaxConcurrentIntents", fallback=self.DEFAULT_MAX_CONCURRENT_INTENTS)
 
-    def _start_conversation_mode(self):
-        RhasspyIntentReceiver._intent_handled = False
-        while True:
-            time.sleep(1)
-            if RhasspyIntentReceiver._intent_handled:
-                RhasspyIntentReceiver._intent_handled = False
-                requests.post(RhasspyIntentReceiver.api_url + "/listen-for-command")
+        self._conversation_dispatcher = ConversationDispatcher(RhasspyIntentReceiver.api_url)
+
+        thread = Thread(target=self._run_server, daemon=True)
+        thread.start()
 
-    def handle_new_intent(self, intent_string: str):
+    def handle_new_intent(self, intent_string: Union[str, bytes],
+                          context: IntentRequestContext = None):
         """Typically called from the SimpleHTTPRequestHandler.do_POST method, this method takes
         raw json, converts it into an object of type core.intent.Intent and notifies any
         NewIntentObservers of the arrival of the new Intent.
         Returns a string containing the response body which is to be returned to Rhasspy"""
-        incoming_time = time.time()
+        if context is None:
+            context = IntentRequestContext(intent_string)
         self._logger.info("Received intent: %s", intent_string)
-        intent = self._create_intent_object(intent_string)
+        intent, context.site_id = RhasspyIntentDecoder.decode(intent_string)
         response = ""
         if intent.name != "" and intent.full_intent_string != "":
-            if RhasspyIntentReceiver._intent_listener:
-                response, continue_dialog = RhasspyIntentReceiver._intent_listener.update(intent)
-                if continue_dialog:
-                    RhasspyIntentReceiver._intent_handled = True
+            if self._intent_listener:
+                response, context.continue_dialog = self._intent_listener.update(intent)
+        self._logger.info("Response: {}".format(response))
+        return self._create_return_body(intent, context.received_at, response)
+
+    def handle_text(self, text: str):
+        """Typically called from the SimpleHTTPRequestHandler when a text is POSTed to /text.
+        Matches the text with the IntentMatcher and notifies the NewIntentObserver of the
+        Intent. Returns the response body, or None when the text doesn't match any Intent."""
+        context = IntentRequestContext(text)
+        self._logger.info("Received text: %s", text)
+        intent = self._intent_matcher.match(text) if self._intent_matcher else None
+        if intent is None:
+            self._logger.info("No intent matches the text: %s", text)
+            return None
+        response = ""
+        if self._intent_listener:
+            response, _ = self._intent_listener.update(intent)
         self._logger.info("Response: {}".format(response))
-        return self._create_return_body(intent, incoming_time, response)
+        return self._create_return_body(intent, context.received_at, response)
+
+    @property
+    def intent_matcher(self) -> Optional[IntentMatcher]:
+        """The IntentMatcher used for /text, or None when the observer has no IntentDefinitions"""
+        return self._intent_matcher
+
+    def response_sent(self, context: IntentRequestContext):
+        """Called once the response to an intent was returned to Rhasspy, which then speaks it.
+        When the IntentHandler wants to continue the dialog, Rhasspy is asked to listen for the
+        next command right away."""
+        if context.continue_dialog:
+            self._conversation_dispatcher.continue_conversation(context.site_id)
 
     def attach(self, observer: NewIntentObserver):
         """Attaches a new observer which implements the core.newintentobserver.NewIntentObserver
         class"""
         self._logger.info("Attached observer: %s", observer)
-        RhasspyIntentReceiver._intent_listener = observer
+        self._intent_listener = observer
+        if isinstance(observer, IntentDefinitionSource):
+            self._intent_matcher = IntentMatcher(observer)
 
     def detach(self, observer: NewIntentObserver):
         """Detaches an observer which implements the core.newintentobserver.NewIntentObserver
         class"""
         self._logger.info("Detached observer: %s", observer)
-        RhasspyIntentReceiver._intent_listener = None
+        self._intent_listener = None
+        self._intent_matcher = None
 
-    def _run_server(self):
-        httpd = HTTPServer((self.HOST, self.PORT), SimpleHTTPRequestHandler)
-        httpd.serve_forever()
+    def wait_until_serving(self, timeout: float = None):
+        """Blocks until the HTTPServer is listening and returns the (host, port) it listens on,
+        or None when the server didn't start within the timeout"""
+        if self._server_started.wait(timeout) and self._httpd:
+            return self._httpd.server_address
+        return None
 
-    @staticmethod
-    def _create_intent_object(raw_intent_string: str):
-        intent_dict = json.loads(raw_intent_string)
-        name = intent_dict["intent"]["name"]
-        if "slots" in intent_dict:
-            return Intent(name, intent_dict["text"], intent_dict["slots"])
-        return Intent(name, intent_dict["text"])
+    def shutdown(self):
+        """Stops the HTTPServer of the RhasspyIntentReceiver"""
+        if self.wait_until_serving(0):
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def _run_server(self):
+        try:
+            self._httpd = BoundedThreadingHTTPServer((self.HOST, self._port),
+                                                     SimpleHTTPRequestHandler,
+                                                     self._max_concurrent_intents,
+                                                     self)
+        except OSError as exception:
+            self._logger.error("Could not start the intent server on port %s: %s", self._port,
+                               exception)
+            return
+        finally:
+            self._server_started.set()
+        self._httpd.serve_forever()
 
     @staticmethod
     def _create_return_body(intent: Intent, timestamp: float, response: str):
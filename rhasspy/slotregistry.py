@@ -0,0 +1,64 @@
+"""This module contains the SlotRegistry, which decides which Rhasspy slots are created for the
+SetParameters of the IntentDefinitions"""
+from typing import Dict, FrozenSet, Optional, Sequence
+
+from core.compiledintentdefinition import CompiledSetParameter
+
+
+class SlotRegistry(object):
+    """Keeps one slot per distinct set of possible values. SetParameters with the same values
+    share a slot, whatever their name or IntentDefinition, and the slot of a set of values is
+    found in constant time.
+
+    A slot is named after the first SetParameter that registers its values. When that name is
+    already taken by other values, the slot is called <intent>_<parameter>, followed by _2, _3,
+    ... when that is taken as well. The names therefore only depend on the order in which the
+    SetParameters are registered."""
+
+    def __init__(self):
+        self._names_by_values: Dict[FrozenSet[str], str] = {}
+        self._slots: Dict[str, Sequence[str]] = {}
+
+    @staticmethod
+    def _key(possible_values: Sequence[str]) -> FrozenSet[str]:
+        return frozenset(possible_values)
+
+    def register(self, intent_definition_name: str, parameter: CompiledSetParameter) -> str:
+        """Returns the name of the slot for the values of the parameter, creating the slot when
+        these values weren't registered before"""
+        key = self._key(parameter.possible_values)
+        slot_name = self._names_by_values.get(key)
+        if slot_name is None:
+            slot_name = self._create_slot_name(intent_definition_name, parameter.name)
+            self._names_by_values[key] = slot_name
+            self._slots[slot_name] = parameter.possible_values
+        return slot_name
+
+    def _create_slot_name(self, intent_definition_name: str, parameter_name: str) -> str:
+        if parameter_name not in self._slots:
+            return parameter_name
+        slot_name = "{}_{}".format(intent_definition_name, parameter_name)
+        candidate = slot_name
+        suffix = 2
+        while candidate in self._slots:
+            candidate = "{}_{}".format(slot_name, suffix)
+            suffix += 1
+        return candidate
+
+    def slot_name(self, possible_values: Sequence[str]) -> str:
+        """Returns the name of the slot with the given values. Raises a KeyError when the values
+        weren't registered."""
+        return self._names_by_values[self._key(possible_values)]
+
+    def get(self, possible_values: Sequence[str], default: Optional[str] = None) -> Optional[str]:
+        """Returns the name of the slot with the given values, or the default when the values
+        weren't registered"""
+        return self._names_by_values.get(self._key(possible_values), default)
+
+    @property
+    def slots(self) -> Dict[str, Sequence[str]]:
+        """Returns the values of every slot, by slot name, in the order they were created"""
+        return self._slots
+
+    def __len__(self):
+        return len(self._slots)
@@ -5,8 +5,10 @@ from typing import ByteString
 
 import requests
 
+from core.metrics import REGISTRY
 from core.speaker import Speaker
 from core.texttospeech import TextToSpeechGenerator
+from core.utils.classname import fullname
 
 
 class RhasspySpeech(Speaker, TextToSpeechGenerator):
@@ -18,9 +20,17 @@ class RhasspySpeech(Speaker, TextToSpeechGenerator):
         config_file = os.path.dirname(os.path.abspath(__file__)) + "/config.ini"
         config.read(config_file)
         self._api_url = config["Rhasspy"]["Speaker"]
+        labels = {"speaker": fullname(self)}
+        self._synthesis_time = REGISTRY.histogram("speech_synthesis_seconds",
+                                                  "Time spent generating speech", labels)
+        self._playback_time = REGISTRY.histogram("speech_playback_seconds",
+                                                 "Time spent starting the playback of speech",
+                                                 labels)
 
     def speak_text(self, text: str):
-        requests.post(self._api_url + "/text-to-speech", text)
+        with self._playback_time.time():
+            requests.post(self._api_url + "/text-to-speech", text)
 
     def generate_speech_file(self, text: str) -> ByteString:
-        return requests.post(self._api_url + "/text-to-speech?play=false", text).content
+        with self._synthesis_time.time():
+            return requests.post(self._api_url + "/text-to-speech?play=false", text).content
@@ -0,0 +1,41 @@
+import threading
+from unittest import TestCase
+from unittest.mock import Mock
+
+from rhasspy.conversation import ConversationDispatcher
+
+
+class TestConversationDispatcher(TestCase):
+
+    API_URL = "http://localhost:12101/api"
+
+    def _create_session(self, expected_calls: int):
+        session = Mock()
+        calls_done = threading.Event()
+
+        def post(*args, **kwargs):
+            if session.post.call_count == expected_calls:
+                calls_done.set()
+        session.post.side_effect = post
+        return session, calls_done
+
+    def test_continue_conversation(self):
+        session, calls_done = self._create_session(1)
+        dispatcher = ConversationDispatcher(self.API_URL, session)
+
+        dispatcher.continue_conversation("default")
+
+        self.assertTrue(calls_done.wait(0.5))
+        session.post.assert_called_once_with(self.API_URL + "/listen-for-command",
+                                             params={"siteId": "default"})
+
+    def test_continue_conversation_on_multiple_sites(self):
+        session, calls_done = self._create_session(2)
+        dispatcher = ConversationDispatcher(self.API_URL, session)
+
+        dispatcher.continue_conversation("kitchen")
+        dispatcher.continue_conversation("study")
+
+        self.assertTrue(calls_done.wait(0.5))
+        site_ids = [call[1]["params"]["siteId"] for call in session.post.call_args_list]
+        self.assertCountEqual(["kitchen", "study"], site_ids)
@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+from core.compiledintentdefinition import IntentDefinitionCompiler
+from core.intentdefinition import IntentDefinition, NumberRangeParameter, SentenceBuilder, \
+    SetParameter, Variable, VariableParameter
+from rhasspy.grammaranalyzer import GrammarAnalyzer
+
+
+class TestGrammarAnalyzer(TestCase):
+
+    def test_count_expansions(self):
+        when = Variable("when", [SentenceBuilder().add_string("in").add_parameter(
+            NumberRangeParameter("minutes", True, 1, 60)).add_string("minutes").build(),
+                                 SentenceBuilder().add_string("(now | later)").build()])
+        dimmer = IntentDefinition("DimRoom")
+        dimmer.add_variable(when)
+        dimmer.add_sentence(SentenceBuilder().add_string("Set the [big]")
+                            .add_parameter(SetParameter("Room", True, ["Study", "Attic"]))
+                            .add_string("to")
+                            .add_parameter(NumberRangeParameter("level", True, 0, 100))
+                            .add_parameter(VariableParameter(when, optional=True))
+                            .build())
+        weather = IntentDefinition("GetTemperature", "How (warm | hot | cold) is it")
+
+        analysis = GrammarAnalyzer().analyze(IntentDefinitionCompiler().compile_all(
+            [dimmer, weather, IntentDefinition("")]))
+
+        # 2 (big) * 2 rooms * 101 levels * (60 minutes + 2 + 1 without)
+        self.assertEqual({"DimRoom": 2 * 2 * 101 * 63, "GetTemperature": 3},
+                         analysis.expansions_by_intent)
+        self.assertEqual(2 * 2 * 101 * 63 + 3, analysis.total_expansions)
+        self.assertEqual([("DimRoom", 0, 2 * 2 * 101 * 63)], analysis.largest_sentences(1))
+
+    def test_use_slot(self):
+        small_values = ["red", "green", "blue"]
+        intent_definitions = []
+        for index in range(3):
+            intent_definition = IntentDefinition("Color{}".format(index))
+            intent_definition.add_sentence(SentenceBuilder().add_string("Make it").add_parameter(
+                SetParameter("Color", True, small_values)).build())
+            intent_definitions.append(intent_definition)
+
+        analysis = GrammarAnalyzer().analyze(IntentDefinitionCompiler().compile_all(
+            intent_definitions))
+
+        self.assertEqual(3, analysis.uses(small_values))
+        self.assertTrue(analysis.use_slot(small_values))
+        self.assertTrue(analysis.use_slot(["1", "2", "3", "4", "5", "6"]))
+        self.assertFalse(analysis.use_slot(["1", "2", "3", "4", "5"]))
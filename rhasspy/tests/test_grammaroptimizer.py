@@ -0,0 +1,143 @@
+from unittest import mock, TestCase
+
+from core.compiledintentdefinition import CompiledString, CompiledVariableParameter, \
+    IntentDefinitionCompiler
+from core.intentdefinition import IntentDefinition, NumberRangeParameter, SentenceBuilder, \
+    SetParameter, Variable, VariableParameter
+from rhasspy.grammaroptimizer import expand, GrammarOptimizer
+
+
+class TestGrammarOptimizer(TestCase):
+
+    def setUp(self):
+        self.compiler = IntentDefinitionCompiler()
+        self.optimizer = GrammarOptimizer()
+
+    def optimize(self, intent_definition: IntentDefinition):
+        compiled = self.compiler.compile(intent_definition)
+        optimized = self.optimizer.optimize(compiled)
+        self.assertEqual(expand(compiled), expand(optimized))
+        return optimized
+
+    @staticmethod
+    def texts(sentence):
+        return [part.text for part in sentence]
+
+    def test_merge_sentences(self):
+        intent_definition = IntentDefinition("Lights")
+        for text in ["Turn the lights on", "Turn the lights off", "Switch the lights on",
+                     "Switch the lights off", "Turn the lights on"]:
+            intent_definition.add_sentence(SentenceBuilder().add_string(text).build())
+
+        optimized = self.optimize(intent_definition)
+
+        self.assertEqual(1, len(optimized.sentences))
+        self.assertEqual(["(Turn | Switch)", "the lights", "(on | off)"],
+                         self.texts(optimized.sentences[0]))
+
+    def test_factor_common_prefix_into_rule(self):
+        room = SetParameter("Room", True, ["Study", "Attic"])
+        intent_definition = IntentDefinition("DimRoom")
+        intent_definition.add_sentence(SentenceBuilder().add_string("Dim the lights in the")
+                                       .add_parameter(room)
+                                       .add_parameter(SetParameter("UpDown", True, ["up", "down"]))
+                                       .build())
+        intent_definition.add_sentence(SentenceBuilder().add_string("Dim the lights in the")
+                                       .add_parameter(room)
+                                       .add_string("to")
+                                       .add_parameter(NumberRangeParameter("level", True, 0, 100))
+                                       .build())
+
+        optimized = self.optimize(intent_definition)
+
+        self.assertEqual(1, len(optimized.sentences))
+        sentence = optimized.sentences[0]
+        self.assertEqual(CompiledString("Dim the lights in the", False, False), sentence[0])
+        self.assertEqual(CompiledVariableParameter("rule0", False, False), sentence[2])
+        self.assertEqual(["rule0"], [variable.name for variable in optimized.variables])
+        self.assertEqual(2, len(optimized.variables[0].sentences))
+        # the room is only used once
+        self.assertEqual(["Room", "UpDown"],
+                         [parameter.name for parameter in optimized.set_parameters])
+
+    def test_factor_common_suffix_into_optional_rule(self):
+        intent_definition = IntentDefinition("Weather")
+        for text in ["What is the temperature in the garden right now",
+                     "Please tell me what is the temperature in the garden right now",
+                     "Tell me the temperature in the garden right now"]:
+            intent_definition.add_sentence(SentenceBuilder().add_string(text).build())
+
+        optimized = self.optimize(intent_definition)
+
+        self.assertEqual(1, len(optimized.sentences))
+        self.assertEqual("the temperature in the garden right now",
+                         optimized.sentences[0][-1].text)
+
+    def test_short_prefix_is_not_factored(self):
+        intent_definition = IntentDefinition("Mail")
+        intent_definition.add_sentence(SentenceBuilder().add_string("Do I have mail").build())
+        intent_definition.add_sentence(SentenceBuilder().add_string("Do you know").build())
+
+        optimized = self.optimize(intent_definition)
+
+        self.assertEqual((), optimized.variables)
+        self.assertEqual([["Do I have mail"], ["Do you know"]],
+                         [self.texts(sentence) for sentence in optimized.sentences])
+
+    def test_templates_and_variables_are_kept(self):
+        when = Variable("when", [SentenceBuilder().add_string("in").add_parameter(
+            NumberRangeParameter("minutes", True, 1, 60)).add_string("minutes").build(),
+                                 SentenceBuilder().add_string("now").build(),
+                                 SentenceBuilder().add_string("now").build()])
+        intent_definition = IntentDefinition("Timer")
+        intent_definition.add_variable(when)
+        for start in ["Set a timer", "Start a timer"]:
+            intent_definition.add_sentence(SentenceBuilder().add_string(start)
+                                           .add_parameter(VariableParameter(when, True, True))
+                                           .build())
+        intent_definition.add_sentence(SentenceBuilder()
+                                       .add_string("Set a [kitchen] timer", substitute=True)
+                                       .add_parameter(VariableParameter(when, True, True))
+                                       .build())
+
+        optimized = self.optimize(intent_definition)
+
+        self.assertEqual(2, len(optimized.variables[0].sentences))
+        self.assertIn(CompiledString("Set a [kitchen] timer", False, True),
+                      [part for sentence in optimized.sentences for part in sentence])
+
+    def test_keep_original_when_expansions_change(self):
+        intent_definition = IntentDefinition("Lights")
+        intent_definition.add_sentence(SentenceBuilder().add_string("Turn on").build())
+        intent_definition.add_sentence(SentenceBuilder().add_string("Switch on").build())
+        compiled = self.compiler.compile(intent_definition)
+
+        with mock.patch("rhasspy.grammaroptimizer._unique", side_effect=lambda items: items[:1]):
+            optimized = self.optimizer.optimize(compiled)
+
+        self.assertIs(compiled, optimized)
+
+    def test_keep_original_when_expansions_cant_be_verified(self):
+        intent_definition = IntentDefinition("Lights")
+        for verb in ["Turn", "Switch", "Put"]:
+            intent_definition.add_sentence(SentenceBuilder().add_string(verb + " the lights on")
+                                           .build())
+        compiled = self.compiler.compile(intent_definition)
+
+        with mock.patch("rhasspy.grammaroptimizer.VERIFY_LIMIT", 2):
+            optimized = self.optimizer.optimize(compiled)
+
+        self.assertIs(compiled, optimized)
+
+    def test_optimize_all_only_optimizes_changed_definitions(self):
+        first = self.compiler.compile(IntentDefinition("First", "Hello there"))
+        second = self.compiler.compile(IntentDefinition("Second", "Good bye"))
+        optimized = self.optimizer.optimize_all([first, second])
+
+        with mock.patch.object(self.optimizer, "optimize") as optimize_mock:
+            optimize_mock.return_value = second
+            changed = self.compiler.compile(IntentDefinition("First", "Hi there"))
+            result = self.optimizer.optimize_all([changed, second])
+
+        optimize_mock.assert_called_once_with(changed)
+        self.assertIs(optimized[1], result[1])
@@ -1,6 +1,7 @@
 from unittest import TestCase
 from unittest.mock import MagicMock, Mock
 
+from core.intenthandler import IntentHandler
 from core.intenthandlermanager import IntentHandlerManager
 from core.intentdefinition import IntentDefinition
 from rhasspy.intentreceiver import RhasspyIntentReceiver
@@ -25,7 +26,7 @@ class TestIntentReceiverIntentHandlerManagerIntegration(TestCase):
                        """
 
     def test_new_intent(self):
-        mock_intent_handler = Mock()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
         mock_intent_handler.intent_definitions = [IntentDefinition("Test", "Test text")]
         mock_intent_handler.handle_intent = MagicMock(return_value=("Test response", False))
 
@@ -41,7 +42,7 @@ class TestIntentReceiverIntentHandlerManagerIntegration(TestCase):
         self.assertEqual(expected_response, response)
 
     def test_new_intent_without_response(self):
-        mock_intent_handler = Mock()
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
         mock_intent_handler.intent_definitions = [IntentDefinition("Test", "Test text")]
         mock_intent_handler.handle_intent = MagicMock(return_value=(None, False))
 
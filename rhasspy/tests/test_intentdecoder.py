@@ -0,0 +1,23 @@
+from unittest import TestCase
+
+from rhasspy.intentdecoder import RhasspyIntentDecoder
+
+
+class TestRhasspyIntentDecoder(TestCase):
+
+    def test_decode(self):
+        raw_intent = b"""{"intent": {"name": "TurnLightsInRoomOnOff", "confidence": 1.0},
+                          "text": "turn the lights in the study on",
+                          "slots": {"room": "study", "state": "on"},
+                          "siteId": "study"}"""
+        intent, site_id = RhasspyIntentDecoder.decode(raw_intent)
+        self.assertEqual("TurnLightsInRoomOnOff", intent.name)
+        self.assertEqual("turn the lights in the study on", intent.full_intent_string)
+        self.assertEqual({"room": "study", "state": "on"}, intent.parameters)
+        self.assertEqual("study", site_id)
+
+    def test_decode_without_slots_and_site(self):
+        intent, site_id = RhasspyIntentDecoder.decode('{"intent": {"name": ""}, "text": ""}')
+        self.assertEqual("", intent.name)
+        self.assertEqual({}, intent.parameters)
+        self.assertEqual("default", site_id)
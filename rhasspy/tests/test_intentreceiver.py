@@ -1,7 +1,36 @@
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
 from unittest import TestCase
-from unittest.mock import MagicMock, Mock
+from unittest.mock import MagicMock, Mock, patch
+from urllib.request import urlopen
 
-from rhasspy.intentreceiver import RhasspyIntentReceiver
+from core.intentdefinition import IntentDefinition
+from core.intenthandler import IntentHandler
+from core.intenthandlermanager import IntentHandlerManager
+from rhasspy.intentreceiver import BoundedThreadingHTTPServer, RhasspyIntentReceiver
+
+
+class SlowRequestHandler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    active_requests = 0
+    max_active_requests = 0
+
+    def do_GET(self):
+        with SlowRequestHandler.lock:
+            SlowRequestHandler.active_requests += 1
+            SlowRequestHandler.max_active_requests = max(SlowRequestHandler.max_active_requests,
+                                                         SlowRequestHandler.active_requests)
+        time.sleep(0.2)
+        with SlowRequestHandler.lock:
+            SlowRequestHandler.active_requests -= 1
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
 
 
 class TestRhasspyIntentReceiver(TestCase):
@@ -48,6 +77,86 @@ class TestRhasspyIntentReceiver(TestCase):
                         }
                     """
 
+    def test_thread_count_stays_flat(self):
+        rhasspy_intent_receiver = RhasspyIntentReceiver(port=0)
+        mock_new_intent_observer = Mock()
+        mock_new_intent_observer.update = MagicMock(return_value=("Test response", False))
+        rhasspy_intent_receiver.attach(mock_new_intent_observer)
+        _, port = rhasspy_intent_receiver.wait_until_serving(5)
+
+        def post_intents(number_of_intents):
+            for _ in range(number_of_intents):
+                connection = http.client.HTTPConnection("localhost", port)
+                connection.request("POST", "/", self.intent_string)
+                self.assertEqual(200, connection.getresponse().status)
+                connection.close()
+
+        post_intents(10)
+        thread_count = threading.active_count()
+        post_intents(2000)
+        thread_count_after_posts = threading.active_count()
+
+        rhasspy_intent_receiver.shutdown()
+        self.assertEqual(thread_count, thread_count_after_posts)
+        self.assertEqual(2010, mock_new_intent_observer.update.call_count)
+
+    @patch("rhasspy.intentreceiver.ConversationDispatcher")
+    def test_continue_dialog_after_response(self, conversation_dispatcher):
+        rhasspy_intent_receiver = RhasspyIntentReceiver(port=0)
+        mock_new_intent_observer = Mock()
+        mock_new_intent_observer.update = MagicMock(return_value=("Test response", True))
+        rhasspy_intent_receiver.attach(mock_new_intent_observer)
+        _, port = rhasspy_intent_receiver.wait_until_serving(5)
+
+        connection = http.client.HTTPConnection("localhost", port)
+        connection.request("POST", "/", self.intent_string)
+        connection.getresponse().read()
+        connection.close()
+        rhasspy_intent_receiver.shutdown()
+
+        conversation_dispatcher.return_value.continue_conversation.assert_called_once_with(
+            "default")
+
+    def test_metrics(self):
+        rhasspy_intent_receiver = RhasspyIntentReceiver(port=0)
+        rhasspy_intent_receiver.attach(Mock(update=MagicMock(return_value=("", False))))
+        rhasspy_intent_receiver.handle_new_intent(self.intent_string)
+        _, port = rhasspy_intent_receiver.wait_until_serving(5)
+
+        metrics = urlopen("http://localhost:{}/metrics".format(port)).read().decode("utf-8")
+        rhasspy_intent_receiver.shutdown()
+
+        self.assertIn("# TYPE intent_parse_seconds histogram", metrics)
+        self.assertIn("intent_parse_seconds_count ", metrics)
+
+    def test_text_is_matched_and_dispatched(self):
+        mock_intent_handler = Mock(spec=IntentHandler, cache_policies={})
+        mock_intent_handler.intent_definitions = [IntentDefinition("GetTime", "What time is it")]
+        mock_intent_handler.handle_intent = MagicMock(return_value=("It's noon", False))
+        intent_handler_manager = IntentHandlerManager()
+        intent_handler_manager.subscribe_intent_handler(mock_intent_handler)
+        rhasspy_intent_receiver = RhasspyIntentReceiver(port=0)
+        rhasspy_intent_receiver.attach(intent_handler_manager)
+        _, port = rhasspy_intent_receiver.wait_until_serving(5)
+
+        try:
+            connection = http.client.HTTPConnection("localhost", port, timeout=5)
+            connection.request("POST", "/text", "What time is it?".encode("utf-8"))
+            response = connection.getresponse()
+            body = json.loads(response.read())
+            connection.request("POST", "/text", "What day is it?".encode("utf-8"))
+            unknown_response = connection.getresponse()
+            unknown_response.read()
+            connection.close()
+        finally:
+            rhasspy_intent_receiver.shutdown()
+
+        self.assertEqual(200, response.status)
+        self.assertEqual("GetTime", body["intent"])
+        self.assertEqual("It's noon", body["response"])
+        self.assertEqual(404, unknown_response.status)
+        mock_intent_handler.handle_intent.assert_called_once()
+
     def test_create_intent_object_and_dispatch_to_listeners(self):
         try:
             rhasspy_intent_receiver = RhasspyIntentReceiver()
@@ -64,3 +173,25 @@ class TestRhasspyIntentReceiver(TestCase):
             self.assertEqual({"room": "study", "state": "on"}, intent_in_mock_call.parameters)
         except KeyError:
             self.fail("create_intent_object raised an unexpected KeyError")
+
+
+class TestBoundedThreadingHTTPServer(TestCase):
+
+    def test_requests_are_handled_concurrently_up_to_the_limit(self):
+        SlowRequestHandler.max_active_requests = 0
+        httpd = BoundedThreadingHTTPServer(("localhost", 0), SlowRequestHandler, 2)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = "http://localhost:{}/".format(httpd.server_address[1])
+
+        start = time.time()
+        clients = [threading.Thread(target=lambda: urlopen(url).read()) for _ in range(4)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        duration = time.time() - start
+
+        httpd.shutdown()
+        httpd.server_close()
+        self.assertEqual(2, SlowRequestHandler.max_active_requests)
+        self.assertLess(duration, 0.75)
@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from core.intentdefinition import SetParameter
+from rhasspy.slotregistry import SlotRegistry
+
+
+class TestSlotRegistry(TestCase):
+
+    ROOMS = ["Living room", "Kitchen", "Study", "Attic", "Garage", "Hallway"]
+
+    def test_identical_values_share_a_slot(self):
+        slot_registry = SlotRegistry()
+
+        self.assertEqual("Room", slot_registry.register("LightsInRoomOnOff",
+                                                        SetParameter("Room", True, self.ROOMS)))
+        self.assertEqual("Room", slot_registry.register("DimRoom",
+                                                        SetParameter("Location", True,
+                                                                     list(reversed(self.ROOMS)))))
+        self.assertEqual({"Room": self.ROOMS}, slot_registry.slots)
+        self.assertEqual("Room", slot_registry.slot_name(self.ROOMS))
+
+    def test_name_collisions_are_resolved_deterministically(self):
+        slot_registry = SlotRegistry()
+        slot_registry.register("Intent", SetParameter("Room", True, self.ROOMS))
+
+        names = [slot_registry.register("Intent", SetParameter("Room", True,
+                                                               self.ROOMS + [str(index)]))
+                 for index in range(3)]
+
+        self.assertEqual(["Intent_Room", "Intent_Room_2", "Intent_Room_3"], names)
+        self.assertEqual(4, len(slot_registry))
+
+    def test_unknown_values_raise_key_error(self):
+        with self.assertRaises(KeyError):
+            SlotRegistry().slot_name(self.ROOMS)
@@ -1,9 +1,12 @@
 import json
+import os
+import tempfile
+import threading
 from unittest import mock, TestCase
 from unittest.mock import Mock
 
 from core.intentdefinition import IntentDefinition, NumberRangeParameter, Sentence, SentenceBuilder, SetParameter, Variable
-from rhasspy.updater import RhasspyUpdater
+from rhasspy.updater import READY, RENDER_VERSION, RhasspyUpdater
 
 
 class TestRhasspyUpdater(TestCase):
@@ -378,4 +381,232 @@ class TestRhasspyUpdater(TestCase):
         calls = [mock.call(self.SLOTS_URL, json.dumps(expected_json)),
                  mock.call(self.SENTENCES_URL, "[TestIntent]\n[$Test{Test}]")]
         self.assertEqual(2, requests_mock.call_count)
-        requests_mock.assert_has_calls(calls, any_order=True)
\ No newline at end of file
+        requests_mock.assert_has_calls(calls, any_order=True)
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_same_part_twice_in_sentence(self, requests_mock):
+        parameter = SetParameter("Color", True, ["red", "green"])
+        sentence = Sentence()
+        sentence.add_parameter(parameter)
+        sentence.add_string("to")
+        sentence.add_parameter(parameter)
+        intent_definition = IntentDefinition("TestIntent")
+        intent_definition.add_sentence(sentence)
+        intent_definition.add_sentence(sentence)
+
+        intent_definition_source_mock = Mock()
+        intent_definition_source_mock.get_intent_definitions.return_value = [
+            intent_definition, intent_definition]
+        updater = RhasspyUpdater(intent_definition_source_mock)
+
+        updater.update_rhasspy()
+
+        # eight uses of the set make it a slot
+        sentence_string = "$Color{Color} to $Color{Color}"
+        expected_intents = "[TestIntent]\n{0}\n{0}\n\n[TestIntent]\n{0}\n{0}".format(
+            sentence_string)
+        requests_mock.assert_any_call(self.SLOTS_URL, json.dumps({"Color": ["red", "green"]}))
+        requests_mock.assert_any_call(self.SENTENCES_URL, expected_intents)
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_same_part_twice_in_inline_sentence(self, requests_mock):
+        parameter = SetParameter("Color", True, ["red", "green"])
+        sentence = Sentence()
+        sentence.add_parameter(parameter)
+        sentence.add_string("to")
+        sentence.add_parameter(parameter)
+        intent_definition = IntentDefinition("TestIntent")
+        intent_definition.add_sentence(sentence)
+
+        intent_definition_source_mock = Mock()
+        intent_definition_source_mock.get_intent_definitions.return_value = [intent_definition]
+        updater = RhasspyUpdater(intent_definition_source_mock)
+
+        updater.update_rhasspy()
+
+        requests_mock.assert_called_once_with(
+            self.SENTENCES_URL, "[TestIntent]\n(red | green){Color} to (red | green){Color}")
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_only_changed_definitions_are_rendered_again(self, requests_mock):
+        requests_mock.return_value.status_code = 200
+        first = IntentDefinition("First", "Some test text")
+        second = IntentDefinition("Second", "Other test text")
+        intent_definition_source_mock = Mock()
+        intent_definition_source_mock.get_intent_definitions.return_value = [first, second]
+        updater = RhasspyUpdater(intent_definition_source_mock)
+        updater.update_rhasspy()
+
+        intent_definition_source_mock.get_intent_definitions.return_value = [
+            first, IntentDefinition("Second", "Changed test text")]
+        with mock.patch.object(updater, "_get_sentence_string",
+                               wraps=updater._get_sentence_string) as render_mock:
+            updater.update_rhasspy()
+
+        render_mock.assert_called_once()
+        requests_mock.assert_called_with(self.SENTENCES_URL,
+                                         "[First]\nSome test text\n\n[Second]\nChanged test text")
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_optimize_grammar(self, requests_mock):
+        requests_mock.return_value.status_code = 200
+        intent_definition = IntentDefinition("Lights")
+        for text in ["Turn the lights on", "Turn the lights off", "Turn the lights off"]:
+            intent_definition.add_sentence(SentenceBuilder().add_string(text).build())
+        intent_definition_source_mock = Mock()
+        intent_definition_source_mock.get_intent_definitions.return_value = [intent_definition]
+
+        updater = RhasspyUpdater(intent_definition_source_mock, optimize_grammar=True)
+        updater.update_rhasspy()
+
+        requests_mock.assert_called_once_with(self.SENTENCES_URL,
+                                              "[Lights]\nTurn the lights (on | off)")
+
+
+class TestRhasspyUpdaterSyncState(TestCase):
+
+    SENTENCES_URL = "http://192.168.1.13:12101/api/sentences"
+    SLOTS_URL = "http://192.168.1.13:12101/api/slots?overwrite_all=true"
+    TRAIN_URL = "http://192.168.1.13:12101/api/train"
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._sync_state_file = os.path.join(self._directory.name, "sync_state.json")
+        self._intent_definition_source = Mock()
+        self._set_room_values(["Living room", "Kitchen", "Study", "Attic", "Garage", "Hallway"])
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _set_room_values(self, rooms, colors=("Red", "Green", "Blue", "White", "Yellow", "Pink")):
+        room_definition = IntentDefinition("Lights")
+        room_definition.add_sentence(SentenceBuilder().add_string("Lights in the")
+                                     .add_parameter(SetParameter("Room", True, rooms)).build())
+        color_definition = IntentDefinition("Color")
+        color_definition.add_sentence(SentenceBuilder().add_string("Make it")
+                                      .add_parameter(SetParameter("Color", True, list(colors)))
+                                      .build())
+        self._intent_definition_source.get_intent_definitions.return_value = [room_definition,
+                                                                              color_definition]
+
+    def _sync(self, requests_mock):
+        requests_mock.reset_mock()
+        updater = RhasspyUpdater(self._intent_definition_source, self._sync_state_file)
+        updater.update_rhasspy()
+        updater.train()
+        return [call[0][0] for call in requests_mock.call_args_list]
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_first_sync_uploads_everything_and_trains(self, requests_mock):
+        requests_mock.return_value.status_code = 200
+
+        self.assertEqual([self.SLOTS_URL, self.SENTENCES_URL, self.TRAIN_URL],
+                         self._sync(requests_mock))
+        self.assertEqual(["Color", "Room"],
+                         sorted(json.loads(requests_mock.call_args_list[0][0][1])))
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_unchanged_sync_uploads_nothing(self, requests_mock):
+        requests_mock.return_value.status_code = 200
+        self._sync(requests_mock)
+
+        self.assertEqual([], self._sync(requests_mock))
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_only_changed_slot_is_uploaded(self, requests_mock):
+        requests_mock.return_value.status_code = 200
+        self._sync(requests_mock)
+        self._set_room_values(["Living room", "Kitchen", "Study", "Attic", "Garage", "Bedroom"])
+
+        self.assertEqual([self.SLOTS_URL, self.TRAIN_URL], self._sync(requests_mock))
+        self.assertEqual(["Room"], list(json.loads(requests_mock.call_args_list[0][0][1])))
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_failed_training_is_retried(self, requests_mock):
+        requests_mock.side_effect = lambda url, payload: Mock(status_code=500 if url ==
+                                                              self.TRAIN_URL else 200)
+        self._sync(requests_mock)
+        requests_mock.side_effect = None
+        requests_mock.return_value.status_code = 200
+
+        self.assertEqual([self.TRAIN_URL], self._sync(requests_mock))
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_rendered_sentences_are_kept_across_restarts(self, requests_mock):
+        requests_mock.return_value.status_code = 200
+        self._sync(requests_mock)
+
+        with mock.patch.object(RhasspyUpdater, "_get_sentence_string") as render_mock:
+            self.assertEqual([], self._sync(requests_mock))
+
+        render_mock.assert_not_called()
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_sentences_are_rendered_again_after_a_render_version_change(self, requests_mock):
+        requests_mock.return_value.status_code = 200
+        self._sync(requests_mock)
+
+        with mock.patch("rhasspy.updater.RENDER_VERSION", RENDER_VERSION + 1), \
+                mock.patch.object(RhasspyUpdater, "_get_sentence_string",
+                                  return_value="Some test text") as render_mock:
+            self._sync(requests_mock)
+
+        render_mock.assert_called()
+
+
+class TestRhasspyUpdaterBackgroundSync(TestCase):
+
+    TRAIN_URL = "http://192.168.1.13:12101/api/train?nocache=true"
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_ready_after_background_training(self, requests_mock):
+        training_released = threading.Event()
+
+        def post(url, payload):
+            if url == self.TRAIN_URL:
+                training_released.wait(5)
+            return Mock(status_code=200)
+        requests_mock.side_effect = post
+        intent_definition_source_mock = Mock()
+        intent_definition_source_mock.get_intent_definitions.return_value = [
+            IntentDefinition("TestIntent", "Some simple test text")]
+        updater = RhasspyUpdater(intent_definition_source_mock)
+
+        thread = updater.start_background_sync()
+        self.assertFalse(updater.wait_until_ready(0.1))
+        self.assertEqual(0, READY.value)
+        self.assertIsNone(updater.training_duration)
+
+        training_released.set()
+        self.assertTrue(updater.wait_until_ready(5))
+        thread.join(5)
+        self.assertTrue(updater.ready)
+        self.assertEqual(1, READY.value)
+        self.assertGreater(updater.training_duration, 0)
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_not_ready_when_training_fails(self, requests_mock):
+        requests_mock.return_value.status_code = 500
+        intent_definition_source_mock = Mock()
+        intent_definition_source_mock.get_intent_definitions.return_value = [
+            IntentDefinition("TestIntent", "Some simple test text")]
+        updater = RhasspyUpdater(intent_definition_source_mock)
+
+        updater.start_background_sync().join(5)
+
+        self.assertFalse(updater.ready)
+
+    @mock.patch("rhasspy.updater.requests.post")
+    def test_not_ready_when_sync_state_cant_be_saved(self, requests_mock):
+        requests_mock.return_value.status_code = 200
+        intent_definition_source_mock = Mock()
+        intent_definition_source_mock.get_intent_definitions.return_value = [
+            IntentDefinition("TestIntent", "Some simple test text")]
+        updater = RhasspyUpdater(intent_definition_source_mock, "/nonexistent/sync_state.json")
+
+        with self.assertLogs("rhasspy.updater.RhasspyUpdater", "ERROR"):
+            thread = updater.start_background_sync()
+            thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(updater.ready)
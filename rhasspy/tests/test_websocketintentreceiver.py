@@ -0,0 +1,117 @@
+import base64
+import hashlib
+import socketserver
+import threading
+from unittest import TestCase
+from typing import List
+from unittest.mock import Mock, patch
+
+from rhasspy.websocketintentreceiver import RhasspyWebsocketIntentReceiver
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+API_URL = "http://rhasspy.test:12101/api"
+
+
+class IntentEventStreamHandler(socketserver.StreamRequestHandler):
+    """Minimal stand-in for the intent event stream of Rhasspy. Sends the next message of
+    IntentEventStreamHandler.messages to every client that connects, and then disconnects."""
+    messages: List[str] = []
+
+    def handle(self):
+        key = ""
+        for line in iter(self.rfile.readline, b"\r\n"):
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "sec-websocket-key":
+                key = value.strip()
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest())
+        self.wfile.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                         b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept +
+                         b"\r\n\r\n")
+        if IntentEventStreamHandler.messages:
+            payload = IntentEventStreamHandler.messages.pop(0).encode()
+            self.wfile.write(bytes([0x81, 126]) + len(payload).to_bytes(2, "big") + payload)
+        self.wfile.write(bytes([0x88, 0]))
+
+
+class TestRhasspyWebsocketIntentReceiver(TestCase):
+    intent_string = """{{
+                            "intent": {{
+                                "name": "{}",
+                                "confidence": 1.0
+                            }},
+                            "text": "turn the lights in the study on",
+                            "slots": {{
+                                "room": "study",
+                                "state": "on"
+                            }},
+                            "siteId": "study"
+                        }}"""
+
+    def setUp(self):
+        self._server = socketserver.ThreadingTCPServer(("localhost", 0), IntentEventStreamHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._url = "ws://localhost:{}/api/events/intent".format(self._server.server_address[1])
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @patch("rhasspy.websocketintentreceiver.requests.Session")
+    def test_receive_intents_and_reconnect(self, session):
+        IntentEventStreamHandler.messages = [self.intent_string.format("First"),
+                                             self.intent_string.format("Second")]
+        intents_received = threading.Event()
+        mock_new_intent_observer = Mock()
+
+        def update(intent):
+            if mock_new_intent_observer.update.call_count == 2:
+                intents_received.set()
+            return "", False
+        mock_new_intent_observer.update = Mock(side_effect=update)
+
+        receiver = RhasspyWebsocketIntentReceiver(self._url, initial_reconnect_delay=0.01,
+                                                  api_url=API_URL)
+        receiver.attach(mock_new_intent_observer)
+        self.assertTrue(intents_received.wait(5))
+        receiver.shutdown()
+
+        intents = [call[0][0] for call in mock_new_intent_observer.update.call_args_list]
+        self.assertEqual(["First", "Second"], [intent.name for intent in intents][:2])
+        self.assertEqual({"room": "study", "state": "on"}, intents[0].parameters)
+
+    @patch("rhasspy.websocketintentreceiver.requests.Session")
+    def test_response_is_spoken_by_rhasspy(self, session):
+        receiver = RhasspyWebsocketIntentReceiver(self._url, api_url=API_URL)
+        receiver.shutdown()
+        mock_new_intent_observer = Mock()
+        mock_new_intent_observer.update = Mock(return_value=("Test response", False))
+        receiver.attach(mock_new_intent_observer)
+
+        receiver.handle_new_intent(self.intent_string.format("Test"))
+
+        session.return_value.post.assert_called_once_with(
+            API_URL + "/text-to-speech", b"Test response", params={"siteId": "study"})
+
+    @patch("rhasspy.websocketintentreceiver.requests.Session")
+    def test_slow_intent_doesnt_stall_the_event_stream(self, session):
+        IntentEventStreamHandler.messages = [self.intent_string.format("Slow"),
+                                             self.intent_string.format("Fast")]
+        fast_intent_handled = threading.Event()
+        mock_new_intent_observer = Mock()
+
+        def update(intent):
+            if intent.name == "Slow":
+                # only returns when the next intent was handled meanwhile
+                fast_intent_handled.wait(5)
+                return "", False
+            fast_intent_handled.set()
+            return "", False
+        mock_new_intent_observer.update = Mock(side_effect=update)
+
+        receiver = RhasspyWebsocketIntentReceiver(self._url, initial_reconnect_delay=0.01,
+                                                  api_url=API_URL, max_concurrent_intents=2)
+        receiver.attach(mock_new_intent_observer)
+
+        self.assertTrue(fast_intent_handled.wait(5))
+        receiver.shutdown()
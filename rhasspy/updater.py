@@ -1,17 +1,39 @@
 """This module contains code that makes it possible to automatically update the Sentences & Slots
  of Rhasspy, based on the IntentHandlers which are active in the system"""
 import configparser
+import hashlib
 import json
 import logging
 import os
+import time
+from threading import Event, Lock, Thread
 
-from typing import Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import requests
 
-from core.intentdefinition import IntentDefinition, NumberRangeParameter, SentenceParameter, SetParameter, StringParameter, Variable, VariableParameter
+from core.compiledintentdefinition import CompiledIntentDefinition, \
+    CompiledNumberRangeParameter, CompiledPart, CompiledSentence, CompiledSetParameter, \
+    CompiledString, CompiledVariable, IntentDefinitionCompiler
 from core.intentdefinitionsource import IntentDefinitionSource
+from core.metrics import REGISTRY
 from core.utils.classname import fullname
+from rhasspy.grammaranalyzer import GrammarAnalysis, GrammarAnalyzer
+from rhasspy.grammaroptimizer import GrammarOptimizer
+from rhasspy.slotregistry import SlotRegistry
+
+READY = REGISTRY.gauge("rhasspy_ready",
+                       "1 when Rhasspy is trained with the current sentences and slots")
+TRAINING_TIME = REGISTRY.histogram("rhasspy_training_seconds",
+                                   "Time spent uploading the sentences & slots to Rhasspy and "
+                                   "training it", buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+
+# Increase when the rendering of the sentences changes, so the rendered sentences which older
+# versions stored in the sync state file are rendered again
+RENDER_VERSION = 1
+
+# The slot names an IntentDefinition was rendered with, and the rendered text
+_Rendered = Tuple[Tuple[Optional[str], ...], str]
 
 
 class RhasspyUpdater:
@@ -19,164 +41,320 @@ class RhasspyUpdater:
     a list of intent defitions.
 
     To do this, call upload_intent_definitions_to_rhasspy and pass it a List of
-    core.intentdefinition.IntentDefinition objects. After that, call the train method."""
+    core.intentdefinition.IntentDefinition objects. After that, call the train method.
+
+    When a sync_state_file is given, the hashes of the sentences and of every slot which were
+    uploaded are stored in it. On the next update only the slots which changed are uploaded,
+    the sentences are only uploaded when they changed, and train only retrains Rhasspy when
+    something was uploaded. Without a sync_state_file everything is uploaded and retrained every
+    time. The rendered sentences of every IntentDefinition are stored in it as well, so they
+    aren't rendered again after a restart, unless they were rendered by a version with another
+    RENDER_VERSION.
+
+    start_background_sync does the upload and the training in a background thread, so intents
+    can be received in the meantime. Rhasspy keeps recognizing the sentences of its previous
+    training until the new training is done. Use ready, wait_until_ready or the rhasspy_ready
+    gauge to find out when it is done. Background syncs run one after the other.
 
-    def __init__(self, intent_definition_source: IntentDefinitionSource):
+    With optimize_grammar, the sentences are rewritten by the GrammarOptimizer into smaller
+    sentences which accept the same texts, before they are uploaded."""
+
+    def __init__(self, intent_definition_source: IntentDefinitionSource,
+                 sync_state_file: str = None, optimize_grammar: bool = False):
         self._intent_definition_source = intent_definition_source
         self._logger = logging.getLogger(fullname(self))
-        self._slots: Dict[str, List[str]] = {}
+        self._slot_registry = SlotRegistry()
+        self._compiler = IntentDefinitionCompiler()
+        self._grammar_analyzer = GrammarAnalyzer()
+        self._grammar_optimizer = GrammarOptimizer() if optimize_grammar else None
+        self._sync_state_file = sync_state_file
+        self._sync_state = self._load_sync_state()
+        rendered = self._sync_state.pop("rendered")
+        if self._sync_state.pop("render_version", None) != RENDER_VERSION:
+            rendered = {}
+        self._rendered: Dict[str, _Rendered] = {
+            content_hash: (tuple(slot_names), text)
+            for content_hash, (slot_names, text) in rendered.items()}
+        self._sync_lock = Lock()
+        # guards _sync_generation and _ready, which the sync threads and the callers share
+        self._generation_lock = Lock()
+        self._sync_generation = 0
+        self._ready = Event()
+        self._training_duration: Optional[float] = None
         config = configparser.ConfigParser()
         config_file = os.path.dirname(os.path.abspath(__file__)) + "/config.ini"
         config.read(config_file)
         self._api_url = config["Rhasspy"]["Updater"]
 
-    def _post_slots(self, slots: Dict[str, List[str]]):
+    def _load_sync_state(self) -> Dict[str, Any]:
+        sync_state: Dict[str, Any] = {"sentences": None, "slots": {}, "trained": False,
+                                      "rendered": {}}
+        if self._sync_state_file and os.path.exists(self._sync_state_file):
+            try:
+                with open(self._sync_state_file) as state_file:
+                    sync_state.update(json.load(state_file))
+            except (OSError, ValueError) as exception:
+                self._logger.warning("Ignoring unreadable sync state file %s: %s",
+                                     self._sync_state_file, exception)
+        return sync_state
+
+    def _save_sync_state(self):
+        if not self._sync_state_file:
+            return
+        sync_state = dict(self._sync_state, render_version=RENDER_VERSION, rendered={
+            content_hash: [list(slot_names), text]
+            for content_hash, (slot_names, text) in self._rendered.items()})
+        temporary_file = self._sync_state_file + ".tmp"
+        with open(temporary_file, "w") as state_file:
+            json.dump(sync_state, state_file, indent=2, sort_keys=True)
+        os.replace(temporary_file, self._sync_state_file)
+
+    @staticmethod
+    def _hash(content) -> str:
+        return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+
+    def _post_slots(self, slots: Dict[str, List[str]]) -> bool:
+        # overwrite_all only replaces the values of the slots in the payload, so the slots
+        # which didn't change can be left out
         url = self._api_url + "/slots?overwrite_all=true"
         payload = json.dumps(slots)
         self._logger.info(payload)
         response = requests.post(url, payload)
         if response.status_code != 200:
             self._logger.error(response.content)
+            return False
+        return True
 
-    def _post_sentences(self, sentences: str):
+    def _post_sentences(self, sentences: str) -> bool:
         url = self._api_url + "/sentences"
         self._logger.info(sentences)
-        requests.post(url, sentences)
+        response = requests.post(url, sentences)
+        return response.status_code == 200
 
-    def train(self):
+    def train(self) -> bool:
         """Triggers the training of Rhasspy. Typically called after
-        RhasspyUpdater.upload_intent_definitions_to_rhasspy"""
-        url = self._api_url + "/train?nocache=true"
-        requests.post(url, None)
+        RhasspyUpdater.upload_intent_definitions_to_rhasspy. Returns whether Rhasspy is trained.
 
-    @staticmethod
-    def _requires_slot_creation(possible_values: List[str]) -> bool:
-        return len(possible_values) > 5
+        With a sync_state_file, Rhasspy is only retrained when the last update uploaded
+        something or the previous training didn't finish, and it may reuse its training
+        cache."""
+        if not self._sync_state_file:
+            response = requests.post(self._api_url + "/train?nocache=true", None)
+            return response.status_code == 200
+        if self._sync_state["trained"]:
+            self._logger.info("Sentences and slots didn't change, skipping training")
+            return True
+        response = requests.post(self._api_url + "/train", None)
+        if response.status_code != 200:
+            self._logger.error(response.content)
+            return False
+        self._sync_state["trained"] = True
+        self._save_sync_state()
+        return True
+
+    def start_background_sync(self) -> Thread:
+        """Uploads the sentences & slots and trains Rhasspy in a background thread, which is
+        returned"""
+        with self._generation_lock:
+            self._ready.clear()
+            READY.set(0)
+            self._sync_generation += 1
+            generation = self._sync_generation
+        thread = Thread(target=self._sync, args=(generation,), name="RhasspySync", daemon=True)
+        thread.start()
+        return thread
+
+    def _sync(self, generation: int):
+        with self._sync_lock:
+            self._sync_and_train(generation)
+
+    def _sync_and_train(self, generation: int):
+        start = time.perf_counter()
+        try:
+            self.update_rhasspy()
+            trained = self.train()
+        except requests.RequestException as exception:
+            self._logger.error("Updating Rhasspy failed: %s", exception)
+            return
+        except Exception:
+            # e.g. an unexpected response of Rhasspy, or a sync state file which can't be saved
+            self._logger.exception("Updating Rhasspy failed")
+            return
+        if not trained:
+            self._logger.error("Training Rhasspy failed")
+            return
+        self._training_duration = time.perf_counter() - start
+        TRAINING_TIME.observe(self._training_duration)
+        self._logger.info("Rhasspy is ready after %.1f seconds", self._training_duration)
+        with self._generation_lock:
+            if generation != self._sync_generation:
+                # a newer sync was started in the meantime, Rhasspy is ready when that one is done
+                return
+            READY.set(1)
+            self._ready.set()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the last background sync is done and Rhasspy is trained"""
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Blocks until the background sync is done, returns whether Rhasspy is ready"""
+        return self._ready.wait(timeout)
+
+    @property
+    def training_duration(self) -> Optional[float]:
+        """Number of seconds the last successful background sync took, or None"""
+        return self._training_duration
 
     def update_rhasspy(self):
         """Takes a list of core.intentdefinition.IntentDefinition objects, breaks them down
         into Sentences & Slots and uploads them to Rhasspy"""
-        intent_definitions = self._intent_definition_source.get_intent_definitions()
-        self._slots = self._get_slots(intent_definitions)
+        intent_definitions = self._compiler.compile_all(
+            self._intent_definition_source.get_intent_definitions())
+        if self._grammar_optimizer:
+            intent_definitions = self._grammar_optimizer.optimize_all(intent_definitions)
+        grammar_analysis = self._grammar_analyzer.analyze(intent_definitions)
+        self._log_grammar_analysis(grammar_analysis)
+        self._slot_registry = self._get_slots(intent_definitions, grammar_analysis)
         sentences = self._generate_sentences(intent_definitions)
-        if self._slots:
-            self._post_slots(self._slots)
-        if sentences:
-            self._post_sentences(sentences)
+        if not self._sync_state_file:
+            if self._slot_registry.slots:
+                self._post_slots(self._slot_registry.slots)
+            if sentences:
+                self._post_sentences(sentences)
+            return
+        self._sync_slots()
+        self._sync_sentences(sentences)
+        self._save_sync_state()
+
+    def _log_grammar_analysis(self, grammar_analysis: GrammarAnalysis):
+        self._logger.info("The grammar has %s sentence expansions",
+                          grammar_analysis.total_expansions)
+        for name, expansions in grammar_analysis.largest_intents():
+            self._logger.info("Intent %s: %s expansions", name, expansions)
+        for name, index, expansions in grammar_analysis.largest_sentences():
+            self._logger.info("Sentence %s of intent %s: %s expansions", index, name, expansions)
+
+    def _sync_slots(self):
+        slots = self._slot_registry.slots
+        slot_hashes = {name: self._hash(values) for name, values in slots.items()}
+        uploaded_hashes = self._sync_state["slots"]
+        changed_slots = {name: slots[name] for name, slot_hash in slot_hashes.items()
+                         if uploaded_hashes.get(name) != slot_hash}
+        removed_slots = set(uploaded_hashes) - set(slot_hashes)
+        if removed_slots:
+            self._logger.info("Slots no longer used by any sentence: %s", sorted(removed_slots))
+        if changed_slots:
+            if not self._post_slots(changed_slots):
+                return
+            self._sync_state["trained"] = False
+        else:
+            self._logger.info("Slots didn't change, skipping upload")
+        self._sync_state["slots"] = slot_hashes
+
+    def _sync_sentences(self, sentences: str):
+        sentences_hash = self._hash(sentences)
+        if self._sync_state["sentences"] == sentences_hash:
+            self._logger.info("Sentences didn't change, skipping upload")
+            return
+        if sentences and not self._post_sentences(sentences):
+            self._logger.error("Uploading the sentences failed")
+            return
+        self._sync_state["sentences"] = sentences_hash
+        self._sync_state["trained"] = False
 
-    def _get_string_for_variable(self, variable: Variable):
+    def _get_string_for_variable(self, variable: CompiledVariable):
         string = "{} = ".format(variable.name)
-        multiple_options = False
         if len(variable.sentences) > 0:
-            multiple_options = True
-            string += "("
-        for sentence in variable.sentences:
-            for part in sentence:
-                string += self._get_part_string(part)
-                if part != sentence[-1]:
-                    string += " "
-            if sentence != variable.sentences[-1]:
-                string += "|"
-        if multiple_options:
-            string += ")"
+            string += "({})".format("|".join(self._get_sentence_string(sentence)
+                                             for sentence in variable.sentences))
         return string
 
-    def _generate_sentences(self, intent_definitions: List[IntentDefinition]):
-        sentences = ""
-        for intent_definition in intent_definitions:
-            if intent_definition.name != "":
-                sentences += "[{}]\n".format(intent_definition.name)
-                for variable in intent_definition.variables:
-                    sentences += self._get_string_for_variable(variable)
-                    sentences += "\n"
-                if len(intent_definition.variables) > 0:
-                    sentences += "\n"
-                for sentence in intent_definition.sentences:
-                    for part in sentence:
-                        sentences += self._get_part_string(part)
-                        if part != sentence[-1]:
-                            sentences += " "
-                    if sentence != intent_definition.sentences[-1]:
-                        sentences += "\n"
-                if intent_definition != intent_definitions[-1]:
-                    sentences += "\n\n"
-        return sentences
-
-    def _get_slots(self, intent_definitions: List[IntentDefinition]):
-        slots: Dict[str, List[str]] = {}
-        for intent_definition in intent_definitions:
-            for sentence in intent_definition.sentences:
-                for part in sentence:
-                    if isinstance(part, SetParameter) and \
-                            self._requires_slot_creation(part.possible_values):
-                        slot_name, slot_value = self._generate_slot_for_part(slots,
-                                                                             intent_definition.name,
-                                                                             part)
-                        slots[slot_name] = slot_value
+    def _get_sentence_string(self, sentence: CompiledSentence) -> str:
+        return " ".join(self._get_part_string(part) for part in sentence)
+
+    def _generate_sentences(self, intent_definitions: List[CompiledIntentDefinition]):
+        return "".join(self._render_sentences(intent_definitions))
+
+    def _render_sentences(self,
+                          intent_definitions: List[CompiledIntentDefinition]) -> Iterator[str]:
+        """Yields the sentences of all IntentDefinitions in the format of Rhasspy, piece by
+        piece. Requires self._slot_registry to contain the slots of the IntentDefinitions.
+
+        The text of every IntentDefinition is remembered until the next render, so only the
+        IntentDefinitions which changed, or whose slots were renamed, are rendered again."""
+        rendered: Dict[str, _Rendered] = {}
+        last_index = len(intent_definitions) - 1
+        for index, intent_definition in enumerate(intent_definitions):
+            if intent_definition.name == "":
+                continue
+            yield self._render_intent_definition(intent_definition, rendered)
+            if index != last_index:
+                yield "\n\n"
+        self._rendered = rendered
+
+    def _render_intent_definition(self, intent_definition: CompiledIntentDefinition,
+                                  rendered: Dict[str, _Rendered]) -> str:
+        slot_names = tuple(self._slot_registry.get(parameter.possible_values)
+                           for parameter in intent_definition.set_parameters)
+        content_hash = intent_definition.content_hash
+        memoized = rendered.get(content_hash) or self._rendered.get(content_hash)
+        if memoized is None or memoized[0] != slot_names:
+            text = "[{}]\n".format(intent_definition.name)
             for variable in intent_definition.variables:
-                for sentence in variable.sentences:
-                    for part in sentence:
-                        if isinstance(part, SetParameter) and \
-                                self._requires_slot_creation(part.possible_values):
-                            slot_name, slot_value = self._generate_slot_for_part(slots,
-                                                                                 intent_definition.name,
-                                                                                 part)
-                            slots[slot_name] = slot_value
-        return slots
+                text += self._get_string_for_variable(variable) + "\n"
+            if len(intent_definition.variables) > 0:
+                text += "\n"
+            text += "\n".join(self._get_sentence_string(sentence)
+                              for sentence in intent_definition.sentences)
+            memoized = (slot_names, text)
+        rendered[content_hash] = memoized
+        return memoized[1]
 
     @staticmethod
-    def _generate_slot_for_part(slots: Dict[str, List[str]], intent_definition_name: str,
-                                part: SetParameter):
-        slot_name = part.name
-        if part.name in slots:
-            if slots[part.name] != part.possible_values:
-                slot_name = "{}_{}".format(intent_definition_name, part.name)
-        return slot_name, part.possible_values
-
-    def _get_part_string(self, part: SetParameter):
-        return_value = ""
-        if isinstance(part, StringParameter):
+    def _get_slots(intent_definitions: List[CompiledIntentDefinition],
+                   grammar_analysis: GrammarAnalysis = None) -> SlotRegistry:
+        """Returns the slots for the sets of values which the GrammarAnalysis prefers as slot
+        over an inline alternative"""
+        if grammar_analysis is None:
+            grammar_analysis = GrammarAnalysis(
+                {}, [], GrammarAnalyzer.count_value_set_uses(intent_definitions))
+        slot_registry = SlotRegistry()
+        for intent_definition in intent_definitions:
+            for parameter in intent_definition.set_parameters:
+                if grammar_analysis.use_slot(parameter.possible_values):
+                    slot_registry.register(intent_definition.name, parameter)
+        return slot_registry
+
+    def _get_part_string(self, part: CompiledPart) -> str:
+        if isinstance(part, CompiledString):
             return_value = part.text
             if part.substitute:
                 return_value += ":"
-            if part.optional:
-                return_value = "[{}]".format(return_value)
-
-        if isinstance(part, SetParameter):
-            slot_name = part.name
-            if self._requires_slot_creation(part.possible_values):
-                slot_name = [key for key, values in self._slots.items()
-                             if values == part.possible_values][0]
-            return_value = self._create_option_string(part, slot_name, part.return_value)
-        if isinstance(part, NumberRangeParameter):
+        elif isinstance(part, CompiledSetParameter):
+            return_value = self._create_option_string(
+                part, self._slot_registry.get(part.possible_values), part.return_value)
+        elif isinstance(part, CompiledNumberRangeParameter):
             return_value = "({}..{})".format(part.lower_value, part.upper_value)
             return_value += RhasspyUpdater._get_return_value_string_if_necessary(part.return_value,
                                                                                  part)
-        if isinstance(part, VariableParameter):
+        else:
             return_value = "<{}>".format(part.name)
             if part.return_value:
                 return_value += " {{{}}}".format(part.name)
-        if isinstance(part, SentenceParameter):
-            if part.optional:
-                return_value = "[{}]".format(return_value)
-
-
+        if part.optional:
+            return_value = "[{}]".format(return_value)
         return return_value
 
     @staticmethod
-    def _create_option_string(parameter: SetParameter,
-                              slot_name: str,
+    def _create_option_string(parameter: CompiledSetParameter,
+                              slot_name: Optional[str],
                               add_return_value: bool = False) -> str:
-        option_string = ""
-        if not RhasspyUpdater._requires_slot_creation(parameter.possible_values):
-            option_string += "("
-            for i in range(0, len(parameter.possible_values)):
-                option_string += parameter.possible_values[i]
-                if i != len(parameter.possible_values) - 1:
-                    option_string += " | "
-            option_string += ")"
+        if slot_name is None:
+            option_string = "({})".format(" | ".join(parameter.possible_values))
         else:
-            option_string += "${}".format(slot_name)
+            option_string = "${}".format(slot_name)
         option_string += RhasspyUpdater._get_return_value_string_if_necessary(add_return_value,
                                                                               parameter)
         return option_string
@@ -186,7 +364,7 @@ class RhasspyUpdater:
         response = ""
         if add_return_value:
             f = "{{{}}}"
-            if isinstance(parameter, NumberRangeParameter):
+            if isinstance(parameter, CompiledNumberRangeParameter):
                 f = "{{{}!int}}"
             response = f.format(parameter.name)
         return response
@@ -0,0 +1,143 @@
+"""Module that receives intents from the websocket intent event stream of Rhasspy. Rhasspy intents
+are converted to core.intent.Intent objects and then passed to the NewIntentObserver which is
+listening"""
+import configparser
+import logging
+import os
+from queue import Queue
+from threading import BoundedSemaphore, Event, Lock, Thread
+from typing import Optional
+
+import requests
+import websocket  # type: ignore
+
+from core.newintentobserver import NewIntentObserver
+from core.newintentsubject import NewIntentSubject
+from core.utils.classname import fullname
+from rhasspy.conversation import ConversationDispatcher
+from rhasspy.intentdecoder import RhasspyIntentDecoder
+
+
+class RhasspyWebsocketIntentReceiver(NewIntentSubject):
+    """Alternative for the RhasspyIntentReceiver, which keeps one persistent websocket connection
+    with Rhasspy instead of receiving every intent as a separate POST message. No HTTP server has
+    to be running to receive intents.
+
+    When the connection is lost, the RhasspyWebsocketIntentReceiver reconnects with an
+    exponentially increasing delay.
+
+    Rhasspy doesn't wait for a response on its event stream, so a response which isn't spoken by
+    the NewIntentObserver itself is sent to the text-to-speech API of Rhasspy.
+
+    Like the BoundedThreadingHTTPServer of the RhasspyIntentReceiver, intents are handled on a
+    fixed number of worker threads, so a slow IntentHandler doesn't stall the event stream. When
+    all workers are busy, no more messages are read until a worker is available again."""
+
+    INTENT_EVENTS = "/events/intent"
+    TEXT_TO_SPEECH = "/text-to-speech"
+    MAX_RECONNECT_DELAY = 60.0
+    DEFAULT_MAX_CONCURRENT_INTENTS = 4
+
+    def __init__(self, url: str = None, initial_reconnect_delay: float = 1.0,
+                 api_url: str = None, max_concurrent_intents: int = None):
+        self._logger = logging.getLogger(fullname(self))
+        self._intent_listener: Optional[NewIntentObserver] = None
+        config = configparser.ConfigParser()
+        config_file = os.path.dirname(os.path.abspath(__file__)) + "/config.ini"
+        config.read(config_file)
+        self._api_url = api_url or config["Rhasspy"]["Speaker"]
+        if max_concurrent_intents is None:
+            max_concurrent_intents = config.getint(
+                "Rhasspy", "MaxConcurrentIntents", fallback=self.DEFAULT_MAX_CONCURRENT_INTENTS)
+        self._max_concurrent_intents = max_concurrent_intents
+        self._url = url if url else self._api_url.replace("http", "ws", 1) + self.INTENT_EVENTS
+        self._initial_reconnect_delay = initial_reconnect_delay
+        # requests.Session isn't thread-safe, so the workers take turns using it
+        self._session = requests.Session()
+        self._session_lock = Lock()
+        self._conversation_dispatcher = ConversationDispatcher(self._api_url)
+        self._connection = None
+        self._stopped = Event()
+        self._messages: Queue = Queue()
+        self._free_workers = BoundedSemaphore(self._max_concurrent_intents)
+
+        for _ in range(self._max_concurrent_intents):
+            Thread(target=self._process_messages, daemon=True).start()
+        thread = Thread(target=self._receive_intents, daemon=True)
+        thread.start()
+
+    def attach(self, observer: NewIntentObserver):
+        """Attaches a new observer which implements the core.newintentobserver.NewIntentObserver
+        class"""
+        self._logger.info("Attached observer: %s", observer)
+        self._intent_listener = observer
+
+    def detach(self, observer: NewIntentObserver):
+        """Detaches an observer which implements the core.newintentobserver.NewIntentObserver
+        class"""
+        self._logger.info("Detached observer: %s", observer)
+        self._intent_listener = None
+
+    def shutdown(self):
+        """Closes the websocket connection, stops reconnecting and stops the workers once they
+        handled the messages which were already received"""
+        self._stopped.set()
+        if self._connection:
+            self._connection.close()
+        for _ in range(self._max_concurrent_intents):
+            self._messages.put(None)
+
+    def handle_new_intent(self, intent_string: str):
+        """Called for every message on the intent event stream. Converts the raw json into an
+        object of type core.intent.Intent and notifies the NewIntentObserver of its arrival."""
+        self._logger.info("Received intent: %s", intent_string)
+        intent, site_id = RhasspyIntentDecoder.decode(intent_string)
+        if intent.name == "" or intent.full_intent_string == "" or not self._intent_listener:
+            return
+        response, continue_dialog = self._intent_listener.update(intent)
+        self._logger.info("Response: {}".format(response))
+        if response:
+            with self._session_lock:
+                self._session.post(self._api_url + self.TEXT_TO_SPEECH, response.encode("utf-8"),
+                                   params={"siteId": site_id})
+        if continue_dialog:
+            self._conversation_dispatcher.continue_conversation(site_id)
+
+    def _receive_intents(self):
+        reconnect_delay = self._initial_reconnect_delay
+        while not self._stopped.is_set():
+            try:
+                self._connection = websocket.create_connection(self._url)
+                self._logger.info("Connected to %s", self._url)
+                reconnect_delay = self._initial_reconnect_delay
+                self._receive_intents_from_connection(self._connection)
+            except (websocket.WebSocketException, OSError) as exception:
+                self._logger.warning("Connection with %s failed: %s", self._url, exception)
+            finally:
+                if self._connection:
+                    self._connection.close()
+                    self._connection = None
+            if self._stopped.wait(reconnect_delay):
+                return
+            reconnect_delay = min(reconnect_delay * 2, self.MAX_RECONNECT_DELAY)
+
+    def _receive_intents_from_connection(self, connection):
+        while True:
+            message = connection.recv()
+            if not message:
+                self._logger.info("Connection with %s was closed", self._url)
+                return
+            self._free_workers.acquire()
+            self._messages.put(message)
+
+    def _process_messages(self):
+        while True:
+            message = self._messages.get()
+            if message is None:
+                return
+            try:
+                self.handle_new_intent(message)
+            except Exception as exception:
+                self._logger.error("Failed to handle intent %s: %s", message, exception)
+            finally:
+                self._free_workers.release()
@@ -1,15 +1,31 @@
 import configparser
+import io
 import os
 import threading
+import wave
+from typing import ByteString, Optional
 
 import soco  # type: ignore
 
 from sonos.server import SpeechFileServer
+from core.metrics import REGISTRY
 from core.speaker import Speaker
 from core.texttospeech import TextToSpeechGenerator
+from core.utils.classname import fullname
+
+
+def wav_duration(byte_string: ByteString) -> Optional[float]:
+    """Returns the number of seconds the wav file plays, or None when it isn't a wav file"""
+    try:
+        with wave.open(io.BytesIO(bytes(byte_string))) as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
 
 
 class SonosSpeaker(Speaker):
+    """Plays the speech on a Sonos speaker. speak_text returns as soon as the Sonos started
+    playing, with the duration of the speech."""
 
     def __init__(self, text_to_speech_generator: TextToSpeechGenerator):
         Speaker.__init__(self)
@@ -23,8 +39,21 @@ class SonosSpeaker(Speaker):
             if zone.player_name == config["Sonos"]["Speaker"]:
                 self._speaker = zone
         self._speech_generator = text_to_speech_generator
+        labels = {"speaker": fullname(self)}
+        self._synthesis_time = REGISTRY.histogram("speech_synthesis_seconds",
+                                                  "Time spent generating speech", labels)
+        self._hosting_time = REGISTRY.histogram("speech_file_hosting_seconds",
+                                                "Time spent storing a speech file on the "
+                                                "speech file server", labels)
+        self._playback_time = REGISTRY.histogram("speech_playback_seconds",
+                                                 "Time spent starting the playback of speech",
+                                                 labels)
 
-    def speak_text(self, text):
-        byte_string = self._speech_generator.generate_speech_file(text)
-        url = self._server.host_as_wav_file_and_return_url(byte_string)
-        self._speaker.play_uri(url)
+    def speak_text(self, text) -> Optional[float]:
+        with self._synthesis_time.time():
+            byte_string = self._speech_generator.generate_speech_file(text)
+        with self._hosting_time.time():
+            url = self._server.host_as_wav_file_and_return_url(byte_string)
+        with self._playback_time.time():
+            self._speaker.play_uri(url)
+        return wav_duration(byte_string)
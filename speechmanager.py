@@ -1,5 +1,7 @@
 """This module provides """
 
+from typing import Optional
+
 from core.intent import Intent
 from core.intentdefinition import IntentDefinition, SentenceBuilder, SetParameter
 from core.intenthandler import IntentHandler
@@ -46,5 +48,5 @@ class SpeechManager(Speaker, IntentHandler):
         return "I'm here"
 
     @staticmethod
-    def speak_text(text: str):
-        SpeechManager.current_speaker.speak_text(text)
+    def speak_text(text: str) -> Optional[float]:
+        return SpeechManager.current_speaker.speak_text(text)